@@ -8,13 +8,12 @@ Cloud Security System
 - models: Модели данных
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Cloud Security Team"
 __description__ = "Система защиты облачных сред с эволюционным обучением"
 
-from .core import SecurityMonitor, SecurityEvent, SecurityIncident
-from .core import EvolutionarySecurityLearning, IntegrationManager
-
 __all__ = [
     'SecurityMonitor',
     'SecurityEvent',
@@ -22,3 +21,14 @@ __all__ = [
     'EvolutionarySecurityLearning',
     'IntegrationManager'
 ]
+
+def __getattr__(name):
+    """Импорт .core при первом обращении к экспортируемому имени (PEP 562)"""
+    if name in __all__:
+        value = getattr(importlib.import_module('.core', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
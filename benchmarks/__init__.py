@@ -0,0 +1,3 @@
+"""
+Нагрузочные тесты и бенчмарки пути обработки событий
+"""
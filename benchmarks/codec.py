@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Сравнение двоичного кодирования событий и блоков с JSON
+Байт на событие и пропускная способность кодирования/декодирования
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.events import EventGenerator
+from core.event_codec import (BlockRecord, EventRecord, decode_block, decode_event, decode_events,
+                              encode_block, encode_event, encode_events)
+
+def _json(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+def _rate(func: Callable[[], Any], count: int, repeat: int) -> float:
+    """Лучшая из repeat попыток: объектов в секунду"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return round(count / best, 1)
+
+def _row(size: int, count: int, encode: Callable[[], Any], decode: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    return {
+        'bytes_per_event': round(size / count, 1),
+        'encode_per_second': _rate(encode, count, repeat),
+        'decode_per_second': _rate(decode, count, repeat),
+    }
+
+def run(events: List[EventRecord], block_size: int, repeat: int) -> Dict[str, Any]:
+    count = len(events)
+    dicts = [event.to_dict() for event in events]
+
+    # Отдельные события (хеширование, хранение по одному)
+    json_single = [_json(event) for event in dicts]
+    binary_single = [encode_event(event) for event in events]
+
+    # Пакеты для передачи по сети
+    batches = [events[i:i + block_size] for i in range(0, count, block_size)]
+    json_batches = [_json([event.to_dict() for event in batch]) for batch in batches]
+    binary_batches = [encode_events(batch) for batch in batches]
+
+    # Блоки: хеш заголовка и корень Меркла
+    blocks = [BlockRecord(index, batch[-1].timestamp, batch) for index, batch in enumerate(batches)]
+    json_blocks = [_json(block.to_dict()) for block in blocks]
+    binary_blocks = [encode_block(block) for block in blocks]
+
+    return {
+        'events': count,
+        'block_size': block_size,
+        'event': {
+            'json': _row(sum(map(len, json_single)), count,
+                         lambda: [_json(event) for event in dicts],
+                         lambda: [json.loads(data) for data in json_single], repeat),
+            'binary': _row(sum(map(len, binary_single)), count,
+                           lambda: [encode_event(event) for event in events],
+                           lambda: [decode_event(data) for data in binary_single], repeat),
+        },
+        'batch': {
+            'json': _row(sum(map(len, json_batches)), count,
+                         lambda: [_json([event.to_dict() for event in batch]) for batch in batches],
+                         lambda: [json.loads(data) for data in json_batches], repeat),
+            'binary': _row(sum(map(len, binary_batches)), count,
+                           lambda: [encode_events(batch) for batch in batches],
+                           lambda: [decode_events(data) for data in binary_batches], repeat),
+        },
+        'block': {
+            'json': _row(sum(map(len, json_blocks)), count,
+                         lambda: [_json(block.to_dict()) for block in blocks],
+                         lambda: [json.loads(data) for data in json_blocks], repeat),
+            'binary': _row(sum(map(len, binary_blocks)), count,
+                           lambda: [encode_block(block) for block in blocks],
+                           lambda: [decode_block(data) for data in binary_blocks], repeat),
+        },
+        'hash': {
+            'json_per_second': _rate(lambda: [hashlib.sha256(_json(event)).digest() for event in dicts],
+                                     count, repeat),
+            'binary_per_second': _rate(lambda: [hashlib.sha256(encode_event(event)).digest() for event in events],
+                                       count, repeat),
+        },
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Двоичное кодирование событий против JSON")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--block-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для результата в JSON")
+    args = parser.parse_args()
+
+    events = [EventRecord.from_event(event) for event in EventGenerator(seed=args.seed).generate(args.events)]
+    result = run(events, args.block_size, args.repeat)
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
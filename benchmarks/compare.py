@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Сравнение результатов бенчмарков между коммитами
+Код возврата 1, если какая-либо метрика ухудшилась больше допустимого порога
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+def _metrics(report: Dict[str, Any]) -> Dict[str, Tuple[float, bool]]:
+    """Сравниваемые метрики: имя -> (значение, больше - лучше)"""
+    results = report['results']
+    metrics = {'events_per_second': (results['events_per_second'], True)}
+
+    end_to_end = results.get('end_to_end', {})
+    for key in ('p50_ms', 'p99_ms'):
+        if key in end_to_end:
+            metrics[f"end_to_end.{key}"] = (end_to_end[key], False)
+
+    for stage, summary in results.get('stages', {}).items():
+        for key in ('p50_ms', 'p99_ms'):
+            if key in summary:
+                metrics[f"stage.{stage}.{key}"] = (summary[key], False)
+
+    if 'memory' in results:
+        metrics['memory.rss_growth_mb'] = (results['memory']['rss_growth_mb'], False)
+    return metrics
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any],
+            threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Изменение каждой общей метрики; regression - ухудшение больше threshold"""
+    base, new = _metrics(baseline), _metrics(candidate)
+    rows = []
+    for name in base.keys() & new.keys():
+        (old_value, higher_is_better), (new_value, _) = base[name], new[name]
+        change = (new_value - old_value) / abs(old_value) if old_value else 0.0
+        worse = -change if higher_is_better else change
+        rows.append({
+            'metric': name,
+            'baseline': old_value,
+            'candidate': new_value,
+            'change': round(change, 4),
+            'regression': worse > threshold,
+        })
+    return sorted(rows, key=lambda row: row['metric'])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сравнение двух результатов benchmarks/run.py")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Допустимое ухудшение (доля)")
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+    candidate = json.loads(Path(args.candidate).read_text(encoding='utf-8'))
+    rows = compare(baseline, candidate, args.threshold)
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print(f"{baseline['meta']['revision']} -> {candidate['meta']['revision']}")
+        for row in rows:
+            marker = '❌' if row['regression'] else '  '
+            print(f"{marker} {row['metric']:<45} {row['baseline']:>12} {row['candidate']:>12} "
+                  f"{row['change'] * 100:+8.1f}%")
+
+    return 1 if any(row['regression'] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Драйверы нагрузки для пути обработки событий
+В процессе (этапы ядра или полный CloudSecuritySystem) и через HTTP API
+"""
+
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core.model_registry import get_process_rss_mb
+
+class LatencySamples:
+    """Ограниченная выборка задержек (резервуар фиксированного размера)"""
+
+    def __init__(self, capacity: int = 20000, seed: int = 0):
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, value: float):
+        capacity = len(self.values)
+        if self.count < capacity:
+            self.values[self.count] = value
+        else:
+            index = int(self.rng.integers(0, self.count + 1))
+            if index < capacity:
+                self.values[index] = value
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        values = self.values[:min(self.count, len(self.values))] * 1000
+        if not len(values):
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': round(float(values.mean()), 4),
+            'p50_ms': round(float(np.percentile(values, 50)), 4),
+            'p99_ms': round(float(np.percentile(values, 99)), 4),
+            'max_ms': round(float(values.max()), 4),
+        }
+
+class _StageTimer:
+    __slots__ = ('stats', 'last')
+
+    def __init__(self, stats: 'StageStats'):
+        self.stats = stats
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stats.add(stage, now - self.last)
+        self.last = now
+
+class StageStats:
+    """Задержки по этапам; timer() совместим с таймером этапов SecurityMetrics"""
+
+    def __init__(self, capacity: int = 20000):
+        self.capacity = capacity
+        self.stages: Dict[str, LatencySamples] = {}
+
+    def add(self, stage: str, seconds: float):
+        samples = self.stages.get(stage)
+        if samples is None:
+            samples = self.stages[stage] = LatencySamples(self.capacity)
+        samples.add(seconds)
+
+    def timer(self) -> _StageTimer:
+        return _StageTimer(self)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: samples.summary() for stage, samples in self.stages.items()}
+
+class CorePipeline:
+    """Этапы обработки события, реализованные в core без внешних подсистем
+
+    Повторяет порядок _security_event_handler для дедупликации,
+    корреляции, извлечения признаков и оценки аномальности.
+    """
+
+    def __init__(self):
+        from config import config
+        from core.ann_index import AnomalyScorer, LSHIndex
+        from core.correlation_engine import CorrelationEngine
+        from core.event_filter import EventDeduplicator
+        from core.feature_extraction import FeatureExtractor
+
+        self.event_filter = EventDeduplicator(
+            window_seconds=config.event_filter.suppression_window_seconds,
+            max_entries=config.event_filter.max_fingerprints
+        )
+        self.correlation_engine = CorrelationEngine(config.correlation)
+        self.feature_extractor = FeatureExtractor(
+            hash_buckets=config.ml.feature_hash_buckets,
+            entity_window=config.ml.feature_entity_window,
+            max_entities=config.ml.feature_max_entities
+        )
+        self.anomaly_scorer = AnomalyScorer(LSHIndex(
+            dim=self.feature_extractor.width,
+            capacity=config.ml.anomaly_index_capacity,
+            n_tables=config.ml.anomaly_lsh_tables,
+            n_bits=config.ml.anomaly_lsh_bits,
+            max_age_seconds=config.ml.anomaly_index_max_age
+        ))
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def handle(self, event: Dict[str, Any], stages: Any):
+        if not self.event_filter.admit(event):
+            stages.mark('dedup')
+            return
+        stages.mark('dedup')
+        self.correlation_engine.process_event(event)
+        stages.mark('correlation')
+        features = self.feature_extractor.transform(event)
+        stages.mark('features')
+        self.anomaly_scorer.score(features)
+        stages.mark('anomaly_index')
+
+class SystemPipeline:
+    """Полный CloudSecuritySystem с заменителями облачных провайдеров
+
+    Таймер этапов системы подменяется на StageStats, поэтому этапы
+    _security_event_handler измеряются без включения Prometheus.
+    """
+
+    def __init__(self, stage_stats: StageStats, cloud_latency: float = 0.05):
+        from benchmarks.fake_providers import FakeAlertSink, FakeCloudManager
+        from core.security_monitor import ThreatLevel
+        from main import CloudSecuritySystem
+
+        self.threat_level = ThreatLevel
+        self.system = CloudSecuritySystem()
+        self.system.cloud_manager = FakeCloudManager(latency=cloud_latency)
+        self.system.alert_dispatcher.speaker = None
+        self.system.alert_dispatcher.add_sink(FakeAlertSink())
+        self.stage_stats = stage_stats
+        self._current = None
+        self.system.metrics.stage_timer = lambda: self._current
+
+    async def start(self):
+        if not await self.system.initialize():
+            raise RuntimeError("Не удалось инициализировать CloudSecuritySystem")
+
+    async def stop(self):
+        await self.system.cleanup()
+
+    async def handle(self, event: Dict[str, Any], stages: Any):
+        # Обработчик берет таймер этапов до первого await, поэтому
+        # подмена безопасна и при нескольких параллельных обработчиках
+        self._current = stages
+        await self.system._security_event_handler(SimpleNamespace(
+            event_type=event['event_type'],
+            source=event['source'],
+            severity=self.threat_level[event['severity']] if event['severity'] in self.threat_level.__members__
+            else event['severity'],
+            description=event['description'],
+            data=event['data'],
+            timestamp=event['timestamp'],
+        ))
+
+def _memory_tracker(every: int):
+    """Снятие RSS каждые every событий"""
+    curve: List[List[float]] = []
+
+    def track(processed: int):
+        if processed % every == 0:
+            curve.append([processed, round(get_process_rss_mb(), 2)])
+    return curve, track
+
+async def run_in_process(pipeline: Any, events: Iterable[Dict[str, Any]], stage_stats: StageStats,
+                         rate: Optional[float] = None, concurrency: int = 1,
+                         memory_every: int = 1000) -> Dict[str, Any]:
+    """Прогон событий через конвейер в текущем процессе"""
+    end_to_end = LatencySamples()
+    curve, track = _memory_tracker(memory_every)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+    processed = 0
+
+    async def worker():
+        nonlocal processed
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            start = time.perf_counter()
+            await pipeline.handle(event, stage_stats.timer())
+            end_to_end.add(time.perf_counter() - start)
+            processed += 1
+            track(processed)
+
+    await pipeline.start()
+    rss_start = get_process_rss_mb()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+
+    started = time.perf_counter()
+    for index, event in enumerate(events):
+        if rate:
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await queue.put(event)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - started
+
+    rss_end = get_process_rss_mb()
+    await pipeline.stop()
+    return {
+        'events': processed,
+        'elapsed_seconds': round(elapsed, 3),
+        'events_per_second': round(processed / max(elapsed, 1e-9), 1),
+        'end_to_end': end_to_end.summary(),
+        'stages': stage_stats.summary(),
+        'memory': {
+            'rss_start_mb': round(rss_start, 2),
+            'rss_end_mb': round(rss_end, 2),
+            'rss_growth_mb': round(rss_end - rss_start, 2),
+            'curve': curve,
+        },
+    }
+
+def run_http(base_url: str, events: Iterable[Dict[str, Any]], concurrency: int = 16,
+             timeout: float = 10.0) -> Dict[str, Any]:
+    """Прогон событий через POST {base_url}/events"""
+    end_to_end = LatencySamples()
+    errors = 0
+    url = base_url.rstrip('/') + '/events'
+
+    def post(event: Dict[str, Any]) -> float:
+        body = json.dumps(event, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    processed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(post, event) for event in events]:
+            try:
+                end_to_end.add(future.result())
+                processed += 1
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'events': processed,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'events_per_second': round(processed / max(elapsed, 1e-9), 1),
+        'end_to_end': end_to_end.summary(),
+    }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетических событий безопасности
+Смесь событий демо (подключения, файлы, DNS, CPU) с Zipf-распределением источников
+"""
+
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+# Доли типов событий по умолчанию
+DEFAULT_MIX = {
+    'suspicious_connection': 0.4,
+    'suspicious_dns_query': 0.3,
+    'suspicious_file_creation': 0.1,
+    'high_cpu_usage': 0.2,
+}
+
+MALICIOUS_IPS = ("91.121.28.34", "185.220.101.1", "45.33.32.156", "104.244.72.115")
+MALICIOUS_DOMAINS = ("iuqerfsodp9ifjaposdfjhgosurijfaewrwergwea.com", "pool.minexmr.com")
+MALICIOUS_HASHES = ("24d004a104d4d54034dbcffc2a4b19a11f39008a575aa614ea04703480b1022c", "d4e5f6a7b8c9")
+PROCESSES = ("explorer.exe", "svchost.exe", "chrome.exe", "python.exe", "xmrig.exe", "powershell.exe")
+BENIGN_DOMAINS = ("update.microsoft.com", "github.com", "pypi.org", "s3.amazonaws.com", "slack.com")
+PORTS = (22, 53, 80, 443, 445, 3389, 3333, 8080)
+
+class EventGenerator:
+    """Поток событий в формате демо (словари с source, event_type, severity, data)
+
+    Источники (хост и IP) выбираются по закону Зипфа: небольшое число
+    "шумных" хостов порождает большую часть событий, как в реальной сети.
+    Доля malicious_fraction событий ссылается на индикаторы из базы угроз.
+    """
+
+    def __init__(self, seed: int = 0, n_sources: int = 10000, zipf_exponent: float = 1.1,
+                 mix: Optional[Dict[str, float]] = None, malicious_fraction: float = 0.02,
+                 batch_size: int = 4096):
+        self.rng = np.random.default_rng(seed)
+        self.n_sources = n_sources
+        self.malicious_fraction = malicious_fraction
+        self.batch_size = batch_size
+
+        weights = 1.0 / np.arange(1, n_sources + 1) ** zipf_exponent
+        self.source_probabilities = weights / weights.sum()
+
+        mix = mix or DEFAULT_MIX
+        self.event_types = list(mix)
+        probabilities = np.array([mix[name] for name in self.event_types], dtype=np.float64)
+        self.type_probabilities = probabilities / probabilities.sum()
+        self.builders = {
+            'suspicious_connection': self._connection,
+            'suspicious_dns_query': self._dns_query,
+            'suspicious_file_creation': self._file_creation,
+            'high_cpu_usage': self._cpu_usage,
+        }
+
+    @staticmethod
+    def source_ip(rank: int) -> str:
+        return f"10.{(rank >> 16) & 255}.{(rank >> 8) & 255}.{rank & 255}"
+
+    def generate(self, count: int, rate: Optional[float] = None,
+                 start_time: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """count событий; при заданной частоте метки времени идут с шагом 1/rate"""
+        start_time = time.time() if start_time is None else start_time
+        produced = 0
+        while produced < count:
+            size = min(self.batch_size, count - produced)
+            sources = self.rng.choice(self.n_sources, size=size, p=self.source_probabilities)
+            types = self.rng.choice(len(self.event_types), size=size, p=self.type_probabilities)
+            malicious = self.rng.random(size) < self.malicious_fraction
+            noise = self.rng.random(size)
+
+            for i in range(size):
+                timestamp = start_time + produced / rate if rate else time.time()
+                event = self.builders[self.event_types[types[i]]](int(sources[i]), bool(malicious[i]), noise[i])
+                event['timestamp'] = timestamp
+                produced += 1
+                yield event
+
+    def _connection(self, rank: int, malicious: bool, noise: float) -> Dict[str, Any]:
+        target = MALICIOUS_IPS[int(noise * len(MALICIOUS_IPS))] if malicious else \
+            f"52.{int(noise * 255)}.{rank % 255}.{(rank * 7) % 255}"
+        return {
+            'source': 'network_monitor',
+            'event_type': 'suspicious_connection',
+            'severity': 'HIGH' if malicious else 'LOW',
+            'description': "Подозрительное подключение к известному вредоносному IP" if malicious
+                           else "Исходящее подключение",
+            'data': {
+                'source_ip': self.source_ip(rank),
+                'target_ip': target,
+                'source_host': f"workstation-{rank:05d}",
+                'connection_type': 'outbound_tcp',
+                'port': PORTS[int(noise * len(PORTS))],
+            },
+        }
+
+    def _dns_query(self, rank: int, malicious: bool, noise: float) -> Dict[str, Any]:
+        domain = MALICIOUS_DOMAINS[int(noise * len(MALICIOUS_DOMAINS))] if malicious else \
+            BENIGN_DOMAINS[int(noise * len(BENIGN_DOMAINS))]
+        return {
+            'source': 'dns_monitor',
+            'event_type': 'suspicious_dns_query',
+            'severity': 'HIGH' if malicious else 'INFO',
+            'description': f"DNS запрос к домену {domain}",
+            'data': {
+                'domain': domain,
+                'source_ip': self.source_ip(rank),
+                'source_host': f"workstation-{rank:05d}",
+                'query_type': 'A',
+            },
+        }
+
+    def _file_creation(self, rank: int, malicious: bool, noise: float) -> Dict[str, Any]:
+        extension = '.wncry' if malicious else ('.docx', '.pdf', '.tmp', '.log')[int(noise * 4)]
+        return {
+            'source': 'file_monitor',
+            'event_type': 'suspicious_file_creation',
+            'severity': 'CRITICAL' if malicious else 'LOW',
+            'description': f"Создан файл с расширением {extension}",
+            'data': {
+                'file_path': f"/tmp/document_{int(noise * 1e6)}{extension}",
+                'file_hash': MALICIOUS_HASHES[0] if malicious else f"{int(noise * 1e12):016x}",
+                'source_host': f"workstation-{rank:05d}",
+                'process_name': PROCESSES[int(noise * len(PROCESSES))],
+                'user': f"user{rank % 500}",
+            },
+        }
+
+    def _cpu_usage(self, rank: int, malicious: bool, noise: float) -> Dict[str, Any]:
+        return {
+            'source': 'system_monitor',
+            'event_type': 'high_cpu_usage',
+            'severity': 'MEDIUM' if malicious else 'LOW',
+            'description': "Обнаружена необычно высокая активность CPU",
+            'data': {
+                'source_host': f"workstation-{rank:05d}",
+                'cpu_usage': round(60 + 40 * noise, 1),
+                'process_name': 'xmrig.exe' if malicious else PROCESSES[int(noise * 4)],
+                'file_hash': MALICIOUS_HASHES[1] if malicious else None,
+                'memory_usage': f"{0.2 + 2 * noise:.1f} GB",
+            },
+        }
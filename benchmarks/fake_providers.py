@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Локальные заменители облачных провайдеров для бенчмарков
+Имитация задержек и ошибок облачных API без сетевых вызовов
+"""
+
+import asyncio
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+class FakeCloudManager:
+    """Заменитель CloudIntegrationManager с настраиваемой задержкой API
+
+    Реализует методы, которые CloudSecuritySystem вызывает у менеджера
+    облачных интеграций; каждый вызов "провайдера" ждет latency секунд
+    и с вероятностью error_rate завершается ошибкой.
+    """
+
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0, seed: Optional[int] = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.providers: Dict[str, Any] = {}
+        self.calls: Counter = Counter()
+        self.blocked_ips: List[str] = []
+
+    async def _call(self, provider: str, operation: str) -> Dict[str, Any]:
+        self.calls[operation] += 1
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.error_rate:
+            return {'success': False, 'error': f"{provider}: имитация ошибки API"}
+        return {'success': True}
+
+    async def add_provider(self, provider: Any) -> bool:
+        self.providers[getattr(provider, 'name', str(provider))] = provider
+        return True
+
+    def list_providers(self) -> List[str]:
+        return list(self.providers)
+
+    async def block_ip_across_providers(self, ip: str, reason: str) -> Dict[str, Any]:
+        self.blocked_ips.append(ip)
+        names = self.list_providers() or ['fake']
+        results = await asyncio.gather(*(self._call(name, 'block_ip') for name in names))
+        return dict(zip(names, results))
+
+    async def get_all_security_status(self) -> Dict[str, Any]:
+        names = self.list_providers() or ['fake']
+        results = await asyncio.gather(*(self._call(name, 'security_status') for name in names))
+        return {'providers': dict(zip(names, results))}
+
+    async def cleanup(self):
+        pass
+
+class FakeAlertSink:
+    """Заменитель получателя оповещений (без синтеза речи)"""
+
+    def __init__(self):
+        self.alerts: List[str] = []
+
+    def __call__(self, text: str):
+        self.alerts.append(text)
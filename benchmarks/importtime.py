@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Проверка времени импорта по -X importtime
+Код возврата 1, если суммарное время импорта превышает бюджет или импортирован
+запрещенный тяжелый модуль (ML фреймворки и SDK провайдеров при холодном старте)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Модули, которые не должны импортироваться при импорте main
+HEAVY_MODULES = (
+    'torch', 'stable_baselines3', 'gymnasium', 'optuna', 'boto3', 'botocore', 'azure',
+    'google.cloud', 'kubernetes', 'docker', 'nltk', 'tensorflow', 'sklearn',
+)
+
+def measure_import(module: str, env: Dict[str, str] = None) -> Dict[str, Any]:
+    """Импорт модуля в отдельном интерпретаторе с -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT, env={**os.environ, **(env or {})}
+    )
+
+    modules: List[Dict[str, Any]] = []
+    errors = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        modules.append({'module': parts[2], 'self_us': int(parts[0]), 'cumulative_us': int(parts[1])})
+
+    return {
+        'ok': result.returncode == 0,
+        'error': '\n'.join(errors[-5:]) if result.returncode else None,
+        'total_ms': round(sum(item['self_us'] for item in modules) / 1000, 2),
+        'modules': modules,
+    }
+
+def check(report: Dict[str, Any], budget_ms: float, forbidden=HEAVY_MODULES, top: int = 15) -> Dict[str, Any]:
+    """Сравнение с бюджетом и поиск запрещенных модулей"""
+    imported = {item['module'] for item in report['modules']}
+    heavy = sorted(name for name in imported
+                   if any(name == prefix or name.startswith(prefix + '.') for prefix in forbidden))
+    slowest = sorted(report['modules'], key=lambda item: item['self_us'], reverse=True)[:top]
+    return {
+        'ok': report['ok'],
+        'error': report['error'],
+        'total_ms': report['total_ms'],
+        'budget_ms': budget_ms,
+        'within_budget': report['total_ms'] <= budget_ms,
+        'heavy_modules': heavy,
+        'slowest_self_ms': {item['module']: round(item['self_us'] / 1000, 2) for item in slowest},
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бюджет времени импорта при холодном старте")
+    parser.add_argument("--module", default="main", help="Импортируемый модуль")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--allow-heavy", action="store_true", help="Не проверять тяжелые модули")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    result = check(measure_import(args.module), args.budget_ms,
+                   forbidden=() if args.allow_heavy else HEAVY_MODULES, top=args.top)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if not result['ok']:
+        return 2
+    return 0 if result['within_budget'] and not result['heavy_modules'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Запуск нагрузочного теста пути обработки событий
+Результат в JSON для сравнения между коммитами (см. benchmarks/compare.py)
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.drivers import CorePipeline, StageStats, SystemPipeline, run_http, run_in_process
+from benchmarks.events import EventGenerator
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Прогон выбранного драйвера и сбор результата"""
+    generator = EventGenerator(seed=args.seed, n_sources=args.sources, zipf_exponent=args.zipf,
+                               malicious_fraction=args.malicious_fraction)
+    events = generator.generate(args.events, rate=args.rate)
+
+    if args.driver == 'http':
+        result = run_http(args.base_url, events, concurrency=args.concurrency)
+    else:
+        stage_stats = StageStats()
+        if args.driver == 'system':
+            pipeline = SystemPipeline(stage_stats, cloud_latency=args.cloud_latency)
+        else:
+            pipeline = CorePipeline()
+        result = asyncio.run(run_in_process(pipeline, events, stage_stats, rate=args.rate,
+                                            concurrency=args.concurrency))
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'driver': args.driver,
+            'events': args.events,
+            'rate': args.rate,
+            'concurrency': args.concurrency,
+            'sources': args.sources,
+            'zipf': args.zipf,
+            'seed': args.seed,
+        },
+        'results': result,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест пути обработки событий")
+    parser.add_argument("--driver", choices=['core', 'system', 'http'], default='core',
+                        help="core - этапы ядра, system - полный CloudSecuritySystem, http - через API")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=None, help="Событий в секунду (по умолчанию без ограничения)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--sources", type=int, default=10000, help="Число хостов-источников")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Показатель распределения Зипфа источников")
+    parser.add_argument("--malicious-fraction", type=float, default=0.02)
+    parser.add_argument("--cloud-latency", type=float, default=0.05, help="Задержка заменителя облачных API, с")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для сохранения результата JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    print(text)
+
+if __name__ == "__main__":
+    main()
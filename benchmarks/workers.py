@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Масштабирование чтения общего состояния по числу рабочих процессов API
+Рабочие процессы делят порт (SO_REUSEPORT) и отвечают на GET /status снимком
+ведущего из общего хранилища, POST /events ставит событие в очередь ведущему
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core.shared_state import SharedState, create_state_backend
+from core.status_snapshots import StatusBoard
+
+class _ReusePortServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def _serve(port: int, state_url: str):
+    """Рабочий процесс: путь обслуживания запросов не ведущим процессом"""
+    shared_state = SharedState(create_state_backend(state_url))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body: bytes = b'', headers: Dict[str, str] = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            snapshot = shared_state.get_snapshot('combined')
+            if snapshot is None:
+                self._reply(503)
+            elif snapshot.matches(self.headers.get('If-None-Match')):
+                self._reply(304, headers={'ETag': snapshot.etag})
+            else:
+                self._reply(200, snapshot.body, {'ETag': snapshot.etag, 'Content-Type': 'application/json'})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            shared_state.enqueue_events([json.loads(body)])
+            self._reply(202)
+
+    _ReusePortServer(('127.0.0.1', port), Handler).serve_forever()
+
+def _client(port: int, method: str, duration: float, results):
+    """Клиент с постоянным соединением: число запросов и суммарная задержка"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    body = json.dumps({'source': 'benchmark', 'event_type': 'high_cpu_usage', 'severity': 'LOW',
+                       'description': 'benchmark', 'data': {'source_host': 'workstation-00001'}})
+    count = errors = 0
+    latency = 0.0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if method == 'POST':
+                connection.request('POST', '/events', body, {'Content-Type': 'application/json'})
+            else:
+                connection.request('GET', '/status')
+            connection.getresponse().read()
+            count += 1
+            latency += time.perf_counter() - start
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    results.put((count, errors, latency))
+
+def _seed(state_url: str):
+    """Публикация снимка статуса, как это делает ведущий процесс"""
+    board = StatusBoard()
+    for name in ('runtime', 'monitor', 'ml', 'blockchain', 'ai', 'cloud', 'events'):
+        board.register(name, lambda name=name: {
+            f"{name}_status": {f"metric_{i}": i * 1.5 for i in range(40)}
+        })
+    shared_state = SharedState(create_state_backend(state_url))
+    shared_state.publish_snapshots([board.get(name) for name in board.names()] + [board.combined()])
+    shared_state.close()
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Рабочие процессы не начали слушать порт {port}")
+
+def run_scaling(worker_counts: List[int], clients: int, duration: float, method: str,
+                state_url: str, port: int) -> List[Dict[str, Any]]:
+    """Пропускная способность для каждого числа рабочих процессов"""
+    _seed(state_url)
+    rows = []
+    for workers in worker_counts:
+        servers = [multiprocessing.Process(target=_serve, args=(port, state_url), daemon=True)
+                   for _ in range(workers)]
+        for server in servers:
+            server.start()
+        try:
+            _wait_for_port(port)
+            results = multiprocessing.Queue()
+            client_processes = [multiprocessing.Process(target=_client, args=(port, method, duration, results))
+                                for _ in range(clients)]
+            for process in client_processes:
+                process.start()
+            totals = [results.get() for _ in client_processes]
+            for process in client_processes:
+                process.join()
+        finally:
+            for server in servers:
+                server.terminate()
+                server.join()
+
+        requests = sum(count for count, _, _ in totals)
+        rows.append({
+            'workers': workers,
+            'requests': requests,
+            'errors': sum(errors for _, errors, _ in totals),
+            'requests_per_second': round(requests / duration, 1),
+            'mean_latency_ms': round(sum(latency for _, _, latency in totals) / max(requests, 1) * 1000, 3),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Масштабирование API по числу рабочих процессов")
+    parser.add_argument("--workers", default="1,2,4", help="Числа рабочих процессов через запятую")
+    parser.add_argument("--clients", type=int, default=8, help="Клиентских процессов")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--method", choices=['GET', 'POST'], default='GET',
+                        help="GET /status из снимка или POST /events в очередь ведущему")
+    parser.add_argument("--state-url", default=None,
+                        help="URL общего состояния (по умолчанию временный файл SQLite)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    state_url = args.state_url or f"file://{os.path.join(tempfile.mkdtemp(), 'shared_state.db')}"
+    rows = run_scaling([int(n) for n in args.workers.split(',')], args.clients, args.duration,
+                       args.method, state_url, args.port)
+    print(json.dumps({'cpu_count': os.cpu_count(), 'state_url': state_url, 'method': args.method,
+                      'results': rows}, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Кластерный режим Cloud Security System
+Узлы шардов, координатор якорных блоков и локальный запуск кластера из нескольких процессов
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from config import config
+from core.sharding import ShardCoordinator, ShardNode, ShardRouter, parse_nodes, serve_node
+
+logger = logging.getLogger(__name__)
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_node(args) -> int:
+    """Узел шарда до получения SIGTERM/SIGINT"""
+    node = ShardNode(args.shard_id, args.data_dir, config.cluster.block_size, config.correlation)
+    server = serve_node(node, args.host, args.port)
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info(f"Узел {args.shard_id} слушает http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        node.close()
+    return 0
+
+def run_coordinator(args) -> int:
+    """Координатор: якорный блок каждые interval секунд"""
+    coordinator = ShardCoordinator(parse_nodes(args.nodes), args.anchor_path, args.interval)
+    coordinator.start()
+    logger.info(f"Координатор запущен: {len(coordinator.nodes)} узлов, интервал {args.interval} с")
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    coordinator.stop()
+    coordinator.anchor_once()
+    return 0
+
+def _wait_for_nodes(nodes: dict, timeout: float = 15.0):
+    import urllib.request
+    deadline = time.time() + timeout
+    for url in nodes.values():
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/head", timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"Узел {url} не запустился")
+                time.sleep(0.1)
+
+def run_local(args) -> int:
+    """Локальный кластер: узлы в отдельных процессах, маршрутизация синтетических событий"""
+    from benchmarks.events import EventGenerator
+
+    nodes = {f"shard-{i}": f"http://127.0.0.1:{args.base_port + i}" for i in range(args.nodes)}
+    processes = [
+        subprocess.Popen([sys.executable, __file__, "node", "--shard-id", shard,
+                          "--port", str(args.base_port + i), "--data-dir", args.data_dir])
+        for i, shard in enumerate(nodes)
+    ]
+    try:
+        _wait_for_nodes(nodes)
+        router = ShardRouter(nodes, config.cluster.virtual_nodes, config.cluster.route_batch_size)
+        coordinator = ShardCoordinator(nodes, os.path.join(args.data_dir, "anchor_chain.jsonl"))
+
+        started = time.perf_counter()
+        anchors = []
+        for index, event in enumerate(EventGenerator(seed=args.seed).generate(args.events)):
+            router.route(event)
+            if args.anchor_every and (index + 1) % args.anchor_every == 0:
+                router.flush()
+                anchors.append(coordinator.anchor_once())
+        router.close()
+        anchors.append(coordinator.anchor_once())
+        elapsed = time.perf_counter() - started
+
+        print(json.dumps({
+            'nodes': args.nodes,
+            'events': args.events,
+            'elapsed_seconds': round(elapsed, 3),
+            'events_per_second': round(args.events / elapsed, 1),
+            'routed': dict(router.routed),
+            'route_errors': router.errors,
+            'anchors': len([anchor for anchor in anchors if anchor]),
+            'anchor_chain': coordinator.chain.verify(),
+            'shards_match_anchor': coordinator.verify_shards(),
+        }, indent=2, ensure_ascii=False))
+        return 0 if not router.errors else 1
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+def main() -> int:
+    logging.basicConfig(level=getattr(logging, config.system.log_level.upper()),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Кластерный режим: шардирование событий по хосту/IP источника")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    node = commands.add_parser("node", help="Узел шарда")
+    node.add_argument("--shard-id", default=config.cluster.shard_id)
+    node.add_argument("--host", default="127.0.0.1")
+    node.add_argument("--port", type=int, default=8101)
+    node.add_argument("--data-dir", default=config.cluster.data_dir)
+
+    coordinator = commands.add_parser("coordinator", help="Координатор якорных блоков")
+    coordinator.add_argument("--nodes", default=config.cluster.nodes,
+                             help="shard-0=http://host:8101,shard-1=http://host:8102")
+    coordinator.add_argument("--interval", type=float, default=config.cluster.anchor_interval)
+    coordinator.add_argument("--anchor-path", default=config.cluster.anchor_path)
+
+    local = commands.add_parser("local", help="Локальный кластер из нескольких процессов")
+    local.add_argument("--nodes", type=int, default=3)
+    local.add_argument("--events", type=int, default=20000)
+    local.add_argument("--anchor-every", type=int, default=5000, help="Якорный блок каждые N событий")
+    local.add_argument("--base-port", type=int, default=8101)
+    local.add_argument("--data-dir", default=config.cluster.data_dir)
+    local.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    return {"node": run_node, "coordinator": run_coordinator, "local": run_local}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,11 +13,34 @@ class MLConfig:
     """Конфигурация машинного обучения"""
     auto_optimization: bool = True
     rl_training_steps: int = 10000
+    rl_n_envs: int = 8
+    rl_vec_env: str = "batched"
+    rl_policy_path: str = "models/security_agent_policy.npz"
+    online_learning: bool = True
+    online_update_interval: int = 300
+    online_buffer_size: int = 10000
+    online_batch_size: int = 64
+    drift_threshold: float = 0.2
+    anomaly_index_capacity: int = 100000
+    anomaly_index_max_age: int = 604800
+    anomaly_lsh_tables: int = 8
+    anomaly_lsh_bits: int = 14
     ga_population_size: int = 100
     ga_mutation_rate: float = 0.1
     ga_crossover_rate: float = 0.8
     model_save_path: str = "models/"
     results_save_path: str = "results/"
+    feature_hash_buckets: int = 32
+    feature_entity_window: int = 64
+    feature_max_entities: int = 10000
+    model_memory_budget_mb: float = 1024.0
+    model_idle_unload_seconds: int = 3600
+    parallel_optimization: bool = False
+    optimization_objective: str = ""
+    optimization_workers: int = 4
+    optimization_trials: int = 100
+    optimization_budget_seconds: int = 900
+    optimization_journal: str = "results/optuna_journal.log"
 
 @dataclass
 class QuantumCryptoConfig:
@@ -38,6 +61,16 @@ class BlockchainConfig:
     blockchain_file: str = "security_blockchain.json"
     db_path: str = "security_events.db"
     backup_path: str = "backup/"
+    wal_enabled: bool = True
+    wal_dir: str = "data/blockchain_wal/"
+    wal_commit_interval: float = 0.01
+    wal_memory_limit: int = 10000
+    wal_segment_mb: int = 64
+    wal_poll_interval: float = 1.0
+    seal_interval: float = 0.0
+    export_format: str = "ndjson"
+    export_compression: str = "gzip"
+    export_chunk_blocks: int = 64
 
 @dataclass
 class AIConfig:
@@ -48,7 +81,22 @@ class AIConfig:
     voice_rate: int = 150
     voice_volume: float = 0.8
     openai_api_key: str = ""
+    openai_base_url: str = ""
+    openai_model: str = "gpt-3.5-turbo"
+    chat_timeout: float = 20.0
+    chat_max_concurrency: int = 4
+    response_cache_ttl: float = 300.0
+    response_cache_size: int = 1024
     max_conversation_history: int = 50
+    max_conversation_users: int = 1000
+    conversation_spill_path: str = "data/conversations.db"
+    context_token_budget: int = 3000
+    intent_index_path: str = "models/intent_index.joblib"
+    intent_cache_size: int = 4096
+    nltk_corpora: str = "punkt,stopwords,wordnet"
+    preload_components: bool = False
+    alert_coalesce_window: float = 60.0
+    alert_queue_size: int = 50
 
 @dataclass
 class CloudConfig:
@@ -59,9 +107,19 @@ class CloudConfig:
     gcp_project_id: str = ""
     kubernetes_config_path: str = ""
     docker_socket: str = "unix://var/run/docker.sock"
+    # Подключаемые провайдеры: SDK остальных не импортируются
+    providers: str = "aws,azure,kubernetes,docker"
     connection_timeout: int = 30
     retry_attempts: int = 3
 
+@dataclass
+class ModulesConfig:
+    """Включение подсистем: модули отключенных подсистем не импортируются"""
+    advanced_ml: bool = True
+    quantum_crypto: bool = True
+    ai_assistant: bool = True
+    cloud_integrations: bool = True
+
 @dataclass
 class SecurityConfig:
     """Конфигурация безопасности"""
@@ -72,6 +130,52 @@ class SecurityConfig:
     mfa_enabled: bool = True
     audit_logging: bool = True
 
+@dataclass
+class CorrelationConfig:
+    """Конфигурация корреляции инцидентов"""
+    enabled: bool = True
+    session_gap_seconds: float = 900.0
+    max_session_seconds: float = 14400.0
+    incident_idle_seconds: float = 86400.0
+    max_entities: int = 100000
+    max_incidents: int = 10000
+    max_events_per_incident: int = 500
+    snapshot_path: str = "data/correlation_state.json"
+    snapshot_interval: int = 300
+
+@dataclass
+class EventFilterConfig:
+    """Конфигурация дедупликации и ограничения частоты событий"""
+    enabled: bool = True
+    suppression_window_seconds: float = 300.0
+    max_fingerprints: int = 50000
+    flush_interval: int = 60
+    # Лимиты (токенов в секунду, емкость корзины) на тип события
+    emergency_alert_rate: float = 0.1
+    emergency_alert_burst: float = 5.0
+    block_ip_rate: float = 1.0
+    block_ip_burst: float = 10.0
+
+    def get_rate_limits(self) -> Dict[str, Any]:
+        """Лимиты частоты для дорогих действий"""
+        return {
+            'emergency_alert': (self.emergency_alert_rate, self.emergency_alert_burst),
+            'block_ip': (self.block_ip_rate, self.block_ip_burst),
+        }
+
+@dataclass
+class ClusterConfig:
+    """Конфигурация шардирования обработки событий по узлам"""
+    shard_id: str = "shard-0"
+    # Узлы кластера: "shard-0=http://host:8101,shard-1=http://host:8102"
+    nodes: str = ""
+    virtual_nodes: int = 128
+    block_size: int = 100
+    route_batch_size: int = 200
+    anchor_interval: float = 60.0
+    anchor_path: str = "data/anchor_chain.jsonl"
+    data_dir: str = "data/shards/"
+
 @dataclass
 class SystemConfig:
     """Общая конфигурация системы"""
@@ -83,6 +187,19 @@ class SystemConfig:
     max_workers: int = 4
     data_dir: str = "data/"
     temp_dir: str = "temp/"
+    status_max_age: float = 5.0
+    metrics_enabled: bool = False
+    metrics_port: int = 9100
+    tracing_enabled: bool = False
+    trace_buffer_size: int = 1000
+    profiler_interval: float = 0.005
+    api_workers: int = 1
+    shared_state_backend: str = "redis"
+    shared_state_path: str = "data/shared_state.db"
+    shared_state_interval: float = 1.0
+    leader_lease_seconds: float = 15.0
+    init_timeout: float = 60.0
+    init_step_timeout: float = 30.0
 
 class Config:
     """Основной класс конфигурации"""
@@ -97,7 +214,11 @@ class Config:
         self.blockchain = BlockchainConfig()
         self.ai = AIConfig()
         self.cloud = CloudConfig()
+        self.modules = ModulesConfig()
         self.security = SecurityConfig()
+        self.correlation = CorrelationConfig()
+        self.event_filter = EventFilterConfig()
+        self.cluster = ClusterConfig()
         self.system = SystemConfig()
         
         # Применение переменных окружения
@@ -119,7 +240,15 @@ class Config:
         # ML конфигурация
         self.ml.auto_optimization = os.getenv('ML_AUTO_OPTIMIZATION', 'true').lower() == 'true'
         self.ml.rl_training_steps = int(os.getenv('RL_TRAINING_STEPS', '10000'))
+        self.ml.online_learning = os.getenv('ML_ONLINE_LEARNING', 'true').lower() == 'true'
+        self.ml.rl_n_envs = int(os.getenv('RL_N_ENVS', '8'))
+        self.ml.rl_vec_env = os.getenv('RL_VEC_ENV', 'batched')
         self.ml.ga_population_size = int(os.getenv('GA_POPULATION_SIZE', '100'))
+        self.ml.model_memory_budget_mb = float(os.getenv('MODEL_MEMORY_BUDGET_MB', '1024'))
+        self.ml.parallel_optimization = os.getenv('ML_PARALLEL_OPTIMIZATION', 'false').lower() == 'true'
+        self.ml.optimization_objective = os.getenv('ML_OPTIMIZATION_OBJECTIVE', '')
+        self.ml.optimization_workers = int(os.getenv('ML_OPTIMIZATION_WORKERS', '4'))
+        self.ml.optimization_budget_seconds = int(os.getenv('ML_OPTIMIZATION_BUDGET', '900'))
         
         # Квантовое шифрование
         self.quantum_crypto.default_algorithm = os.getenv('QUANTUM_CRYPTO_ALGORITHM', 'lattice')
@@ -127,25 +256,79 @@ class Config:
         # Блокчейн
         self.blockchain.max_events_per_block = int(os.getenv('MAX_EVENTS_PER_BLOCK', '100'))
         self.blockchain.difficulty = int(os.getenv('BLOCKCHAIN_DIFFICULTY', '4'))
+        self.blockchain.wal_enabled = os.getenv('BLOCKCHAIN_WAL_ENABLED', 'true').lower() == 'true'
+        self.blockchain.wal_dir = os.getenv('BLOCKCHAIN_WAL_DIR', self.blockchain.wal_dir)
+        self.blockchain.wal_commit_interval = float(os.getenv('BLOCKCHAIN_WAL_COMMIT_INTERVAL', '0.01'))
+        self.blockchain.wal_memory_limit = int(os.getenv('BLOCKCHAIN_WAL_MEMORY_LIMIT', '10000'))
+        self.blockchain.seal_interval = float(os.getenv('BLOCKCHAIN_SEAL_INTERVAL', '0'))
+        self.blockchain.export_format = os.getenv('BLOCKCHAIN_EXPORT_FORMAT', 'ndjson')
+        self.blockchain.export_compression = os.getenv('BLOCKCHAIN_EXPORT_COMPRESSION', 'gzip')
         
         # AI ассистент
         self.ai.voice_enabled = os.getenv('VOICE_ENABLED', 'true').lower() == 'true'
         self.ai.chat_enabled = os.getenv('CHAT_ENABLED', 'true').lower() == 'true'
         self.ai.openai_api_key = os.getenv('OPENAI_API_KEY', '')
+        self.ai.openai_base_url = os.getenv('OPENAI_BASE_URL', '')
+        self.ai.openai_model = os.getenv('OPENAI_MODEL', self.ai.openai_model)
+        self.ai.chat_timeout = float(os.getenv('CHAT_TIMEOUT', '20'))
+        self.ai.chat_max_concurrency = int(os.getenv('CHAT_MAX_CONCURRENCY', '4'))
+        self.ai.response_cache_ttl = float(os.getenv('CHAT_RESPONSE_CACHE_TTL', '300'))
+        self.ai.nltk_corpora = os.getenv('NLTK_CORPORA', self.ai.nltk_corpora)
+        self.ai.preload_components = os.getenv('AI_PRELOAD_COMPONENTS', 'false').lower() == 'true'
+        self.ai.alert_coalesce_window = float(os.getenv('ALERT_COALESCE_WINDOW', '60'))
+        self.ai.alert_queue_size = int(os.getenv('ALERT_QUEUE_SIZE', '50'))
+        self.ai.max_conversation_users = int(os.getenv('MAX_CONVERSATION_USERS', '1000'))
+        self.ai.conversation_spill_path = os.getenv('CONVERSATION_SPILL_PATH', self.ai.conversation_spill_path)
+        self.ai.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
         
         # Облачные интеграции
         self.cloud.aws_access_key = os.getenv('AWS_ACCESS_KEY', '')
         self.cloud.aws_secret_key = os.getenv('AWS_SECRET_KEY', '')
         self.cloud.azure_subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID', '')
         self.cloud.gcp_project_id = os.getenv('GCP_PROJECT_ID', '')
+        self.cloud.providers = os.getenv('CLOUD_PROVIDERS', self.cloud.providers)
+        
+        # Подсистемы
+        self.modules.advanced_ml = os.getenv('ENABLE_ADVANCED_ML', 'true').lower() == 'true'
+        self.modules.quantum_crypto = os.getenv('ENABLE_QUANTUM_CRYPTO', 'true').lower() == 'true'
+        self.modules.ai_assistant = os.getenv('ENABLE_AI_ASSISTANT', 'true').lower() == 'true'
+        self.modules.cloud_integrations = os.getenv('ENABLE_CLOUD_INTEGRATIONS', 'true').lower() == 'true'
         
         # Безопасность
         self.security.jwt_secret = os.getenv('JWT_SECRET', '')
         self.security.mfa_enabled = os.getenv('MFA_ENABLED', 'true').lower() == 'true'
         
+        # Корреляция инцидентов
+        self.correlation.enabled = os.getenv('CORRELATION_ENABLED', 'true').lower() == 'true'
+        self.correlation.session_gap_seconds = float(os.getenv('CORRELATION_SESSION_GAP', '900'))
+        self.correlation.snapshot_path = os.getenv('CORRELATION_SNAPSHOT_PATH', 'data/correlation_state.json')
+        
+        # Фильтрация событий
+        self.event_filter.enabled = os.getenv('EVENT_FILTER_ENABLED', 'true').lower() == 'true'
+        self.event_filter.suppression_window_seconds = float(os.getenv('EVENT_SUPPRESSION_WINDOW', '300'))
+        
+        # Кластер
+        self.cluster.shard_id = os.getenv('CLUSTER_SHARD_ID', self.cluster.shard_id)
+        self.cluster.nodes = os.getenv('CLUSTER_NODES', '')
+        self.cluster.anchor_interval = float(os.getenv('ANCHOR_INTERVAL', '60'))
+        self.cluster.data_dir = os.getenv('CLUSTER_DATA_DIR', self.cluster.data_dir)
+        
         # Система
         self.system.log_level = os.getenv('LOG_LEVEL', 'INFO')
         self.system.debug_mode = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+        self.system.status_max_age = float(os.getenv('STATUS_MAX_AGE', '5'))
+        self.system.metrics_enabled = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+        self.system.metrics_port = int(os.getenv('METRICS_PORT', '9100'))
+        self.system.tracing_enabled = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+        self.system.trace_buffer_size = int(os.getenv('TRACE_BUFFER_SIZE', '1000'))
+        self.system.profiler_interval = float(os.getenv('PROFILER_INTERVAL', '0.005'))
+        self.system.api_workers = int(os.getenv('API_WORKERS', '1'))
+        self.system.shared_state_backend = os.getenv('SHARED_STATE_BACKEND', 'redis')
+        self.system.shared_state_path = os.getenv('SHARED_STATE_PATH', self.system.shared_state_path)
+        self.system.leader_lease_seconds = float(os.getenv('LEADER_LEASE_SECONDS', '15'))
+        self.system.shared_state_interval = float(os.getenv('SHARED_STATE_INTERVAL', '1.0'))
+        self.system.init_timeout = float(os.getenv('INIT_TIMEOUT', '60'))
+        self.system.init_step_timeout = float(os.getenv('INIT_STEP_TIMEOUT', '30'))
     
     def get_database_url(self) -> str:
         """Получение URL базы данных"""
@@ -185,6 +368,18 @@ class Config:
         else:
             return f"redis://{host}:{port}/{db}"
     
+    def get_shared_state_url(self) -> str:
+        """URL общего состояния рабочих процессов API (Redis или файл SQLite)"""
+        if self.system.shared_state_backend == 'file':
+            return f"file://{self.system.shared_state_path}"
+        return self.get_redis_url()
+    
+    def get_enabled_providers(self) -> list:
+        """Типы подключаемых облачных провайдеров"""
+        if not self.modules.cloud_integrations:
+            return []
+        return [name.strip().lower() for name in self.cloud.providers.split(',') if name.strip()]
+    
     def get_cloud_credentials(self, provider: str) -> Dict[str, Any]:
         """Получение учетных данных облачного провайдера"""
         if provider.lower() == 'aws':
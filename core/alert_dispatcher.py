@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Диспетчер экстренных оповещений
+Очередь с приоритетом по критичности, объединение повторов и синтез речи в отдельном потоке
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_PRIORITY = {
+    'critical': 4,
+    'high': 3,
+    'medium': 2,
+    'low': 1,
+    'info': 0,
+}
+
+def severity_priority(severity: Any) -> int:
+    """Числовой приоритет уровня угрозы (ThreatLevel, строка или число)"""
+    value = getattr(severity, 'value', severity)
+    if isinstance(value, (int, float)):
+        return int(value)
+    name = str(value).lower()
+    if name not in SEVERITY_PRIORITY:
+        name = str(getattr(severity, 'name', name)).lower()
+    return SEVERITY_PRIORITY.get(name, 0)
+
+class Alert:
+    """Оповещение в очереди"""
+
+    __slots__ = ('key', 'message', 'priority', 'count', 'created')
+
+    def __init__(self, key: str, message: str, priority: int, now: float):
+        self.key = key
+        self.message = message
+        self.priority = priority
+        self.count = 1
+        self.created = now
+
+    @property
+    def text(self) -> str:
+        if self.count > 1:
+            return f"{self.message} (повторено {self.count} раз)"
+        return self.message
+
+class AlertDispatcher:
+    """Неблокирующая рассылка экстренных оповещений
+
+    submit() только кладет оповещение в очередь и никогда не ждет синтеза
+    речи. Рабочий поток забирает оповещения в порядке критичности и
+    рассылает их получателям; движок синтеза речи создается и используется
+    только в этом потоке. Одинаковые оповещения, ожидающие в очереди или
+    озвученные в пределах окна, объединяются в одно со счетчиком повторов.
+    При переполнении очереди вытесняется наименее критичное оповещение.
+    """
+
+    def __init__(self, speaker: Optional[Callable[[], Any]] = None, coalesce_window: float = 60.0,
+                 max_queued: int = 50, max_recent: int = 1000):
+        self.speaker = speaker
+        self.coalesce_window = coalesce_window
+        self.max_queued = max_queued
+        self.max_recent = max_recent
+        self.sinks: List[Callable[[str], Any]] = []
+
+        self._heap: List[Tuple[int, int, Alert]] = []
+        self._pending: Dict[str, Alert] = {}
+        self._recent: 'OrderedDict[str, float]' = OrderedDict()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.stats = {
+            'submitted': 0,
+            'delivered': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'sink_errors': 0,
+        }
+
+    def add_sink(self, sink: Callable[[str], Any]):
+        """Добавление получателя оповещений (вызывается в рабочем потоке)"""
+        self.sinks.append(sink)
+
+    def start(self):
+        """Запуск рабочего потока"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Остановка рабочего потока (оставшиеся оповещения отбрасываются)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, message: str, severity: Any = 'high', key: Optional[str] = None) -> str:
+        """Постановка оповещения в очередь: queued, coalesced или dropped"""
+        key = key or message
+        priority = severity_priority(severity)
+        now = time.monotonic()
+
+        with self._condition:
+            self.stats['submitted'] += 1
+
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.count += 1
+                if priority > pending.priority:
+                    pending.priority = priority
+                    self._push(pending)
+                self.stats['coalesced'] += 1
+                return 'coalesced'
+
+            spoken_at = self._recent.get(key)
+            if spoken_at is not None and now - spoken_at < self.coalesce_window:
+                self.stats['coalesced'] += 1
+                return 'coalesced'
+
+            if len(self._pending) >= self.max_queued:
+                weakest = min(self._pending.values(), key=lambda alert: (alert.priority, -alert.created))
+                if weakest.priority >= priority:
+                    self.stats['dropped'] += 1
+                    return 'dropped'
+                del self._pending[weakest.key]
+                self.stats['dropped'] += 1
+
+            alert = Alert(key, message, priority, now)
+            self._pending[key] = alert
+            self._push(alert)
+            self._condition.notify()
+            return 'queued'
+
+    def _push(self, alert: Alert):
+        """Добавление записи в кучу (устаревшие записи пропускаются при извлечении)"""
+        heapq.heappush(self._heap, (-alert.priority, next(self._sequence), alert))
+        if len(self._heap) > 4 * max(self.max_queued, 1):
+            self._heap = [(-a.priority, next(self._sequence), a) for a in self._pending.values()]
+            heapq.heapify(self._heap)
+
+    def _pop(self) -> Optional[Alert]:
+        """Извлечение самого критичного актуального оповещения"""
+        while self._heap:
+            priority, _, alert = heapq.heappop(self._heap)
+            if self._pending.get(alert.key) is alert and -priority == alert.priority:
+                del self._pending[alert.key]
+                return alert
+        return None
+
+    def _run(self):
+        """Цикл рабочего потока"""
+        while True:
+            with self._condition:
+                alert = self._pop()
+                while alert is None and self._running:
+                    self._condition.wait()
+                    alert = self._pop()
+                if not self._running:
+                    return
+
+                # Повторы, поступившие во время озвучивания, тоже объединяются
+                self._recent[alert.key] = time.monotonic()
+                self._recent.move_to_end(alert.key)
+                while len(self._recent) > self.max_recent:
+                    self._recent.popitem(last=False)
+
+            self._deliver(alert)
+
+    def _deliver(self, alert: Alert):
+        """Рассылка оповещения получателям"""
+        text = alert.text
+        if self.speaker is not None:
+            try:
+                engine = self.speaker()
+                if engine is not None:
+                    engine.say(text)
+                    engine.runAndWait()
+            except Exception as e:
+                self.stats['sink_errors'] += 1
+                logger.error(f"Ошибка синтеза речи оповещения: {e}")
+
+        for sink in self.sinks:
+            try:
+                sink(text)
+            except Exception as e:
+                self.stats['sink_errors'] += 1
+                logger.error(f"Ошибка доставки оповещения: {e}")
+
+        self.stats['delivered'] += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса очереди оповещений"""
+        with self._condition:
+            queued = len(self._pending)
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': queued,
+            'max_queued': self.max_queued,
+            **self.stats,
+        }
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Приближенный поиск ближайших соседей для оценки аномальности событий
+LSH на случайных проекциях поверх кольцевого буфера векторов признаков
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class LSHIndex:
+    """Индекс LSH на случайных гиперплоскостях с вытеснением по времени
+
+    Векторы хранятся в заранее выделенном кольцевом буфере в порядке
+    вставки, поэтому самые старые векторы вытесняются первыми (по емкости
+    или по возрасту). Кандидаты из корзин всех таблиц переранжируются
+    по точному евклидову расстоянию.
+
+    Удаление из корзин ленивое: мертвые слоты отфильтровываются при запросе,
+    а переиспользованный слот в чужой корзине лишь добавляет кандидата,
+    который отсеивается точным переранжированием. Корзины перестраиваются,
+    когда доля устаревших записей велика.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1_000_000, n_tables: int = 8, n_bits: int = 14,
+                 max_age_seconds: Optional[float] = None, seed: Optional[int] = None):
+        if n_bits > 62:
+            raise ValueError("n_bits должен быть не больше 62")
+
+        self.dim = dim
+        self.capacity = capacity
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.max_age_seconds = max_age_seconds
+
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((dim, n_tables * n_bits)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits, dtype=np.int64))
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.keys = np.zeros((capacity, n_tables), dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(n_tables)]
+        self.head = 0      # следующий слот для вставки
+        self.tail = 0      # самый старый живой слот
+        self.size = 0
+        self._stale = 0
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        """Ключи корзин (n, n_tables) для пакета векторов"""
+        bits = (vectors @ self.planes) > 0
+        bits = bits.reshape(len(vectors), self.n_tables, self.n_bits)
+        return bits @ self._bit_weights
+
+    def insert_batch(self, vectors: np.ndarray, timestamps: Optional[np.ndarray] = None):
+        """Добавление пакета векторов"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        count = len(vectors)
+        if timestamps is None:
+            timestamps = np.full(count, time.time())
+
+        if self.max_age_seconds is not None and count:
+            self.evict_older_than(float(np.max(timestamps)) - self.max_age_seconds)
+
+        keys = self._hash(vectors)
+        for row in range(count):
+            if self.size == self.capacity:
+                self._evict_oldest()
+
+            slot = self.head
+            self.vectors[slot] = vectors[row]
+            self.timestamps[slot] = timestamps[row]
+            self.keys[slot] = keys[row]
+            self.alive[slot] = True
+            for table, key in zip(self.tables, keys[row].tolist()):
+                bucket = table.get(key)
+                if bucket is None:
+                    table[key] = [slot]
+                else:
+                    bucket.append(slot)
+
+            self.head = (self.head + 1) % self.capacity
+            self.size += 1
+
+        if self._stale > self.size * self.n_tables:
+            self._rebuild()
+
+    def insert(self, vector: np.ndarray, timestamp: Optional[float] = None):
+        """Добавление одного вектора"""
+        self.insert_batch(vector[None, :] if np.ndim(vector) == 1 else vector,
+                          None if timestamp is None else np.array([timestamp]))
+
+    def _evict_oldest(self):
+        """Вытеснение самого старого вектора"""
+        self.alive[self.tail] = False
+        self.tail = (self.tail + 1) % self.capacity
+        self.size -= 1
+        self._stale += self.n_tables
+
+    def evict_older_than(self, cutoff: float) -> int:
+        """Вытеснение векторов старше cutoff (буфер упорядочен по времени вставки)"""
+        evicted = 0
+        while self.size and self.timestamps[self.tail] < cutoff:
+            self._evict_oldest()
+            evicted += 1
+        return evicted
+
+    def _rebuild(self):
+        """Перестроение корзин без устаревших записей"""
+        self.tables = [{} for _ in range(self.n_tables)]
+        slots = np.flatnonzero(self.alive)
+        for table_index, table in enumerate(self.tables):
+            for slot, key in zip(slots.tolist(), self.keys[slots, table_index].tolist()):
+                bucket = table.get(key)
+                if bucket is None:
+                    table[key] = [slot]
+                else:
+                    bucket.append(slot)
+        self._stale = 0
+
+    def query_batch(self, queries: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Поиск k ближайших соседей для пакета запросов
+
+        Возвращает (расстояния, слоты) формы (n, k); отсутствующие соседи
+        обозначаются расстоянием inf и слотом -1.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        keys = self._hash(queries)
+
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        slots = np.full((len(queries), k), -1, dtype=np.int64)
+
+        for row, query in enumerate(queries):
+            candidates = []
+            for table, key in zip(self.tables, keys[row].tolist()):
+                bucket = table.get(key)
+                if bucket:
+                    candidates.append(np.fromiter(bucket, dtype=np.int64, count=len(bucket)))
+            if not candidates:
+                continue
+
+            candidate_slots = np.unique(np.concatenate(candidates))
+            candidate_slots = candidate_slots[self.alive[candidate_slots]]
+            if not len(candidate_slots):
+                continue
+
+            diff = self.vectors[candidate_slots] - query
+            candidate_distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+            top = min(k, len(candidate_slots))
+            nearest = np.argpartition(candidate_distances, top - 1)[:top]
+            nearest = nearest[np.argsort(candidate_distances[nearest])]
+            distances[row, :top] = candidate_distances[nearest]
+            slots[row, :top] = candidate_slots[nearest]
+
+        return distances, slots
+
+    def anomaly_scores(self, queries: np.ndarray, k: int = 10) -> np.ndarray:
+        """Оценка аномальности: среднее расстояние до k ближайших соседей
+
+        Вектор без соседей в индексе получает оценку inf (новый паттерн).
+        """
+        distances, _ = self.query_batch(queries, k)
+        found = np.isfinite(distances)
+        counts = found.sum(axis=1)
+        totals = np.where(found, distances, 0.0).sum(axis=1)
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.inf)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса индекса"""
+        return {
+            'size': self.size,
+            'capacity': self.capacity,
+            'tables': self.n_tables,
+            'bits': self.n_bits,
+            'buckets': sum(len(table) for table in self.tables),
+            'stale_entries': self._stale,
+        }
+
+class AnomalyScorer:
+    """Оценка аномальности событий по истории векторов признаков
+
+    Порог аномальности - заданный перцентиль оценок последних событий.
+    """
+
+    def __init__(self, index: LSHIndex, k: int = 10, percentile: float = 99.0,
+                 history: int = 10000, min_history: int = 100):
+        self.index = index
+        self.k = k
+        self.percentile = percentile
+        self.min_history = min_history
+        self._recent = np.zeros(history, dtype=np.float32)
+        self._recent_count = 0
+
+    def score(self, features: np.ndarray, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """Оценка события и добавление его в историю"""
+        score = float(self.index.anomaly_scores(features, self.k)[0])
+        self.index.insert(np.asarray(features, dtype=np.float32), timestamp)
+
+        is_anomaly = False
+        if np.isfinite(score):
+            filled = min(self._recent_count, len(self._recent))
+            if filled >= self.min_history:
+                threshold = float(np.percentile(self._recent[:filled], self.percentile))
+                is_anomaly = score > threshold
+            self._recent[self._recent_count % len(self._recent)] = score
+            self._recent_count += 1
+        elif self.index.size > self.min_history:
+            is_anomaly = True
+
+        return {'anomaly_score': score, 'is_anomaly': is_anomaly}
+
+def brute_force_knn(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Точный поиск k ближайших соседей (слоты)"""
+    vector_norms = np.einsum('ij,ij->i', vectors, vectors)
+    result = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), 64):
+        chunk = queries[start:start + 64]
+        distances = vector_norms[None, :] - 2.0 * chunk @ vectors.T
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+        result[start:start + 64] = np.take_along_axis(nearest, order, axis=1)
+    return result
+
+def benchmark_ann(n_vectors: int = 1_000_000, dim: int = 48, n_queries: int = 1000, k: int = 10,
+                  n_tables: int = 8, n_bits: int = 14, n_clusters: int = 1000,
+                  seed: int = 0) -> Dict[str, Any]:
+    """Сравнение полноты и задержки LSH с точным поиском"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32) * 4.0
+    labels = rng.integers(0, n_clusters, size=n_vectors)
+    vectors = centers[labels] + rng.standard_normal((n_vectors, dim)).astype(np.float32)
+    queries = vectors[rng.integers(0, n_vectors, size=n_queries)] + \
+        0.1 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+
+    index = LSHIndex(dim, capacity=n_vectors, n_tables=n_tables, n_bits=n_bits, seed=seed)
+    start = time.perf_counter()
+    for chunk in range(0, n_vectors, 100_000):
+        index.insert_batch(vectors[chunk:chunk + 100_000], np.zeros(min(100_000, n_vectors - chunk)))
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, ann_slots = index.query_batch(queries, k)
+    ann_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact_slots = brute_force_knn(vectors, queries, k)
+    exact_seconds = time.perf_counter() - start
+
+    recall = np.mean([
+        len(set(ann_slots[row][ann_slots[row] >= 0].tolist()) & set(exact_slots[row].tolist())) / k
+        for row in range(n_queries)
+    ])
+
+    return {
+        'n_vectors': n_vectors,
+        'dim': dim,
+        'k': k,
+        'tables': n_tables,
+        'bits': n_bits,
+        'build_seconds': round(build_seconds, 3),
+        'recall_at_k': round(float(recall), 4),
+        'ann_query_ms': round(ann_seconds / n_queries * 1000, 4),
+        'brute_force_query_ms': round(exact_seconds / n_queries * 1000, 4),
+        'speedup': round(exact_seconds / max(ann_seconds, 1e-9), 1),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк LSH индекса против точного поиска")
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=48)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--bits", type=int, default=14)
+    args = parser.parse_args()
+
+    result = benchmark_ann(args.vectors, args.dim, args.queries, args.k, args.tables, args.bits)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
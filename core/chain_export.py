@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Потоковый экспорт цепочки блоков
+Блоки читаются и записываются по одному через генератор (NDJSON или двоичный
+формат, сжатие gzip/zstd), с выбором диапазона индексов или времени,
+продолжением прерванного экспорта и фоновыми заданиями с прогрессом
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core.event_codec import decode_value, encode_value, read_varint, write_varint
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('ndjson', 'binary')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+BINARY_MAGIC = b'CSCHAIN1'
+PROGRESS_SUFFIX = '.progress.json'
+
+def _plain(value: Any) -> Any:
+    """Блок или событие логгера в словарь"""
+    if isinstance(value, dict):
+        return value
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return {key: item for key, item in vars(value).items() if not key.startswith('_')}
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+class ChainSource:
+    """Доступ к блокам по индексу без копирования всей цепочки
+
+    Поддерживаются BlockchainLogger (список chain) и ShardLedger
+    (block(index) и height). Длина фиксируется при создании, поэтому блоки,
+    добытые во время экспорта, в него не попадают.
+    """
+
+    def __init__(self, chain: Any):
+        if hasattr(chain, 'block') and hasattr(chain, 'height'):
+            self._get = chain.block
+            self.length = chain.height
+        else:
+            blocks = getattr(chain, 'chain', chain)
+            self._get = blocks.__getitem__
+            self.length = len(blocks)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def block(self, index: int) -> Dict[str, Any]:
+        return _plain(self._get(index))
+
+    def timestamp(self, index: int) -> float:
+        value = self.block(index).get('timestamp', 0.0)
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                return datetime.fromisoformat(value).timestamp()
+        if isinstance(value, datetime):
+            return value.timestamp()
+        return float(value)
+
+    def index_range(self, start_index: int = 0, end_index: Optional[int] = None,
+                    start_time: Optional[float] = None, end_time: Optional[float] = None) -> range:
+        """Индексы блоков по диапазону индексов и/или времени (бинарный поиск по времени)"""
+        start = max(start_index, 0)
+        stop = len(self) if end_index is None else min(end_index + 1, len(self))
+        if start_time is not None:
+            start = max(start, self._first_after(start_time, inclusive=True))
+        if end_time is not None:
+            stop = min(stop, self._first_after(end_time, inclusive=False))
+        return range(start, max(start, stop))
+
+    def _first_after(self, moment: float, inclusive: bool) -> int:
+        """Первый индекс с меткой времени >= moment (> moment при inclusive=False)"""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            timestamp = self.timestamp(middle)
+            if timestamp < moment or (not inclusive and timestamp == moment):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+def iter_blocks(source: ChainSource, indexes: range) -> Iterator[Dict[str, Any]]:
+    """Генератор блоков по одному"""
+    for index in indexes:
+        yield source.block(index)
+
+def _compressor(compression: str) -> Callable[[bytes], bytes]:
+    """Сжатие фрагмента в независимый член gzip или кадр zstd (файл допускает дозапись)"""
+    if compression == 'gzip':
+        return lambda data: gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для сжатия zstd установите пакет zstandard")
+        compressor = zstandard.ZstdCompressor(level=3)
+        return compressor.compress
+    return lambda data: data
+
+def _encode_block(block: Dict[str, Any], fmt: str) -> bytes:
+    if fmt == 'ndjson':
+        return json.dumps(block, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8') + b'\n'
+    payload = encode_value(block)
+    out = bytearray()
+    write_varint(out, len(payload))
+    return bytes(out) + payload
+
+class ChainExporter:
+    """Экспорт в файл фрагментами по chunk_blocks блоков
+
+    Каждый фрагмент сжимается отдельно и дописывается в файл, после чего
+    в файле <path>.progress.json сохраняются параметры, последний записанный
+    индекс и размер файла. При resume=True прерванный экспорт с теми же
+    параметрами продолжается: файл обрезается до сохраненного размера.
+    """
+
+    def __init__(self, source: ChainSource, path: str, fmt: str = 'ndjson', compression: str = 'gzip',
+                 start_index: int = 0, end_index: Optional[int] = None,
+                 start_time: Optional[float] = None, end_time: Optional[float] = None,
+                 chunk_blocks: int = 64, resume: bool = True):
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+        self.source = source
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.chunk_blocks = chunk_blocks
+        self.resume = resume
+        self.indexes = source.index_range(start_index, end_index, start_time, end_time)
+        # Запрошенный (а не вычисленный) диапазон: продолжение захватывает блоки, добытые после прерывания
+        self.params = {
+            'format': fmt, 'compression': compression, 'start_index': start_index, 'end_index': end_index,
+            'start_time': start_time, 'end_time': end_time,
+        }
+        self.progress = {'total_blocks': len(self.indexes), 'blocks_written': 0, 'bytes_written': 0,
+                         'last_index': None, 'resumed': False}
+
+    @property
+    def progress_path(self) -> str:
+        return self.path + PROGRESS_SUFFIX
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not self.resume or not os.path.exists(self.progress_path) or not os.path.exists(self.path):
+            return None
+        with open(self.progress_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('params') != self.params:
+            logger.warning(f"Параметры экспорта {self.path} изменились, экспорт начинается заново")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, last_index: int, size: int):
+        with open(self.progress_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'params': self.params, 'last_index': last_index, 'size': size}, f)
+        os.replace(self.progress_path + '.tmp', self.progress_path)
+
+    def run(self, cancelled: Optional[threading.Event] = None,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Экспорт (блокирующий; для цикла событий - в рабочем потоке)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        indexes = self.indexes
+        checkpoint = self._load_checkpoint()
+        if checkpoint is not None:
+            with open(self.path, 'r+b') as f:
+                f.truncate(checkpoint['size'])
+            indexes = range(checkpoint['last_index'] + 1, indexes.stop)
+            self.progress.update(blocks_written=checkpoint['last_index'] + 1 - self.indexes.start,
+                                 bytes_written=checkpoint['size'], last_index=checkpoint['last_index'],
+                                 resumed=True)
+            mode = 'ab'
+        else:
+            mode = 'wb'
+
+        compress = _compressor(self.compression)
+        with open(self.path, mode) as f:
+            if mode == 'wb' and self.fmt == 'binary':
+                f.write(compress(BINARY_MAGIC))
+            chunk = bytearray()
+            count = 0
+            last_index = self.progress['last_index']
+            for index, block in zip(indexes, iter_blocks(self.source, indexes)):
+                if cancelled is not None and cancelled.is_set():
+                    break
+                chunk += _encode_block(block, self.fmt)
+                count += 1
+                last_index = index
+                if count >= self.chunk_blocks:
+                    self._write_chunk(f, compress, chunk, count, last_index, on_progress)
+                    chunk, count = bytearray(), 0
+            if count:
+                self._write_chunk(f, compress, chunk, count, last_index, on_progress)
+
+        complete = last_index == indexes.stop - 1 or not len(self.indexes)
+        if complete and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        return {**self.progress, 'path': self.path, 'complete': complete}
+
+    def _write_chunk(self, f, compress, chunk: bytearray, count: int, last_index: int, on_progress):
+        f.write(compress(bytes(chunk)))
+        f.flush()
+        size = f.tell()
+        self._save_checkpoint(last_index, size)
+        self.progress.update(blocks_written=self.progress['blocks_written'] + count,
+                             bytes_written=size, last_index=last_index)
+        if on_progress is not None:
+            on_progress(dict(self.progress))
+
+def _open_decompressed(path: str, compression: str):
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                          closefd=True)
+    return open(path, 'rb')
+
+def read_export(path: str, fmt: str = 'ndjson', compression: str = 'gzip') -> Iterator[Dict[str, Any]]:
+    """Чтение экспортированных блоков по одному"""
+    with _open_decompressed(path, compression) as f:
+        if fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} не является двоичным экспортом цепочки")
+        while True:
+            prefix = bytearray()
+            while True:
+                byte = f.read(1)
+                if not byte:
+                    return
+                prefix += byte
+                if byte[0] < 0x80:
+                    break
+            length, _ = read_varint(prefix, 0)
+            yield decode_value(f.read(length))
+
+class ExportJobManager:
+    """Фоновые задания экспорта в рабочем потоке с прогрессом и отменой"""
+
+    def __init__(self, max_workers: int = 1, max_jobs: int = 100):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chain-export")
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+
+    def submit(self, exporter: ChainExporter) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'path': exporter.path,
+            'params': exporter.params,
+            'progress': dict(exporter.progress),
+            'created_at': time.time(),
+            'finished_at': None,
+            'error': None,
+        }
+        cancelled = threading.Event()
+        with self._lock:
+            self.jobs[job_id] = job
+            self._cancel[job_id] = cancelled
+            self._trim()
+        self._pool.submit(self._run, job, exporter, cancelled)
+        return dict(job)
+
+    def _run(self, job: Dict[str, Any], exporter: ChainExporter, cancelled: threading.Event):
+        if cancelled.is_set():
+            job['status'] = 'cancelled'
+            return
+        job['status'] = 'running'
+
+        def on_progress(progress):
+            job['progress'] = progress
+
+        try:
+            result = exporter.run(cancelled, on_progress)
+            job['progress'] = {key: result[key] for key in exporter.progress}
+            job['status'] = 'done' if result['complete'] else 'cancelled'
+            logger.info(f"Экспорт цепочки {job['job_id']}: {result['blocks_written']} блоков в {result['path']}")
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            logger.error(f"Ошибка экспорта цепочки {job['job_id']}: {e}")
+        finally:
+            job['finished_at'] = time.time()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+            del self._cancel[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        progress = job['progress']
+        total = progress['total_blocks']
+        return {**job, 'percent': round(100.0 * progress['blocks_written'] / total, 1) if total else 100.0}
+
+    def cancel(self, job_id: str) -> bool:
+        """Отмена: экспорт останавливается после текущего блока и может быть продолжен"""
+        cancelled = self._cancel.get(job_id)
+        if cancelled is None:
+            return False
+        cancelled.set()
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [self.get(job_id) for job_id in list(self.jobs)]
+
+    def get_status(self) -> Dict[str, Any]:
+        statuses = [job['status'] for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed', 'cancelled')}
+
+    def shutdown(self):
+        for cancelled in self._cancel.values():
+            cancelled.set()
+        self._pool.shutdown(wait=True)
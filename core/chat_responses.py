@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Ответы чат-бота на базе OpenAI
+Кеш ответов по намерению и версии состояния системы, объединение одинаковых
+запросов в полете и асинхронный клиент с ограничением параллелизма
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .intent_index import IntentIndex, normalize_text
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = ("Ты AI ассистент системы облачной безопасности. "
+                 "Отвечай кратко и по делу на языке пользователя.")
+
+class ResponseCache:
+    """Кеш ответов с TTL и ограничением размера (LRU)"""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[float, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+class OpenAIChatBackend:
+    """Асинхронный клиент Chat Completions с таймаутом
+
+    base_url позволяет направить запросы на совместимый сервер,
+    например локальный тестовый (см. FakeCompletionServer).
+    """
+
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", base_url: Optional[str] = None,
+                 timeout: float = 20.0, max_retries: int = 1,
+                 client_getter: Optional[Callable[[], Any]] = None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url or None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.client_getter = client_getter
+        self._client = None
+
+    def _get_client(self):
+        if self.client_getter is not None:
+            return self.client_getter()
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                              timeout=self.timeout, max_retries=self.max_retries)
+        return self._client
+
+    async def __call__(self, messages: List[Dict[str, str]]) -> str:
+        response = await self._get_client().chat.completions.create(model=self.model, messages=messages)
+        return response.choices[0].message.content or ""
+
+class ChatResponder:
+    """Ответы на текстовые сообщения с кешем и объединением запросов
+
+    Ключ кеша - распознанное намерение (или нормализованный текст, если
+    намерение не распознано), версия состояния системы и хеш предыдущей
+    истории диалога, отправляемой модели. Ответ на "статус системы"
+    переиспользуется между пользователями без истории, пока состояние не
+    изменилось, но ответ, построенный по истории одного пользователя,
+    другим не выдается. Одинаковые запросы, пришедшие во время ожидания
+    ответа, получают результат того же вызова модели. Число одновременных вызовов
+    ограничено семафором, каждый вызов - общим таймаутом.
+    """
+
+    def __init__(self, complete: Callable[[List[Dict[str, str]]], Awaitable[str]],
+                 cache: Optional[ResponseCache] = None, intent_index: Optional[IntentIndex] = None,
+                 state_version: Optional[Callable[[], Hashable]] = None, conversation_store=None,
+                 max_concurrency: int = 4, timeout: float = 20.0, context_token_budget: int = 3000,
+                 system_prompt: str = SYSTEM_PROMPT):
+        self.complete = complete
+        self.cache = cache or ResponseCache()
+        self.intent_index = intent_index
+        self.state_version = state_version or (lambda: 0)
+        self.conversation_store = conversation_store
+        self.timeout = timeout
+        self.context_token_budget = context_token_budget
+        self.system_prompt = system_prompt
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {'upstream_calls': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+
+    def cache_key(self, text: str, history: List[Dict[str, str]] = ()) -> Hashable:
+        """Ключ кеша: намерение (или нормализованный текст), версия состояния и хеш истории"""
+        normalized = normalize_text(text)
+        intent = 'unknown'
+        if self.intent_index is not None:
+            intent, _ = self.intent_index.classify(normalized)
+        context = hashlib.sha256(
+            json.dumps(list(history), ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest() if history else None
+        return (intent if intent != 'unknown' else normalized, self.state_version(), context)
+
+    def _messages(self, text: str, user_id: str) -> List[Dict[str, str]]:
+        if self.conversation_store is not None:
+            return self.conversation_store.build_context(user_id, self.context_token_budget, self.system_prompt)
+        return [{'role': 'system', 'content': self.system_prompt}, {'role': 'user', 'content': text}]
+
+    async def reply(self, text: str, user_id: str = "default") -> str:
+        """Ответ на сообщение пользователя"""
+        if self.conversation_store is not None:
+            self.conversation_store.add_message(user_id, 'user', text)
+
+        # Всё, кроме системного промпта и текущего вопроса, - история пользователя
+        messages = self._messages(text, user_id)
+        key = self.cache_key(text, [m for m in messages[:-1] if m['role'] != 'system'])
+        response = self.cache.get(key)
+        if response is None:
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                self.stats['coalesced'] += 1
+                response = await asyncio.shield(pending)
+            else:
+                response = await self._fetch(key, messages)
+
+        if self.conversation_store is not None:
+            self.conversation_store.add_message(user_id, 'assistant', response)
+        return response
+
+    async def _fetch(self, key: Hashable, messages: List[Dict[str, str]]) -> str:
+        """Один вызов модели для всех ожидающих запросов с этим ключом"""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            async with self._semaphore:
+                self.stats['upstream_calls'] += 1
+                response = await asyncio.wait_for(self.complete(messages), self.timeout)
+
+            self.cache.put(key, response)
+            future.set_result(response)
+            return response
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats['timeouts' if isinstance(e, asyncio.TimeoutError) else 'errors'] += 1
+            # Ошибка передается ожидающим запросам; exception() помечает ее полученной
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса ответов чат-бота"""
+        return {
+            'cache': self.cache.get_status(),
+            'in_flight': len(self._in_flight),
+            **self.stats,
+        }
+
+class FakeCompletionServer:
+    """Локальный сервер, совместимый с Chat Completions, для тестов и бенчмарков
+
+    Отвечает на POST /v1/chat/completions с заданной задержкой и считает запросы.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.2):
+        self.delay = delay
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                server.requests += 1
+                time.sleep(server.delay)
+
+                question = body.get('messages', [{}])[-1].get('content', '')
+                payload = json.dumps({
+                    'id': f"fake-{server.requests}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'fake'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': f"Ответ на: {question}"},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                }).encode('utf-8')
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'FakeCompletionServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+async def benchmark_responder(base_url: Optional[str] = None, requests: int = 200,
+                              concurrency: int = 50, delay: float = 0.2) -> Dict[str, Any]:
+    """Число вызовов модели и задержка при потоке повторяющихся вопросов"""
+    server = None
+    if base_url is None:
+        server = FakeCompletionServer(delay=delay).start()
+        base_url = server.base_url
+
+    responder = ChatResponder(OpenAIChatBackend("fake-key", base_url=base_url),
+                              intent_index=IntentIndex().build(), max_concurrency=4)
+    questions = ["Проверить статус системы", "статус системы!", "Сгенерировать отчет по последним угрозам",
+                 "покажи последние угрозы", "что ты умеешь?"]
+    latencies: List[float] = []
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def ask(i: int):
+        async with limiter:
+            start = time.perf_counter()
+            await responder.reply(questions[i % len(questions)], user_id=f"user{i % 10}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.stop()
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'elapsed_seconds': round(elapsed, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        **responder.get_status(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк кеша ответов чат-бота")
+    parser.add_argument("--base-url", help="Совместимый сервер (по умолчанию локальный тестовый)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="Задержка тестового сервера, с")
+    args = parser.parse_args()
+
+    result = asyncio.run(benchmark_responder(args.base_url, args.requests, args.concurrency, args.delay))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Хранилище истории диалогов чат-бота
+Кольцевые буферы сообщений по пользователям, LRU по неактивным пользователям
+и вытеснение в SQLite
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (около 4 символов на токен)"""
+    return len(text) // 4 + 1
+
+class Message:
+    """Сообщение диалога"""
+
+    __slots__ = ('role', 'content', 'timestamp', 'tokens')
+
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None,
+                 tokens: Optional[int] = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.tokens = tokens if tokens is not None else estimate_tokens(content)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Формат сообщения для API чат-модели"""
+        return {'role': self.role, 'content': self.content}
+
+class ConversationStore:
+    """История диалогов с ограничением по сообщениям и пользователям
+
+    Для каждого пользователя хранится кольцевой буфер последних
+    max_messages сообщений. Пользователи упорядочены по последнему
+    обращению; при превышении max_users история самого давно неактивного
+    пользователя вытесняется в SQLite (если задан spill_path) или удаляется,
+    и подгружается обратно при следующем обращении.
+    """
+
+    def __init__(self, max_messages: int = 50, max_users: int = 1000,
+                 spill_path: Optional[str] = None):
+        self.max_messages = max_messages
+        self.max_users = max_users
+        self.spill_path = spill_path or None
+
+        self._histories: 'OrderedDict[str, Deque[Message]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {'evicted': 0, 'spilled': 0, 'restored': 0}
+
+        if self.spill_path:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.spill_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_messages ("
+                "user_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, timestamp REAL NOT NULL, tokens INTEGER NOT NULL, "
+                "PRIMARY KEY (user_id, seq))"
+            )
+            self._db.commit()
+
+    def _history(self, user_id: str, create: bool = True) -> Optional[Deque[Message]]:
+        """Буфер пользователя с обновлением порядка LRU"""
+        history = self._histories.get(user_id)
+        if history is not None:
+            self._histories.move_to_end(user_id)
+            return history
+
+        history = self._restore(user_id)
+        if history is None:
+            if not create:
+                return None
+            history = deque(maxlen=self.max_messages)
+
+        self._histories[user_id] = history
+        while len(self._histories) > self.max_users:
+            self._evict()
+        return history
+
+    def _evict(self):
+        """Вытеснение самого давно неактивного пользователя"""
+        user_id, history = self._histories.popitem(last=False)
+        self.stats['evicted'] += 1
+        if self._db is None or not history:
+            return
+
+        self._db.execute("DELETE FROM conversation_messages WHERE user_id = ?", (user_id,))
+        self._db.executemany(
+            "INSERT INTO conversation_messages VALUES (?, ?, ?, ?, ?, ?)",
+            [(user_id, seq, m.role, m.content, m.timestamp, m.tokens) for seq, m in enumerate(history)]
+        )
+        self._db.commit()
+        self.stats['spilled'] += 1
+
+    def _restore(self, user_id: str) -> Optional[Deque[Message]]:
+        """Загрузка вытесненной истории из SQLite"""
+        if self._db is None:
+            return None
+
+        rows = self._db.execute(
+            "SELECT role, content, timestamp, tokens FROM conversation_messages "
+            "WHERE user_id = ? ORDER BY seq", (user_id,)
+        ).fetchall()
+        if not rows:
+            return None
+
+        self._db.execute("DELETE FROM conversation_messages WHERE user_id = ?", (user_id,))
+        self._db.commit()
+        self.stats['restored'] += 1
+        return deque((Message(*row) for row in rows), maxlen=self.max_messages)
+
+    def add_message(self, user_id: str, role: str, content: str) -> Message:
+        """Добавление сообщения в историю пользователя"""
+        message = Message(role, content)
+        with self._lock:
+            self._history(user_id).append(message)
+        return message
+
+    def get_history(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Последние сообщения пользователя в формате API"""
+        with self._lock:
+            history = self._history(user_id, create=False)
+            if not history:
+                return []
+            start = 0 if limit is None else max(0, len(history) - limit)
+            return [history[i].to_dict() for i in range(start, len(history))]
+
+    def build_context(self, user_id: str, token_budget: int,
+                      system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """Контекст для запроса к модели в пределах бюджета токенов
+
+        Сообщения берутся с конца истории, пока не исчерпан бюджет;
+        история при этом не копируется.
+        """
+        messages: List[Dict[str, str]] = []
+        budget = token_budget
+        if system_prompt:
+            budget -= estimate_tokens(system_prompt)
+
+        with self._lock:
+            history = self._history(user_id, create=False) or ()
+            for message in reversed(history):
+                if message.tokens > budget:
+                    break
+                budget -= message.tokens
+                messages.append(message.to_dict())
+
+        messages.reverse()
+        if system_prompt:
+            messages.insert(0, {'role': 'system', 'content': system_prompt})
+        return messages
+
+    def clear(self, user_id: str):
+        """Удаление истории пользователя"""
+        with self._lock:
+            self._histories.pop(user_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM conversation_messages WHERE user_id = ?", (user_id,))
+                self._db.commit()
+
+    def close(self):
+        """Вытеснение всех историй на диск и закрытие базы"""
+        with self._lock:
+            if self._db is None:
+                return
+            while self._histories:
+                self._evict()
+            self._db.close()
+            self._db = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса хранилища"""
+        with self._lock:
+            return {
+                'active_users': len(self._histories),
+                'messages_in_memory': sum(len(history) for history in self._histories.values()),
+                'max_users': self.max_users,
+                'max_messages': self.max_messages,
+                'spill_enabled': self._db is not None,
+                **self.stats,
+            }
+
+def measure_memory(users: int = 1000, messages: int = 50) -> Dict[str, Any]:
+    """Память на сообщение: списки словарей против хранилища"""
+    text = "Проверь статус системы и покажи последние угрозы"
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    lists = {f"user{u}": [{'role': 'user', 'content': text, 'timestamp': time.time()}
+                          for _ in range(messages)] for u in range(users)}
+    list_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    del lists
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = ConversationStore(max_messages=messages, max_users=users)
+    for u in range(users):
+        for _ in range(messages):
+            store.add_message(f"user{u}", 'user', text)
+    store_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    total = users * messages
+    return {
+        'messages': total,
+        'list_of_dicts_bytes_per_message': round(list_bytes / total, 1),
+        'store_bytes_per_message': round(store_bytes / total, 1),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Расход памяти хранилища истории диалогов")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    print(json.dumps(measure_memory(args.users, args.messages), indent=2, ensure_ascii=False))
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Движок корреляции инцидентов
+Потоковая группировка связанных событий безопасности в инциденты
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Порядок уровней угроз для вычисления максимальной серьезности инцидента
+SEVERITY_RANK = {
+    'INFO': 0,
+    'LOW': 1,
+    'MEDIUM': 2,
+    'HIGH': 3,
+    'CRITICAL': 4,
+}
+
+# Поля данных события, из которых извлекаются ключи сущностей
+ENTITY_FIELDS = {
+    'host': ('source_host', 'target_host', 'host', 'hostname'),
+    'ip': ('source_ip', 'target_ip', 'ip', 'remote_ip'),
+    'user': ('user', 'username', 'user_name'),
+    'file_hash': ('file_hash', 'sha256', 'md5'),
+}
+
+# Значения, которые не идентифицируют сущность
+IGNORED_ENTITY_VALUES = {'', 'unknown', 'local', 'localhost', 'none', 'n/a'}
+
+@dataclass
+class CorrelationRule:
+    """Правило корреляции разнотипных событий в пределах окна"""
+    name: str
+    event_types: Set[str]
+    window_seconds: float = 600.0
+    description: str = ""
+
+# Правила по умолчанию: цепочка WannaCry из демонстрации (подключение к C2,
+# DNS запрос к kill-switch домену, создание .wncry файлов) часто затрагивает
+# разные хосты и не имеет общих сущностей
+DEFAULT_RULES = [
+    CorrelationRule(
+        name="ransomware_kill_chain",
+        event_types={
+            "suspicious_connection",
+            "suspicious_dns_query",
+            "suspicious_file_creation",
+        },
+        window_seconds=600.0,
+        description="Подключение к вредоносному IP, DNS запрос и создание зашифрованных файлов",
+    ),
+]
+
+@dataclass
+class CorrelatedIncident:
+    """Инцидент, объединяющий связанные события"""
+    incident_id: str
+    created_at: float
+    updated_at: float
+    severity: str = "INFO"
+    event_count: int = 0
+    event_ids: List[str] = field(default_factory=list)
+    event_types: Set[str] = field(default_factory=set)
+    entities: Set[str] = field(default_factory=set)
+    rules: Set[str] = field(default_factory=set)
+    merged_ids: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Преобразование в словарь"""
+        return {
+            'incident_id': self.incident_id,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'severity': self.severity,
+            'event_count': self.event_count,
+            'event_ids': list(self.event_ids),
+            'event_types': sorted(self.event_types),
+            'entities': sorted(self.entities),
+            'rules': sorted(self.rules),
+            'merged_ids': list(self.merged_ids),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CorrelatedIncident':
+        """Восстановление из словаря"""
+        return cls(
+            incident_id=data['incident_id'],
+            created_at=data['created_at'],
+            updated_at=data['updated_at'],
+            severity=data.get('severity', 'INFO'),
+            event_count=data.get('event_count', 0),
+            event_ids=list(data.get('event_ids', [])),
+            event_types=set(data.get('event_types', [])),
+            entities=set(data.get('entities', [])),
+            rules=set(data.get('rules', [])),
+            merged_ids=list(data.get('merged_ids', [])),
+        )
+
+class EntityWindow:
+    """Сессия одной сущности: начало, последнее событие и инцидент"""
+
+    __slots__ = ('session_start', 'last_seen', 'incident_id')
+
+    def __init__(self, timestamp: float, incident_id: str):
+        self.session_start = timestamp
+        self.last_seen = timestamp
+        self.incident_id = incident_id
+
+class CorrelationEngine:
+    """Потоковый движок корреляции событий в инциденты
+
+    Каждое событие связывается с открытыми сессиями своих сущностей
+    (хост, IP, пользователь, хеш файла) и с окнами правил корреляции.
+    Слияние инцидентов выполняется через систему непересекающихся множеств,
+    поэтому обработка события стоит O(1) амортизированно.
+    """
+
+    def __init__(self, correlation_config=None, rules: Optional[List[CorrelationRule]] = None):
+        if correlation_config is None:
+            from config import CorrelationConfig
+            correlation_config = CorrelationConfig()
+
+        self.config = correlation_config
+        self.rules = list(rules) if rules is not None else list(DEFAULT_RULES)
+
+        # Окна сущностей в порядке последнего обращения (для вытеснения)
+        self.entity_windows: 'OrderedDict[str, EntityWindow]' = OrderedDict()
+
+        # Последнее событие каждого типа в окне правила: rule -> type -> (ts, incident_id)
+        self.rule_windows: Dict[str, Dict[str, Tuple[float, str]]] = {
+            rule.name: {} for rule in self.rules
+        }
+
+        # Открытые инциденты в порядке последнего обновления
+        self.incidents: 'OrderedDict[str, CorrelatedIncident]' = OrderedDict()
+
+        # Псевдонимы слитых инцидентов: merged_id -> incident_id
+        self.aliases: Dict[str, str] = {}
+
+        self.stats = {
+            'events_processed': 0,
+            'incidents_created': 0,
+            'incidents_merged': 0,
+            'incidents_evicted': 0,
+            'entities_evicted': 0,
+        }
+
+    def process_event(self, event: Any) -> CorrelatedIncident:
+        """Обработка события и привязка его к инциденту"""
+        normalized = self._normalize_event(event)
+        now = normalized['timestamp']
+
+        self._evict(now)
+
+        candidates: List[str] = []
+        entity_keys = self._extract_entities(normalized)
+
+        # Связывание через открытые сессии сущностей
+        for key in entity_keys:
+            window = self.entity_windows.get(key)
+            if window is None:
+                continue
+            incident_id = self._find(window.incident_id)
+            if incident_id is not None and self._session_open(window, now):
+                candidates.append(incident_id)
+
+        # Связывание через правила корреляции
+        matched_rules = []
+        for rule in self.rules:
+            if normalized['event_type'] not in rule.event_types:
+                continue
+            seen = self.rule_windows[rule.name]
+            for event_type, (seen_at, seen_incident) in list(seen.items()):
+                if now - seen_at > rule.window_seconds:
+                    del seen[event_type]
+                    continue
+                if event_type == normalized['event_type']:
+                    continue
+                incident_id = self._find(seen_incident)
+                if incident_id is not None:
+                    candidates.append(incident_id)
+                    matched_rules.append(rule.name)
+
+        incident = self._attach(normalized, candidates)
+        incident.rules.update(matched_rules)
+
+        # Обновление окон сущностей и правил
+        for key in entity_keys:
+            window = self.entity_windows.get(key)
+            if window is None or not self._session_open(window, now):
+                window = EntityWindow(now, incident.incident_id)
+                self.entity_windows[key] = window
+            window.last_seen = now
+            window.incident_id = incident.incident_id
+            self.entity_windows.move_to_end(key)
+            incident.entities.add(key)
+
+        for rule in self.rules:
+            if normalized['event_type'] in rule.event_types:
+                self.rule_windows[rule.name][normalized['event_type']] = (now, incident.incident_id)
+
+        self.stats['events_processed'] += 1
+        return incident
+
+    def _attach(self, event: Dict[str, Any], candidates: List[str]) -> CorrelatedIncident:
+        """Добавление события в существующий инцидент или создание нового"""
+        unique = list(dict.fromkeys(candidates))
+
+        if not unique:
+            incident = CorrelatedIncident(
+                incident_id=f"INC-{uuid.uuid4().hex[:12]}",
+                created_at=event['timestamp'],
+                updated_at=event['timestamp'],
+            )
+            self.incidents[incident.incident_id] = incident
+            self.stats['incidents_created'] += 1
+        else:
+            # Слияние в самый крупный инцидент
+            unique.sort(key=lambda incident_id: self.incidents[incident_id].event_count, reverse=True)
+            incident = self.incidents[unique[0]]
+            for other_id in unique[1:]:
+                self._merge(incident, self.incidents[other_id])
+
+        incident.event_count += 1
+        incident.updated_at = max(incident.updated_at, event['timestamp'])
+        incident.event_types.add(event['event_type'])
+        if len(incident.event_ids) < self.config.max_events_per_incident:
+            incident.event_ids.append(event['event_id'])
+        if SEVERITY_RANK.get(event['severity'], 0) > SEVERITY_RANK.get(incident.severity, 0):
+            incident.severity = event['severity']
+
+        self.incidents.move_to_end(incident.incident_id)
+        return incident
+
+    def _merge(self, target: CorrelatedIncident, source: CorrelatedIncident):
+        """Слияние инцидента source в target"""
+        target.created_at = min(target.created_at, source.created_at)
+        target.updated_at = max(target.updated_at, source.updated_at)
+        target.event_count += source.event_count
+        room = self.config.max_events_per_incident - len(target.event_ids)
+        if room > 0:
+            target.event_ids.extend(source.event_ids[:room])
+        target.event_types |= source.event_types
+        target.entities |= source.entities
+        target.rules |= source.rules
+        if SEVERITY_RANK.get(source.severity, 0) > SEVERITY_RANK.get(target.severity, 0):
+            target.severity = source.severity
+
+        for alias in source.merged_ids + [source.incident_id]:
+            self.aliases[alias] = target.incident_id
+            target.merged_ids.append(alias)
+
+        del self.incidents[source.incident_id]
+        self.stats['incidents_merged'] += 1
+
+    def _find(self, incident_id: str) -> Optional[str]:
+        """Поиск актуального идентификатора инцидента с сжатием путей"""
+        path = []
+        while incident_id not in self.incidents:
+            path.append(incident_id)
+            incident_id = self.aliases.get(incident_id)
+            if incident_id is None:
+                return None
+        for alias in path:
+            self.aliases[alias] = incident_id
+        return incident_id
+
+    def _session_open(self, window: EntityWindow, now: float) -> bool:
+        """Проверка, что сессия сущности еще открыта"""
+        return (now - window.last_seen <= self.config.session_gap_seconds and
+                now - window.session_start <= self.config.max_session_seconds)
+
+    def _evict(self, now: float):
+        """Вытеснение устаревших окон и инцидентов (амортизированно O(1))"""
+        windows = self.entity_windows
+        while windows:
+            key, window = next(iter(windows.items()))
+            if len(windows) <= self.config.max_entities and self._session_open(window, now):
+                break
+            windows.popitem(last=False)
+            self.stats['entities_evicted'] += 1
+
+        incidents = self.incidents
+        while incidents:
+            incident_id, incident = next(iter(incidents.items()))
+            idle = now - incident.updated_at > self.config.incident_idle_seconds
+            if len(incidents) <= self.config.max_incidents and not idle:
+                break
+            incidents.popitem(last=False)
+            for alias in incident.merged_ids:
+                self.aliases.pop(alias, None)
+            self.stats['incidents_evicted'] += 1
+
+    def _normalize_event(self, event: Any) -> Dict[str, Any]:
+        """Приведение события (объекта или словаря) к единому виду"""
+        if isinstance(event, dict):
+            get = event.get
+        else:
+            get = lambda name, default=None: getattr(event, name, default)
+
+        severity = get('severity', 'INFO')
+        severity = getattr(severity, 'name', None) or getattr(severity, 'value', severity)
+
+        return {
+            'event_id': str(get('event_id', None) or get('id', None) or uuid.uuid4().hex),
+            'event_type': str(get('event_type', 'unknown')),
+            'source': str(get('source', '') or ''),
+            'severity': str(severity).upper(),
+            'timestamp': self._to_timestamp(get('timestamp', None)),
+            'data': get('data', None) or {},
+        }
+
+    @staticmethod
+    def _to_timestamp(value: Any) -> float:
+        """Преобразование времени события в UNIX timestamp"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                pass
+        return time.time()
+
+    @staticmethod
+    def _extract_entities(event: Dict[str, Any]) -> List[str]:
+        """Извлечение ключей сущностей события"""
+        data = event['data'] if isinstance(event['data'], dict) else {}
+        keys = []
+        for kind, fields in ENTITY_FIELDS.items():
+            for field_name in fields:
+                value = data.get(field_name)
+                if value is None:
+                    continue
+                value = str(value).strip().lower()
+                if value not in IGNORED_ENTITY_VALUES:
+                    keys.append(f"{kind}:{value}")
+        return list(dict.fromkeys(keys))
+
+    def get_incident(self, incident_id: str) -> Optional[CorrelatedIncident]:
+        """Получение инцидента по идентификатору (в том числе слитого)"""
+        resolved = self._find(incident_id)
+        return self.incidents.get(resolved) if resolved else None
+
+    def list_incidents(self, min_events: int = 1) -> List[Dict[str, Any]]:
+        """Список открытых инцидентов, начиная с последних"""
+        return [
+            incident.to_dict()
+            for incident in reversed(self.incidents.values())
+            if incident.event_count >= min_events
+        ]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса движка корреляции"""
+        return {
+            'open_incidents': len(self.incidents),
+            'tracked_entities': len(self.entity_windows),
+            'rules': [rule.name for rule in self.rules],
+            **self.stats,
+        }
+
+    def save_snapshot(self, path: Optional[str] = None) -> bool:
+        """Сохранение состояния открытых окон и инцидентов на диск"""
+        path = path or self.config.snapshot_path
+        try:
+            snapshot = {
+                'version': 1,
+                'saved_at': time.time(),
+                'entity_windows': [
+                    [key, window.session_start, window.last_seen, window.incident_id]
+                    for key, window in self.entity_windows.items()
+                ],
+                'rule_windows': {
+                    name: {event_type: list(entry) for event_type, entry in seen.items()}
+                    for name, seen in self.rule_windows.items()
+                },
+                'incidents': [incident.to_dict() for incident in self.incidents.values()],
+                'aliases': self.aliases,
+                'stats': self.stats,
+            }
+
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Атомарная запись через временный файл
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+            logger.debug(f"Снимок состояния корреляции сохранен: {path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Ошибка сохранения снимка корреляции: {e}")
+            return False
+
+    def load_snapshot(self, path: Optional[str] = None) -> bool:
+        """Восстановление состояния из снимка"""
+        path = path or self.config.snapshot_path
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+
+            self.incidents = OrderedDict(
+                (data['incident_id'], CorrelatedIncident.from_dict(data))
+                for data in snapshot.get('incidents', [])
+            )
+            self.aliases = dict(snapshot.get('aliases', {}))
+
+            self.entity_windows = OrderedDict()
+            for key, session_start, last_seen, incident_id in snapshot.get('entity_windows', []):
+                window = EntityWindow(session_start, incident_id)
+                window.last_seen = last_seen
+                self.entity_windows[key] = window
+
+            saved_rules = snapshot.get('rule_windows', {})
+            for rule in self.rules:
+                self.rule_windows[rule.name] = {
+                    event_type: tuple(entry)
+                    for event_type, entry in saved_rules.get(rule.name, {}).items()
+                }
+
+            self.stats.update(snapshot.get('stats', {}))
+
+            logger.info(f"Состояние корреляции восстановлено: {len(self.incidents)} инцидентов, "
+                        f"{len(self.entity_windows)} окон")
+            return True
+
+        except Exception as e:
+            logger.error(f"Ошибка загрузки снимка корреляции: {e}")
+            return False
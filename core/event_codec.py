@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Компактное двоичное кодирование событий безопасности и блоков
+Фиксированный порядок полей, varint, интернирование повторяющихся строк
+(типы событий, источники, ключи данных) в пределах пакета или блока
+"""
+
+import hashlib
+import numbers
+import struct
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+BATCH_CONTENT_TYPE = 'application/x-security-events'
+
+# Теги значений
+TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STR, TAG_BYTES, TAG_LIST, TAG_DICT = range(9)
+
+_DOUBLE = struct.Struct('>d')
+HASH_SIZE = 32
+ZERO_HASH = '0' * 64
+
+class StringTable:
+    """Таблица интернированных строк пакета: повтор кодируется номером
+
+    0 - новая строка (длина и UTF-8 следуют), n > 0 - ссылка на строку n-1.
+    Таблица строится в порядке кодирования, поэтому кодирование детерминировано.
+    """
+
+    __slots__ = ('ids', 'strings')
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+# --- varint ---
+
+def write_varint(out: bytearray, value: int):
+    """Беззнаковое целое в формате LEB128"""
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+# --- строки ---
+
+def _write_str(out: bytearray, value: str):
+    raw = value.encode('utf-8')
+    write_varint(out, len(raw))
+    out += raw
+
+def _read_str(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = read_varint(data, pos)
+    end = pos + length
+    return bytes(data[pos:end]).decode('utf-8'), end
+
+def _write_interned(out: bytearray, value: str, table: StringTable):
+    index = table.ids.get(value)
+    if index is not None:
+        write_varint(out, index + 1)
+        return
+    table.ids[value] = len(table.strings)
+    table.strings.append(value)
+    out.append(0)
+    _write_str(out, value)
+
+def _read_interned(data: bytes, pos: int, table: StringTable) -> Tuple[str, int]:
+    index, pos = read_varint(data, pos)
+    if index:
+        return table.strings[index - 1], pos
+    value, pos = _read_str(data, pos)
+    table.strings.append(value)
+    return value, pos
+
+# --- произвольные значения (данные события) ---
+
+def _normalize(value: Any) -> Any:
+    """Приведение значений без собственного тега
+
+    Enum кодируется именем (ThreatLevel.HIGH -> "HIGH"), как severity в EventRecord.
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'tolist'):  # скаляры и массивы numpy
+        return value.tolist()
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+def write_value(out: bytearray, value: Any, table: StringTable):
+    """Значение с тегом; ключи словарей сортируются и интернируются"""
+    if value is None:
+        out.append(TAG_NONE)
+    elif value is True:
+        out.append(TAG_TRUE)
+    elif value is False:
+        out.append(TAG_FALSE)
+    elif type(value) is str:
+        out.append(TAG_STR)
+        _write_interned(out, value, table)
+    elif type(value) is int:
+        out.append(TAG_INT)
+        write_varint(out, _zigzag(value))
+    elif type(value) is float:
+        out.append(TAG_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, dict):
+        out.append(TAG_DICT)
+        write_varint(out, len(value))
+        for key in sorted(value, key=str):
+            _write_interned(out, key if type(key) is str else str(key), table)
+            write_value(out, value[key], table)
+    elif isinstance(value, (list, tuple)):
+        out.append(TAG_LIST)
+        write_varint(out, len(value))
+        for item in value:
+            write_value(out, item, table)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out.append(TAG_BYTES)
+        write_varint(out, len(value))
+        out += value
+    else:
+        write_value(out, _normalize(value), table)
+
+def read_value(data: bytes, pos: int, table: StringTable) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == TAG_STR:
+        return _read_interned(data, pos, table)
+    if tag == TAG_INT:
+        value, pos = read_varint(data, pos)
+        return _unzigzag(value), pos
+    if tag == TAG_DICT:
+        count, pos = read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _read_interned(data, pos, table)
+            result[key], pos = read_value(data, pos, table)
+        return result, pos
+    if tag == TAG_FLOAT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+    if tag == TAG_NONE:
+        return None, pos
+    if tag == TAG_TRUE:
+        return True, pos
+    if tag == TAG_FALSE:
+        return False, pos
+    if tag == TAG_LIST:
+        count, pos = read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = read_value(data, pos, table)
+            items.append(item)
+        return items, pos
+    if tag == TAG_BYTES:
+        length, pos = read_varint(data, pos)
+        return bytes(data[pos:pos + length]), pos + length
+    raise ValueError(f"Неизвестный тег значения: {tag}")
+
+def encode_value(value: Any) -> bytes:
+    """Каноническое двоичное представление значения (отдельная таблица строк)"""
+    out = bytearray()
+    write_value(out, value, StringTable())
+    return bytes(out)
+
+def decode_value(data: bytes) -> Any:
+    value, _ = read_value(data, 0, StringTable())
+    return value
+
+def encode_batch(items: List[Any]) -> bytes:
+    """Пакет произвольных событий (словарей) с общей таблицей строк для передачи по сети"""
+    out = bytearray((FORMAT_VERSION,))
+    write_value(out, list(items), StringTable())
+    return bytes(out)
+
+def decode_batch(data: bytes) -> List[Any]:
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {data[:1]!r}")
+    value, _ = read_value(data, 1, StringTable())
+    return value
+
+# --- события и блоки ---
+
+def _micros(timestamp: Any) -> int:
+    if isinstance(timestamp, str):
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.timestamp()
+    return round(float(timestamp or 0.0) * 1_000_000)
+
+class EventRecord:
+    """Событие безопасности в фиксированном порядке полей"""
+
+    __slots__ = ('event_id', 'timestamp', 'event_type', 'source', 'severity', 'description', 'data')
+
+    def __init__(self, event_id: str = '', timestamp: float = 0.0, event_type: str = '', source: str = '',
+                 severity: str = '', description: str = '', data: Optional[Dict[str, Any]] = None):
+        self.event_id = event_id
+        self.timestamp = timestamp
+        self.event_type = event_type
+        self.source = source
+        self.severity = severity
+        self.description = description
+        self.data = data if data is not None else {}
+
+    @classmethod
+    def from_event(cls, event: Any) -> 'EventRecord':
+        """Из словаря или объекта SecurityEvent"""
+        get = event.get if isinstance(event, dict) else lambda name, default=None: getattr(event, name, default)
+        severity = get('severity', '')
+        return cls(
+            event_id=str(get('event_id', '') or get('id', '') or ''),
+            timestamp=_micros(get('timestamp', 0.0)) / 1_000_000,
+            event_type=str(get('event_type', '')),
+            source=str(get('source', '')),
+            severity=severity.name if isinstance(severity, Enum) else str(severity or ''),
+            description=str(get('description', '') or ''),
+            data=get('data', None) or {},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EventRecord) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"EventRecord({self.event_type!r}, {self.source!r}, {self.timestamp!r})"
+
+def write_event(out: bytearray, event: EventRecord, table: StringTable):
+    _write_str(out, event.event_id)
+    write_varint(out, _zigzag(_micros(event.timestamp)))
+    _write_interned(out, event.event_type, table)
+    _write_interned(out, event.source, table)
+    _write_interned(out, event.severity, table)
+    _write_interned(out, event.description, table)
+    write_value(out, event.data, table)
+
+def read_event(data: bytes, pos: int, table: StringTable) -> Tuple[EventRecord, int]:
+    event = EventRecord.__new__(EventRecord)
+    event.event_id, pos = _read_str(data, pos)
+    micros, pos = read_varint(data, pos)
+    event.timestamp = _unzigzag(micros) / 1_000_000
+    event.event_type, pos = _read_interned(data, pos, table)
+    event.source, pos = _read_interned(data, pos, table)
+    event.severity, pos = _read_interned(data, pos, table)
+    event.description, pos = _read_interned(data, pos, table)
+    event.data, pos = read_value(data, pos, table)
+    return event, pos
+
+def encode_event(event: EventRecord) -> bytes:
+    """Одно событие (каноническая форма для хеширования)"""
+    out = bytearray()
+    write_event(out, event, StringTable())
+    return bytes(out)
+
+def decode_event(data: bytes) -> EventRecord:
+    event, _ = read_event(data, 0, StringTable())
+    return event
+
+def event_hash(event: EventRecord) -> str:
+    return hashlib.sha256(encode_event(event)).hexdigest()
+
+def encode_events(events: Iterable[EventRecord]) -> bytes:
+    """Пакет событий для передачи по сети: версия, число событий, общая таблица строк"""
+    events = list(events)
+    out = bytearray((FORMAT_VERSION,))
+    write_varint(out, len(events))
+    table = StringTable()
+    for event in events:
+        write_event(out, event, table)
+    return bytes(out)
+
+def decode_events(data: bytes) -> List[EventRecord]:
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {data[:1]!r}")
+    count, pos = read_varint(data, 1)
+    table = StringTable()
+    events = []
+    for _ in range(count):
+        event, pos = read_event(data, pos, table)
+        events.append(event)
+    return events
+
+def merkle_root(hashes: List[bytes]) -> bytes:
+    """Корень Меркла по двоичным хешам (нечетный последний узел дублируется)"""
+    if not hashes:
+        return bytes(HASH_SIZE)
+    level = list(hashes)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0]
+
+class BlockRecord:
+    """Блок цепочки: заголовок фиксированной длины и события с общей таблицей строк"""
+
+    __slots__ = ('index', 'timestamp', 'events', 'previous_hash', 'merkle_root', 'nonce', 'hash')
+
+    def __init__(self, index: int, timestamp: float, events: List[EventRecord], previous_hash: str = ZERO_HASH,
+                 nonce: int = 0, merkle_root: Optional[str] = None, hash: Optional[str] = None):
+        self.index = index
+        self.timestamp = timestamp
+        self.events = events
+        self.previous_hash = previous_hash
+        self.nonce = nonce
+        self.merkle_root = merkle_root if merkle_root is not None else self.compute_merkle_root()
+        self.hash = hash if hash is not None else self.compute_hash()
+
+    def compute_merkle_root(self) -> str:
+        return merkle_root([hashlib.sha256(encode_event(event)).digest() for event in self.events]).hex()
+
+    def header_bytes(self) -> bytes:
+        out = bytearray()
+        write_varint(out, self.index)
+        write_varint(out, _zigzag(_micros(self.timestamp)))
+        out += bytes.fromhex(self.previous_hash)
+        out += bytes.fromhex(self.merkle_root)
+        write_varint(out, self.nonce)
+        return bytes(out)
+
+    def compute_hash(self) -> str:
+        return hashlib.sha256(self.header_bytes()).hexdigest()
+
+    def verify(self) -> bool:
+        return self.merkle_root == self.compute_merkle_root() and self.hash == self.compute_hash()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'events': [event.to_dict() for event in self.events],
+            'previous_hash': self.previous_hash,
+            'merkle_root': self.merkle_root,
+            'nonce': self.nonce,
+            'hash': self.hash,
+        }
+
+def encode_block(block: BlockRecord) -> bytes:
+    """Блок для хранения и передачи: версия, заголовок, хеш, события"""
+    out = bytearray((FORMAT_VERSION,))
+    out += block.header_bytes()
+    out += bytes.fromhex(block.hash)
+    write_varint(out, len(block.events))
+    table = StringTable()
+    for event in block.events:
+        write_event(out, event, table)
+    return bytes(out)
+
+def decode_block(data: bytes) -> BlockRecord:
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {data[:1]!r}")
+    index, pos = read_varint(data, 1)
+    micros, pos = read_varint(data, pos)
+    previous_hash = bytes(data[pos:pos + HASH_SIZE]).hex()
+    root = bytes(data[pos + HASH_SIZE:pos + 2 * HASH_SIZE]).hex()
+    nonce, pos = read_varint(data, pos + 2 * HASH_SIZE)
+    block_hash = bytes(data[pos:pos + HASH_SIZE]).hex()
+    count, pos = read_varint(data, pos + HASH_SIZE)
+    table = StringTable()
+    events = []
+    for _ in range(count):
+        event, pos = read_event(data, pos, table)
+        events.append(event)
+    return BlockRecord(index, _unzigzag(micros) / 1_000_000, events, previous_hash, nonce, root, block_hash)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Фильтрация потока событий безопасности
+Дедупликация повторяющихся событий и ограничение частоты дорогих действий
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Поля данных события, входящие в отпечаток по умолчанию.
+# Изменчивые метрики (cpu_usage, memory_usage, timestamp) не учитываются,
+# чтобы повторные опросы одного и того же состояния считались дубликатами
+DEFAULT_FINGERPRINT_FIELDS = (
+    'source_host',
+    'source_ip',
+    'target_ip',
+    'file_hash',
+    'file_path',
+    'process_name',
+    'domain',
+    'user',
+    'port',
+)
+
+# Порядок уровней угроз: повтор с более высоким уровнем не подавляется
+SEVERITY_RANK = {
+    'INFO': 0,
+    'LOW': 1,
+    'MEDIUM': 2,
+    'HIGH': 3,
+    'CRITICAL': 4,
+}
+
+def _severity_name(severity: Any) -> str:
+    return str(getattr(severity, 'name', None) or getattr(severity, 'value', severity)).upper()
+
+def _event_getter(event: Any):
+    """Универсальный доступ к полям события (объект или словарь)"""
+    if isinstance(event, dict):
+        return event.get
+    return lambda name, default=None: getattr(event, name, default)
+
+def event_fingerprint(event: Any, fields: Sequence[str] = DEFAULT_FINGERPRINT_FIELDS) -> str:
+    """Вычисление отпечатка содержимого события"""
+    get = _event_getter(event)
+    data = get('data', None) or {}
+    if not isinstance(data, dict):
+        data = {}
+
+    key = [
+        str(get('event_type', '')),
+        str(get('source', '')),
+    ]
+    for field_name in fields:
+        value = data.get(field_name)
+        if value is not None:
+            key.append(f"{field_name}={value}")
+
+    return hashlib.blake2b('|'.join(key).encode('utf-8'), digest_size=16).hexdigest()
+
+class SuppressionEntry:
+    """Состояние окна подавления для одного отпечатка"""
+
+    __slots__ = ('fingerprint', 'event_type', 'source', 'severity', 'description',
+                 'first_seen', 'last_seen', 'count')
+
+    def __init__(self, fingerprint: str, event: Any, now: float):
+        get = _event_getter(event)
+        severity = get('severity', 'INFO')
+
+        self.fingerprint = fingerprint
+        self.event_type = str(get('event_type', 'unknown'))
+        self.source = str(get('source', ''))
+        self.severity = _severity_name(severity)
+        self.description = str(get('description', ''))
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+
+    def to_aggregate(self) -> Dict[str, Any]:
+        """Агрегированное событие за окно подавления"""
+        return {
+            'fingerprint': self.fingerprint,
+            'event_type': self.event_type,
+            'source': self.source,
+            'severity': self.severity,
+            'description': self.description,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'count': self.count,
+            'suppressed': self.count - 1,
+        }
+
+class EventDeduplicator:
+    """Дедупликатор событий с ограниченным по времени кешем отпечатков
+
+    Первое событие с данным отпечатком проходит дальше по конвейеру,
+    повторы в пределах окна подавления только увеличивают счетчик.
+    Повтор с более высоким уровнем угрозы пропускается и повышает
+    уровень окна, чтобы эскалация не терялась.
+    По закрытии окна формируется одно агрегированное событие с количеством.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, max_entries: int = 50000,
+                 fields: Sequence[str] = DEFAULT_FINGERPRINT_FIELDS):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.fields = tuple(fields)
+
+        # Окна подавления в порядке открытия (для вытеснения по времени)
+        self.entries: 'OrderedDict[str, SuppressionEntry]' = OrderedDict()
+        self.pending_aggregates: List[Dict[str, Any]] = []
+
+        self.stats = {
+            'events_seen': 0,
+            'events_admitted': 0,
+            'events_suppressed': 0,
+            'events_escalated': 0,
+            'aggregates_emitted': 0,
+        }
+
+    def admit(self, event: Any, now: Optional[float] = None) -> bool:
+        """Проверка, нужно ли пропускать событие дальше по конвейеру"""
+        now = time.time() if now is None else now
+        self.stats['events_seen'] += 1
+
+        self._expire(now)
+
+        fingerprint = event_fingerprint(event, self.fields)
+        entry = self.entries.get(fingerprint)
+        if entry is not None:
+            severity = _severity_name(_event_getter(event)('severity', 'INFO'))
+            if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(entry.severity, 0):
+                entry.severity = severity
+                entry.last_seen = now
+                self.stats['events_escalated'] += 1
+                self.stats['events_admitted'] += 1
+                return True
+            entry.count += 1
+            entry.last_seen = now
+            self.stats['events_suppressed'] += 1
+            return False
+
+        self.entries[fingerprint] = SuppressionEntry(fingerprint, event, now)
+        self.stats['events_admitted'] += 1
+        return True
+
+    def flush_expired(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Получение агрегированных событий по закрытым окнам подавления"""
+        now = time.time() if now is None else now
+        self._expire(now)
+
+        aggregates, self.pending_aggregates = self.pending_aggregates, []
+        self.stats['aggregates_emitted'] += len(aggregates)
+        return aggregates
+
+    def _expire(self, now: float):
+        """Закрытие истекших окон (амортизированно O(1))"""
+        entries = self.entries
+        while entries:
+            fingerprint, entry = next(iter(entries.items()))
+            if len(entries) <= self.max_entries and now - entry.first_seen < self.window_seconds:
+                break
+            entries.popitem(last=False)
+            if entry.count > 1:
+                self.pending_aggregates.append(entry.to_aggregate())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса дедупликатора"""
+        return {
+            'open_windows': len(self.entries),
+            'pending_aggregates': len(self.pending_aggregates),
+            **self.stats,
+        }
+
+class TokenBucket:
+    """Корзина токенов для ограничения частоты"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic() if now is None else now
+
+    def consume(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        """Попытка списать токены"""
+        now = time.monotonic() if now is None else now
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+class RateLimiter:
+    """Ограничитель частоты действий по типам событий
+
+    Лимиты задаются для действия (например, emergency_alert или block_ip),
+    а корзины создаются отдельно для каждой пары (действие, тип события),
+    чтобы шторм событий одного типа не блокировал реакцию на другие.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_buckets: int = 10000):
+        self.limits = dict(limits or {})
+        self.max_buckets = max_buckets
+        self.buckets: 'OrderedDict[Tuple[str, str], TokenBucket]' = OrderedDict()
+        self.rejected: Dict[str, int] = {}
+
+    def allow(self, action: str, event_type: str = '*', now: Optional[float] = None) -> bool:
+        """Проверка, разрешено ли выполнить действие"""
+        limit = self.limits.get(action)
+        if limit is None:
+            return True
+
+        key = (action, event_type)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            rate, capacity = limit
+            bucket = TokenBucket(rate, capacity, now)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+
+        if bucket.consume(now=now):
+            return True
+
+        self.rejected[action] = self.rejected.get(action, 0) + 1
+        return False
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса ограничителя"""
+        return {
+            'limits': {action: list(limit) for action, limit in self.limits.items()},
+            'active_buckets': len(self.buckets),
+            'rejected': dict(self.rejected),
+        }
+
+def format_aggregate(aggregate: Dict[str, Any]) -> str:
+    """Текстовое описание агрегированного события"""
+    return (f"{aggregate['event_type']} от {aggregate['source']}: "
+            f"{aggregate['count']} повторов за "
+            f"{aggregate['last_seen'] - aggregate['first_seen']:.0f} с "
+            f"({aggregate['description']})")
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Журнал упреждающей записи (WAL) для событий, ожидающих запечатывания в блок
+События записываются на диск с групповой фиксацией, переживают перезапуск и
+передаются майнингу блоков как потребителю журнала
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка каталога недоступна
+    fcntl = None
+
+from core.event_codec import decode_value, encode_value
+
+logger = logging.getLogger(__name__)
+
+# Кадр записи: длина данных, CRC32 данных, номер записи, время добавления
+FRAME_HEADER = struct.Struct('>IIQd')
+SEGMENT_SUFFIX = '.wal'
+CHECKPOINT_FILE = 'checkpoint.json'
+LOCK_FILE = 'wal.lock'
+
+class EventWAL:
+    """Сегментированный журнал ожидающих событий
+
+    append() только кладет кадр в буфер; поток фиксации записывает накопленные
+    кадры и вызывает fsync один раз на группу (не чаще commit_interval).
+    В памяти хранятся последние memory_limit записей, более старые читаются
+    с диска. acknowledge(seq) сохраняет контрольную точку потребителя и
+    удаляет полностью обработанные сегменты; при открытии неподтвержденные
+    записи восстанавливаются, оборванный хвост последнего сегмента отсекается.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 commit_interval: float = 0.01, memory_limit: int = 10000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.memory_limit = memory_limit
+
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        # Записи в памяти: (seq, время, запись, сегмент, смещение конца кадра)
+        self._cache: Deque[Tuple[int, float, Dict[str, Any], int, int]] = deque()
+        self._buffer: List[Tuple[int, bytes]] = []
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._segments: List[int] = []
+        self._file = None
+        self._file_segment: Optional[int] = None
+        self.stats = {'appended': 0, 'commits': 0, 'acknowledged': 0, 'disk_reads': 0, 'truncated_bytes': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_handle = open(os.path.join(directory, LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_handle.close()
+                raise RuntimeError(f"Журнал {directory} уже открыт другим процессом")
+
+        self._replay()
+
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._commit_loop, name="event-wal-commit", daemon=True)
+        self._thread.start()
+
+    # --- Восстановление ---
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}{SEGMENT_SUFFIX}")
+
+    def _read_checkpoint(self) -> Dict[str, int]:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return {'acked': 0, 'segment': 0, 'offset': 0}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'acked': self.acked_seq, 'segment': self._cursor[0], 'offset': self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _scan(self, segment: int, offset: int):
+        """Кадры сегмента начиная со смещения: (seq, время, запись, конец кадра)"""
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    if header:
+                        raise EOFError(offset)
+                    return
+                length, crc, seq, appended_at = FRAME_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    raise EOFError(offset)
+                offset += FRAME_HEADER.size + length
+                yield seq, appended_at, decode_value(payload), offset
+
+    def _replay(self):
+        self._segments = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                                if name.endswith(SEGMENT_SUFFIX))
+        checkpoint = self._read_checkpoint()
+        self.acked_seq = checkpoint['acked']
+        self._cursor = (checkpoint['segment'], checkpoint['offset'])
+        if self._segments and self._cursor[0] not in self._segments:
+            self._cursor = (self._segments[0], 0)
+
+        last_seq = self.acked_seq
+        replayed = 0
+        for index, segment in enumerate(self._segments):
+            if segment < self._cursor[0]:
+                continue
+            offset = self._cursor[1] if segment == self._cursor[0] else 0
+            try:
+                for seq, appended_at, record, end in self._scan(segment, offset):
+                    last_seq = seq
+                    if seq > self.acked_seq:
+                        self._remember(seq, appended_at, record, segment, end)
+                        replayed += 1
+                    else:
+                        self._cursor = (segment, end)
+            except EOFError as e:
+                # Оборванная запись при сбое: отсекаем хвост сегмента
+                valid = e.args[0]
+                path = self._segment_path(segment)
+                self.stats['truncated_bytes'] += os.path.getsize(path) - valid
+                with open(path, 'r+b') as f:
+                    f.truncate(valid)
+                if index != len(self._segments) - 1:
+                    logger.error(f"Поврежден сегмент журнала {path}, последующие сегменты отброшены")
+                    for later in self._segments[index + 1:]:
+                        os.remove(self._segment_path(later))
+                    self._segments = self._segments[:index + 1]
+                break
+
+        self.next_seq = last_seq + 1
+        self.committed_seq = last_seq
+        self._write_segment = self._segments[-1] if self._segments else None
+        self._write_offset = os.path.getsize(self._segment_path(self._write_segment)) if self._segments else 0
+        if replayed:
+            logger.info(f"Восстановлено {replayed} незапечатанных событий из журнала {self.directory}")
+
+    def _remember(self, seq: int, appended_at: float, record: Dict[str, Any], segment: int, end: int):
+        self._cache.append((seq, appended_at, record, segment, end))
+        if len(self._cache) > self.memory_limit:
+            self._cache.popleft()
+
+    # --- Запись ---
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Добавление записи; возвращает номер (фиксация на диске - групповая)"""
+        payload = encode_value(record)
+        appended_at = time.time()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Журнал закрыт")
+            seq = self.next_seq
+            self.next_seq += 1
+            frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload), seq, appended_at) + payload
+
+            if self._write_segment is None or (
+                    self._write_offset > 0 and self._write_offset + len(frame) > self.segment_bytes):
+                self._write_segment = seq
+                self._write_offset = 0
+                self._segments.append(seq)
+            self._write_offset += len(frame)
+
+            self._buffer.append((self._write_segment, frame))
+            self._remember(seq, appended_at, record, self._write_segment, self._write_offset)
+            self.stats['appended'] += 1
+        self._wakeup.set()
+        return seq
+
+    async def append_durable(self, record: Dict[str, Any]) -> int:
+        """Добавление с ожиданием групповой фиксации (без блокировки цикла событий)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        seq = self.append(record)
+        with self._lock:
+            if seq <= self.committed_seq:
+                return seq
+            self._waiters.append((seq, loop, future))
+        await future
+        return seq
+
+    def wait_committed(self, seq: int, timeout: Optional[float] = None) -> bool:
+        with self._committed:
+            return self._committed.wait_for(lambda: self.committed_seq >= seq or self._closed, timeout)
+
+    def _commit_loop(self):
+        while True:
+            self._wakeup.wait()
+            # Окно группировки: записи, пришедшие за commit_interval, фиксируются одним fsync
+            time.sleep(self.commit_interval)
+            self._wakeup.clear()
+            try:
+                self._commit()
+            except Exception as e:
+                logger.error(f"Ошибка фиксации журнала событий: {e}")
+                time.sleep(1)
+                self._wakeup.set()
+            if self._closed:
+                return
+
+    def _commit(self):
+        with self._lock:
+            frames, self._buffer = self._buffer, []
+            last_seq = self.next_seq - 1
+        if not frames:
+            return
+
+        for segment, frame in frames:
+            if segment != self._file_segment:
+                if self._file is not None:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                self._file = open(self._segment_path(segment), 'ab')
+                self._file_segment = segment
+            self._file.write(frame)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        with self._committed:
+            self.committed_seq = last_seq
+            self.stats['commits'] += 1
+            ready = [waiter for waiter in self._waiters if waiter[0] <= last_seq]
+            self._waiters = [waiter for waiter in self._waiters if waiter[0] > last_seq]
+            self._committed.notify_all()
+        for _, loop, future in ready:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def sync(self):
+        """Немедленная фиксация буфера"""
+        with self._lock:
+            seq = self.next_seq - 1
+        self._wakeup.set()
+        self.wait_committed(seq)
+
+    # --- Чтение и подтверждение ---
+
+    @property
+    def pending(self) -> int:
+        return self.next_seq - 1 - self.acked_seq
+
+    @property
+    def ready(self) -> int:
+        """Зафиксированные, но еще не подтвержденные записи"""
+        return self.committed_seq - self.acked_seq
+
+    def peek(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Первые limit зафиксированных неподтвержденных записей (из памяти или с диска)"""
+        return [(seq, record) for seq, _, record, _, _ in self._peek(limit)]
+
+    def _peek(self, limit: int) -> List[Tuple[int, float, Dict[str, Any], int, int]]:
+        with self._lock:
+            start = self.acked_seq + 1
+            committed = self.committed_seq
+            # Потребителю выдаются только записи, уже зафиксированные на диске
+            limit = min(limit, committed - self.acked_seq)
+            if limit <= 0:
+                return []
+            if self._cache and self._cache[0][0] <= start:
+                skip = start - self._cache[0][0]
+                return [self._cache[i] for i in range(skip, min(skip + limit, len(self._cache)))]
+            cursor = self._cursor
+            segments = [segment for segment in self._segments if segment >= cursor[0]]
+
+        # Вытесненные из памяти записи уже зафиксированы на диске
+        self.stats['disk_reads'] += 1
+        result = []
+        for segment in segments:
+            offset = cursor[1] if segment == cursor[0] else 0
+            try:
+                for seq, appended_at, record, end in self._scan(segment, offset):
+                    if seq > committed or len(result) >= limit:
+                        return result
+                    if seq >= start:
+                        result.append((seq, appended_at, record, segment, end))
+            except EOFError:
+                # Кадр, который поток фиксации дописывает прямо сейчас
+                return result
+            except FileNotFoundError:
+                # Сегмент удален после подтверждения или еще не создан потоком фиксации
+                continue
+        return result
+
+    def oldest_pending_age(self) -> Optional[float]:
+        """Возраст самой старой незапечатанной записи в секундах"""
+        if not self.pending:
+            return None
+        head = self._peek(1)
+        return time.time() - head[0][1] if head else None
+
+    def acknowledge(self, seq: int, position: Optional[Tuple[int, int]] = None):
+        """Подтверждение обработки записей до seq включительно"""
+        if position is None:
+            entry = next((item for item in self._peek(seq - self.acked_seq) if item[0] == seq), None)
+            if entry is None:
+                raise ValueError(f"Запись {seq} не найдена в журнале")
+            position = (entry[3], entry[4])
+        with self._lock:
+            if seq <= self.acked_seq:
+                return
+            self.stats['acknowledged'] += seq - self.acked_seq
+            self.acked_seq = seq
+            self._cursor = position
+            while self._cache and self._cache[0][0] <= seq:
+                self._cache.popleft()
+            obsolete = [segment for segment in self._segments[:-1] if segment < position[0]]
+            self._segments = [segment for segment in self._segments if segment not in obsolete]
+            self._write_checkpoint()
+        for segment in obsolete:
+            os.remove(self._segment_path(segment))
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'pending': self.next_seq - 1 - self.acked_seq,
+                'in_memory': len(self._cache),
+                'memory_limit': self.memory_limit,
+                'uncommitted': self.next_seq - 1 - self.committed_seq,
+                'segments': len(self._segments),
+                'acked_seq': self.acked_seq,
+                'committed_seq': self.committed_seq,
+                **self.stats,
+            }
+
+    def close(self):
+        """Фиксация буфера и освобождение каталога"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self._commit()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with self._committed:
+            self._committed.notify_all()
+        if fcntl is not None:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+        self._lock_handle.close()
+
+class WALBlockSealer:
+    """Майнинг блоков как потребитель журнала
+
+    Полные блоки (block_size записей) запечатываются сразу; при seal_interval > 0
+    неполный блок запечатывается, когда самая старая запись ждет дольше
+    seal_interval. Записи подтверждаются после успешного seal(), поэтому
+    при сбое во время запечатывания они будут переданы повторно.
+    """
+
+    def __init__(self, wal: EventWAL, seal: Callable[[List[Dict[str, Any]], bool], Awaitable[Any]],
+                 block_size: int = 100, seal_interval: float = 0.0):
+        self.wal = wal
+        self.seal = seal
+        self.block_size = block_size
+        self.seal_interval = seal_interval
+        self.stats = {'blocks': 0, 'timed_blocks': 0, 'events': 0, 'errors': 0}
+        self.last_seal: Optional[float] = None
+
+    async def _seal_batch(self, partial: bool) -> int:
+        batch = self.wal._peek(self.block_size)
+        if not batch:
+            return 0
+        try:
+            await self.seal([record for _, _, record, _, _ in batch], partial)
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        last = batch[-1]
+        await asyncio.to_thread(self.wal.acknowledge, last[0], (last[3], last[4]))
+        self.stats['blocks'] += 1
+        self.stats['timed_blocks'] += int(partial)
+        self.stats['events'] += len(batch)
+        self.last_seal = time.time()
+        return len(batch)
+
+    async def poll(self) -> int:
+        """Запечатывание готовых блоков; возвращает число обработанных записей"""
+        processed = 0
+        while self.wal.ready >= self.block_size:
+            sealed = await self._seal_batch(partial=False)
+            if not sealed:
+                break
+            processed += sealed
+        if self.seal_interval > 0:
+            age = self.wal.oldest_pending_age()
+            if age is not None and age >= self.seal_interval:
+                processed += await self._seal_batch(partial=True)
+        return processed
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'block_size': self.block_size,
+            'seal_interval': self.seal_interval,
+            'last_seal': self.last_seal,
+            **self.stats,
+            'wal': self.wal.get_status(),
+        }
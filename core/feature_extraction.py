@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Извлечение признаков событий безопасности
+Преобразование событий в строки признаков фиксированной ширины для ML системы
+"""
+
+import ipaddress
+import logging
+import math
+import re
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {'INFO': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CRITICAL': 4}
+
+# Категориальные поля, кодируемые хешированием признаков
+CATEGORICAL_FIELDS = (
+    'event_type',
+    'source',
+    'process_name',
+    'connection_type',
+    'query_type',
+    'file_extension',
+    'domain_tld',
+)
+
+# Числовые признаки (порядок столбцов фиксирован)
+NUMERIC_FEATURES = (
+    'severity',
+    'port',
+    'port_well_known',
+    'cpu_usage',
+    'memory_usage_gb',
+    'network_connections',
+    'domain_length',
+    'domain_entropy',
+    'domain_digit_ratio',
+    'source_ip_private',
+    'target_ip_private',
+    'hour_sin',
+    'hour_cos',
+    'entity_event_rate',
+    'entity_mean_cpu',
+    'entity_mean_severity',
+)
+
+SIZE_UNITS = {'b': 1e-9, 'kb': 1e-6, 'mb': 1e-3, 'gb': 1.0, 'tb': 1e3}
+SIZE_PATTERN = re.compile(r'([\d.]+)\s*([kmgt]?b)', re.IGNORECASE)
+
+def shannon_entropy(text: str) -> float:
+    """Энтропия Шеннона строки (бит на символ)"""
+    if not text:
+        return 0.0
+    counts: Dict[str, int] = {}
+    for char in text:
+        counts[char] = counts.get(char, 0) + 1
+    length = len(text)
+    return -sum(count / length * math.log2(count / length) for count in counts.values())
+
+def _parse_size_gb(value: Any) -> float:
+    """Разбор размера памяти ('2.1 GB') в гигабайты"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = SIZE_PATTERN.search(value)
+        if match:
+            return float(match.group(1)) * SIZE_UNITS[match.group(2).lower()]
+    return 0.0
+
+def _is_private_ip(value: Any) -> float:
+    """Признак приватного IP адреса (-1 если адрес отсутствует)"""
+    if not value:
+        return -1.0
+    try:
+        return 1.0 if ipaddress.ip_address(str(value)).is_private else 0.0
+    except ValueError:
+        return -1.0
+
+class EntityRingBuffers:
+    """Скользящие агрегаты по сущностям в заранее выделенных кольцевых буферах
+
+    Для каждой сущности (хоста или IP) хранится окно последних событий:
+    время, загрузка CPU и уровень угрозы. Слоты сущностей переиспользуются
+    по LRU, поэтому объем памяти фиксирован: max_entities * window * 16 байт.
+    """
+
+    def __init__(self, max_entities: int = 10000, window: int = 64, horizon_seconds: float = 300.0):
+        self.max_entities = max_entities
+        self.window = window
+        self.horizon_seconds = horizon_seconds
+
+        self.timestamps = np.zeros((max_entities, window), dtype=np.float64)
+        self.cpu = np.zeros((max_entities, window), dtype=np.float32)
+        self.severity = np.zeros((max_entities, window), dtype=np.float32)
+        self.heads = np.zeros(max_entities, dtype=np.int64)
+        self.sizes = np.zeros(max_entities, dtype=np.int64)
+
+        self.slots: 'OrderedDict[str, int]' = OrderedDict()
+        self.free_slots = list(range(max_entities - 1, -1, -1))
+
+    def _slot(self, entity: str) -> int:
+        """Получение слота сущности с вытеснением наименее используемой"""
+        slot = self.slots.get(entity)
+        if slot is not None:
+            self.slots.move_to_end(entity)
+            return slot
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            _, slot = self.slots.popitem(last=False)
+        self.heads[slot] = 0
+        self.sizes[slot] = 0
+        self.slots[entity] = slot
+        return slot
+
+    def update(self, entity: str, timestamp: float, cpu: float, severity: float) -> int:
+        """Добавление наблюдения в окно сущности"""
+        slot = self._slot(entity)
+        head = self.heads[slot]
+        self.timestamps[slot, head] = timestamp
+        self.cpu[slot, head] = cpu
+        self.severity[slot, head] = severity
+        self.heads[slot] = (head + 1) % self.window
+        self.sizes[slot] = min(self.sizes[slot] + 1, self.window)
+        return slot
+
+    def aggregates(self, slot: int, now: float) -> tuple:
+        """Частота событий, средняя загрузка CPU и средний уровень угрозы"""
+        size = self.sizes[slot]
+        if size == 0:
+            return 0.0, 0.0, 0.0
+
+        recent = (now - self.timestamps[slot, :size]) <= self.horizon_seconds
+        count = int(recent.sum())
+        if count == 0:
+            return 0.0, 0.0, 0.0
+
+        rate = count / self.horizon_seconds
+        mean_cpu = float(self.cpu[slot, :size][recent].mean())
+        mean_severity = float(self.severity[slot, :size][recent].mean())
+        return rate, mean_cpu, mean_severity
+
+class FeatureExtractor:
+    """Преобразование событий безопасности в строки признаков float32
+
+    Строка состоит из числовых признаков (NUMERIC_FEATURES) и блока
+    хешированных категориальных признаков ширины hash_buckets.
+    """
+
+    def __init__(self, hash_buckets: int = 32, entity_window: int = 64,
+                 max_entities: int = 10000, horizon_seconds: float = 300.0):
+        self.hash_buckets = hash_buckets
+        self.numeric_width = len(NUMERIC_FEATURES)
+        self.width = self.numeric_width + hash_buckets
+
+        self.entity_buffers = EntityRingBuffers(max_entities, entity_window, horizon_seconds)
+
+        self.events_processed = 0
+
+    @property
+    def feature_names(self) -> List[str]:
+        """Имена столбцов матрицы признаков"""
+        return list(NUMERIC_FEATURES) + [f"hash_{i}" for i in range(self.hash_buckets)]
+
+    def transform(self, event: Any) -> np.ndarray:
+        """Признаки одного события"""
+        row = np.zeros(self.width, dtype=np.float32)
+        self._fill_row(row, event)
+        self.events_processed += 1
+        return row
+
+    def transform_batch(self, events: Sequence[Any]) -> np.ndarray:
+        """Признаки пакета событий в виде матрицы (n, width) float32"""
+        out = np.zeros((len(events), self.width), dtype=np.float32)
+        for row, event in zip(out, events):
+            self._fill_row(row, event)
+        self.events_processed += len(events)
+        return out
+
+    def _fill_row(self, row: np.ndarray, event: Any):
+        """Заполнение строки признаков события"""
+        if isinstance(event, dict):
+            get = event.get
+        else:
+            get = lambda name, default=None: getattr(event, name, default)
+
+        data = get('data', None) or {}
+        if not isinstance(data, dict):
+            data = {}
+
+        severity = get('severity', 'INFO')
+        severity = str(getattr(severity, 'name', None) or getattr(severity, 'value', severity)).upper()
+        severity_value = SEVERITY_RANK.get(severity, 0) / 4.0
+
+        timestamp = self._to_timestamp(get('timestamp', None))
+
+        port = data.get('port') or 0
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            port = 0
+
+        cpu_usage = data.get('cpu_usage') or 0.0
+        try:
+            cpu_usage = float(cpu_usage) / 100.0
+        except (TypeError, ValueError):
+            cpu_usage = 0.0
+
+        domain = str(data.get('domain') or '').lower()
+        domain_label = domain.split('.')[0] if domain else ''
+
+        connections = data.get('network_connections') or []
+        connections = len(connections) if isinstance(connections, (list, tuple)) else 0
+
+        moment = datetime.fromtimestamp(timestamp)
+        hour = moment.hour + moment.minute / 60.0
+
+        # Скользящие агрегаты по сущности (хост, иначе IP источника)
+        entity = data.get('source_host') or data.get('source_ip') or get('source', None)
+        rate = mean_cpu = mean_severity = 0.0
+        if entity:
+            slot = self.entity_buffers.update(str(entity), timestamp, cpu_usage, severity_value)
+            rate, mean_cpu, mean_severity = self.entity_buffers.aggregates(slot, timestamp)
+
+        row[0] = severity_value
+        row[1] = port / 65535.0
+        row[2] = 1.0 if 0 < port < 1024 else 0.0
+        row[3] = cpu_usage
+        row[4] = _parse_size_gb(data.get('memory_usage'))
+        row[5] = connections
+        row[6] = len(domain) / 253.0
+        row[7] = shannon_entropy(domain_label)
+        row[8] = sum(c.isdigit() for c in domain_label) / len(domain_label) if domain_label else 0.0
+        row[9] = _is_private_ip(data.get('source_ip'))
+        row[10] = _is_private_ip(data.get('target_ip'))
+        row[11] = math.sin(2 * math.pi * hour / 24.0)
+        row[12] = math.cos(2 * math.pi * hour / 24.0)
+        row[13] = rate
+        row[14] = mean_cpu
+        row[15] = mean_severity
+
+        # Хеширование категориальных признаков со знаком
+        file_path = str(data.get('file_path') or '')
+        categorical = {
+            'event_type': get('event_type', None),
+            'source': get('source', None),
+            'process_name': data.get('process_name'),
+            'connection_type': data.get('connection_type'),
+            'query_type': data.get('query_type'),
+            'file_extension': file_path.rsplit('.', 1)[-1].lower() if '.' in file_path else None,
+            'domain_tld': domain.rsplit('.', 1)[-1] if '.' in domain else None,
+        }
+        for field_name in CATEGORICAL_FIELDS:
+            value = categorical[field_name]
+            if value is None:
+                continue
+            digest = zlib.crc32(f"{field_name}={str(value).lower()}".encode('utf-8'))
+            bucket = self.numeric_width + digest % self.hash_buckets
+            row[bucket] += 1.0 if digest & 0x80000000 else -1.0
+
+    @staticmethod
+    def _to_timestamp(value: Any) -> float:
+        """Преобразование времени события в UNIX timestamp"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                pass
+        return time.time()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса экстрактора признаков"""
+        return {
+            'feature_width': self.width,
+            'hash_buckets': self.hash_buckets,
+            'tracked_entities': len(self.entity_buffers.slots),
+            'events_processed': self.events_processed,
+        }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Параллельный поиск гиперпараметров
+Запуск испытаний Optuna в пуле процессов с общим журнальным хранилищем
+"""
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def resolve_objective(objective_path: str) -> Callable:
+    """Импорт целевой функции по пути вида 'module:function'
+
+    Рабочие процессы импортируют целевую функцию сами, поэтому она должна
+    быть доступна по имени модуля, а не передаваться как замыкание.
+    """
+    module_name, _, attr = objective_path.partition(':')
+    if not module_name or not attr:
+        raise ValueError(f"Ожидается путь вида 'module:function', получено: {objective_path}")
+    return getattr(importlib.import_module(module_name), attr)
+
+def create_storage(journal_path: str):
+    """Журнальное хранилище Optuna в локальном файле, общее для процессов"""
+    import optuna
+
+    directory = os.path.dirname(journal_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    try:
+        from optuna.storages.journal import JournalFileBackend
+        backend = JournalFileBackend(journal_path)
+    except ImportError:
+        # Optuna < 4.0
+        backend = optuna.storages.JournalFileStorage(journal_path)
+
+    return optuna.storages.JournalStorage(backend)
+
+def create_pruner(n_startup_trials: int = 5, n_warmup_steps: int = 3):
+    """Отсечение неперспективных испытаний по медиане промежуточных значений"""
+    import optuna
+    return optuna.pruners.MedianPruner(
+        n_startup_trials=n_startup_trials,
+        n_warmup_steps=n_warmup_steps
+    )
+
+def _run_worker(study_name: str, journal_path: str, objective_path: str,
+                deadline: float, n_trials: int) -> int:
+    """Рабочий процесс: выполнение испытаний до исчерпания общего бюджета
+
+    Число испытаний ограничено для всего исследования через общее
+    хранилище: выполняемые испытания других процессов тоже учитываются,
+    чтобы процессы не начинали лишние испытания.
+    """
+    import optuna
+    states = optuna.trial.TrialState
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=create_storage(journal_path),
+        pruner=create_pruner()
+    )
+    objective = resolve_objective(objective_path)
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return 0
+
+    counted = (states.COMPLETE, states.PRUNED, states.RUNNING)
+    if len(study.get_trials(deepcopy=False, states=counted)) >= n_trials:
+        return 0
+
+    before = len(study.trials)
+    study.optimize(objective, n_trials=n_trials, timeout=remaining, gc_after_trial=True,
+                   callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=counted)])
+    return len(study.trials) - before
+
+class ParallelHyperparameterSearch:
+    """Параллельный поиск гиперпараметров для оптимизации ML моделей
+
+    Несколько процессов выполняют испытания одного исследования Optuna через
+    общее журнальное хранилище. Новое исследование стартует с лучших
+    параметров предыдущего, а цикл ограничен бюджетом по времени.
+    """
+
+    def __init__(self, journal_path: str = "results/optuna_journal.log", n_workers: int = 4,
+                 study_prefix: str = "auto_optimize", direction: str = "maximize"):
+        self.journal_path = journal_path
+        self.n_workers = max(1, n_workers)
+        self.study_prefix = study_prefix
+        self.direction = direction
+
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def optimize(self, objective_path: str, n_trials: int = 100,
+                 budget_seconds: float = 900.0) -> Dict[str, Any]:
+        """Запуск цикла оптимизации (блокирующий вызов)"""
+        import optuna
+
+        storage = create_storage(self.journal_path)
+        study_name = f"{self.study_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        study = optuna.create_study(
+            study_name=study_name,
+            storage=storage,
+            direction=self.direction,
+            pruner=create_pruner()
+        )
+
+        warm_start = self._warm_start(study, storage)
+
+        started_at = time.time()
+        deadline = started_at + budget_seconds
+
+        logger.info(f"Параллельная оптимизация {study_name}: {self.n_workers} процессов, "
+                    f"{n_trials} испытаний, бюджет {budget_seconds:.0f} с")
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.n_workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_run_worker, study_name, self.journal_path, objective_path,
+                            deadline, n_trials)
+                for _ in range(self.n_workers)
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка рабочего процесса оптимизации: {e}")
+
+        study = optuna.load_study(study_name=study_name, storage=storage)
+        self.last_report = self._build_report(study, started_at, warm_start)
+
+        logger.info(f"Оптимизация {study_name} завершена: "
+                    f"{self.last_report['completed_trials']} испытаний, "
+                    f"{self.last_report['trials_per_hour']:.0f} испытаний/час, "
+                    f"лучшее значение {self.last_report['best_value']}")
+        return self.last_report
+
+    async def optimize_async(self, objective_path: str, n_trials: int = 100,
+                             budget_seconds: float = 900.0) -> Dict[str, Any]:
+        """Запуск цикла оптимизации без блокировки цикла событий"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.optimize, objective_path, n_trials, budget_seconds)
+
+    def _warm_start(self, study, storage) -> Optional[Dict[str, Any]]:
+        """Постановка в очередь лучших параметров предыдущего исследования"""
+        import optuna
+
+        previous = [
+            summary for summary in optuna.get_all_study_summaries(storage)
+            if summary.study_name.startswith(self.study_prefix)
+            and summary.study_name != study.study_name
+            and summary.best_trial is not None
+        ]
+        if not previous:
+            return None
+
+        latest = max(previous, key=lambda summary: summary.datetime_start or datetime.min)
+        params = latest.best_trial.params
+        study.enqueue_trial(params, skip_if_exists=True)
+
+        logger.info(f"Теплый старт из {latest.study_name}: {params}")
+        return {'study_name': latest.study_name, 'params': params}
+
+    def _build_report(self, study, started_at: float,
+                      warm_start: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Отчет: число испытаний в час и динамика лучшего значения"""
+        import optuna
+
+        states = optuna.trial.TrialState
+        completed = [t for t in study.trials if t.state == states.COMPLETE]
+        pruned = [t for t in study.trials if t.state == states.PRUNED]
+        failed = [t for t in study.trials if t.state == states.FAIL]
+
+        elapsed = max(time.time() - started_at, 1e-9)
+        finished = sorted(
+            (t for t in completed if t.datetime_complete is not None),
+            key=lambda t: t.datetime_complete
+        )
+
+        # Лучшее значение на момент завершения каждого испытания
+        best_over_time: List[List[float]] = []
+        best = None
+        maximize = self.direction == "maximize"
+        for trial in finished:
+            if best is None or (trial.value > best if maximize else trial.value < best):
+                best = trial.value
+                best_over_time.append([
+                    round(trial.datetime_complete.timestamp() - started_at, 3),
+                    best
+                ])
+
+        return {
+            'study_name': study.study_name,
+            'workers': self.n_workers,
+            'completed_trials': len(completed),
+            'pruned_trials': len(pruned),
+            'failed_trials': len(failed),
+            'elapsed_seconds': round(elapsed, 3),
+            'trials_per_hour': (len(completed) + len(pruned)) / elapsed * 3600,
+            'best_value': study.best_value if completed else None,
+            'best_params': study.best_params if completed else {},
+            'best_over_time': best_over_time,
+            'warm_start': warm_start,
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса поиска гиперпараметров"""
+        return {
+            'workers': self.n_workers,
+            'journal_path': self.journal_path,
+            'last_report': self.last_report,
+        }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Параллельная инициализация подсистем с учетом зависимостей
+Независимые шаги запускаются одновременно под общим таймаутом, необязательные
+шаги завершаются в фоне и при ошибке отключаются, не прерывая запуск
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .lazy_components import StartupProfiler
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED = 'pending', 'running', 'done', 'failed', 'skipped'
+
+class InitStep:
+    """Шаг инициализации: корутина, зависимости и политика ошибок"""
+
+    __slots__ = ('name', 'func', 'depends_on', 'required', 'timeout', 'on_failure',
+                 'status', 'error', 'started_at', 'finished_at')
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], depends_on: Iterable[str] = (),
+                 required: bool = True, timeout: Optional[float] = None,
+                 on_failure: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.required = required
+        self.timeout = timeout
+        self.on_failure = on_failure
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 2)
+
+class InitGraph:
+    """Граф шагов инициализации
+
+    Шаг запускается, как только успешно завершились все его зависимости.
+    run() ждет только обязательные шаги (и их зависимости) в пределах
+    общего таймаута; необязательные продолжают выполняться в фоне, а при
+    ошибке или таймауте вызывают on_failure и пропускают зависимые шаги.
+    Ошибка обязательного шага прерывает запуск.
+    """
+
+    def __init__(self, profiler: Optional[StartupProfiler] = None, step_timeout: Optional[float] = None):
+        self.profiler = profiler or StartupProfiler()
+        self.step_timeout = step_timeout
+        self.steps: Dict[str, InitStep] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started_at: Optional[float] = None
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], depends_on: Iterable[str] = (),
+            required: bool = True, timeout: Optional[float] = None,
+            on_failure: Optional[Callable[[str], None]] = None) -> 'InitGraph':
+        if name in self.steps:
+            raise ValueError(f"Шаг инициализации {name} уже добавлен")
+        self.steps[name] = InitStep(name, func, depends_on, required, timeout, on_failure)
+        return self
+
+    def add_sync(self, name: str, func: Callable[[], Any], **kwargs) -> 'InitGraph':
+        """Синхронный шаг (чтение файлов, векторизация) в пуле потоков"""
+        return self.add(name, lambda: asyncio.to_thread(func), **kwargs)
+
+    def _check(self):
+        for step in self.steps.values():
+            missing = [name for name in step.depends_on if name not in self.steps]
+            if missing:
+                raise ValueError(f"Шаг {step.name} зависит от неизвестных шагов: {missing}")
+
+        # Обход в глубину для поиска циклов
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 1:
+                raise ValueError(f"Цикл зависимостей инициализации: {' -> '.join(path + [name])}")
+            if state.get(name) == 2:
+                return
+            state[name] = 1
+            for dependency in self.steps[name].depends_on:
+                visit(dependency, path + [name])
+            state[name] = 2
+
+        for name in self.steps:
+            visit(name, [])
+
+    def ready(self, name: str) -> bool:
+        """Шаг успешно завершен (подсистема готова к использованию)"""
+        step = self.steps.get(name)
+        return step is not None and step.status == DONE
+
+    async def _run_step(self, step: InitStep) -> bool:
+        dependencies = [self._tasks[name] for name in step.depends_on]
+        if dependencies:
+            results = await asyncio.gather(*dependencies)
+            if not all(results):
+                step.status = SKIPPED
+                step.error = "не выполнены зависимости: " + ", ".join(
+                    name for name, ok in zip(step.depends_on, results) if not ok)
+                self._fail(step)
+                return False
+
+        step.status = RUNNING
+        step.started_at = time.perf_counter()
+        timeout = step.timeout if step.timeout is not None else self.step_timeout
+        try:
+            with self.profiler.measure(f"{step.name}.init"):
+                await asyncio.wait_for(step.func(), timeout)
+            step.status = DONE
+            return True
+        except asyncio.TimeoutError:
+            step.status = FAILED
+            step.error = f"таймаут {timeout} с"
+        except asyncio.CancelledError:
+            step.status = FAILED
+            step.error = "отменен"
+            raise
+        except Exception as e:
+            step.status = FAILED
+            step.error = str(e)
+        finally:
+            step.finished_at = time.perf_counter()
+        self._fail(step)
+        return False
+
+    def _fail(self, step: InitStep):
+        level = logging.ERROR if step.required else logging.WARNING
+        logger.log(level, f"Шаг инициализации {step.name} не выполнен ({step.error})"
+                          f"{'' if step.required else ', подсистема отключена'}")
+        if step.on_failure is not None:
+            try:
+                step.on_failure(step.error)
+            except Exception as e:
+                logger.error(f"Ошибка обработки отказа шага {step.name}: {e}")
+
+    def _required_closure(self) -> List[str]:
+        """Обязательные шаги вместе с их зависимостями"""
+        names: List[str] = []
+        stack = [name for name, step in self.steps.items() if step.required]
+        while stack:
+            name = stack.pop()
+            if name not in names:
+                names.append(name)
+                stack.extend(self.steps[name].depends_on)
+        return names
+
+    async def run(self, timeout: Optional[float] = None) -> bool:
+        """Запуск всех шагов; True, если обязательные шаги выполнены в срок"""
+        self._check()
+        self._started_at = time.perf_counter()
+        # Задачи создаются в порядке добавления; зависимости ожидаются внутри
+        for name, step in self.steps.items():
+            self._tasks[name] = asyncio.create_task(self._run_step(step), name=f"init-{name}")
+
+        required = [self._tasks[name] for name in self._required_closure()]
+        if not required:
+            return True
+
+        done, pending = await asyncio.wait(required, timeout=timeout)
+        if pending:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.error(f"Инициализация не завершилась за {timeout} с: "
+                         f"{[name for name, task in self._tasks.items() if task in pending]}")
+            return False
+        return all(task.result() for task in done)
+
+    async def wait_background(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание фоновых (необязательных) шагов"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+
+    async def cancel(self):
+        """Отмена незавершенных шагов (при остановке системы)"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Статус и время инициализации по шагам"""
+        origin = self._started_at
+        return {
+            step.name: {
+                'status': step.status,
+                'required': step.required,
+                'started_ms': round((step.started_at - origin) * 1000, 2)
+                if step.started_at is not None and origin is not None else None,
+                'duration_ms': step.duration_ms,
+                'error': step.error,
+            }
+            for step in self.steps.values()
+        }
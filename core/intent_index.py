@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Индекс намерений для обработки текстовых команд
+Корпус намерений векторизуется TF-IDF один раз, запрос оценивается одним умножением
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Корпус намерений по умолчанию: фразы команд AI ассистента
+DEFAULT_INTENTS: Dict[str, List[str]] = {
+    'system_status': [
+        "проверить статус системы",
+        "статус системы",
+        "как работает система",
+        "состояние системы безопасности",
+        "check system status",
+        "system status",
+    ],
+    'threat_report': [
+        "сгенерировать отчет по последним угрозам",
+        "отчет по угрозам",
+        "покажи последние угрозы",
+        "какие угрозы обнаружены",
+        "generate threat report",
+        "show recent threats",
+    ],
+    'block_ip': [
+        "заблокировать ip адрес",
+        "заблокируй ip",
+        "блокировка ip",
+        "block ip address",
+        "block this ip",
+    ],
+    'scan_network': [
+        "сканировать сеть",
+        "запустить сканирование",
+        "проверить сеть на угрозы",
+        "scan network",
+        "run security scan",
+    ],
+    'list_incidents': [
+        "показать инциденты",
+        "список инцидентов",
+        "открытые инциденты",
+        "show incidents",
+        "list open incidents",
+    ],
+    'blockchain_status': [
+        "проверить целостность блокчейна",
+        "статус блокчейна",
+        "verify blockchain integrity",
+        "blockchain status",
+    ],
+    'toggle_voice': [
+        "включить голос",
+        "выключить голос",
+        "голосовой режим",
+        "enable voice",
+        "disable voice",
+    ],
+    'help': [
+        "помощь",
+        "что ты умеешь",
+        "список команд",
+        "help",
+        "what can you do",
+    ],
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s.:]+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Нормализация запроса: регистр, ё, пунктуация и пробелы"""
+    text = text.lower().replace('ё', 'е')
+    text = _PUNCTUATION.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+class IntentIndex:
+    """Классификатор намерений на TF-IDF с предвычисленной матрицей корпуса
+
+    Фразы корпуса векторизуются один раз (символьные n-граммы устойчивы к
+    словоформам без лемматизации) и сохраняются на диск. Запрос оценивается
+    одним умножением разреженной матрицы на вектор, а результаты для
+    нормализованных запросов кешируются в LRU.
+    """
+
+    def __init__(self, intents: Optional[Dict[str, Sequence[str]]] = None,
+                 cache_path: Optional[str] = None, threshold: float = 0.4, cache_size: int = 4096):
+        self.intents = {name: list(phrases) for name, phrases in (intents or DEFAULT_INTENTS).items()}
+        self.cache_path = cache_path
+        self.threshold = threshold
+
+        self.vectorizer = None
+        self.matrix = None
+        self.intent_names: List[str] = []
+        self.row_intents: Optional[np.ndarray] = None
+        self._row_offsets: Optional[np.ndarray] = None
+
+        self._classify_cached = lru_cache(maxsize=cache_size)(self._classify_normalized)
+        self.corpus_hash = self._corpus_hash()
+
+    def _corpus_hash(self) -> str:
+        """Хеш корпуса для проверки актуальности сохраненной матрицы"""
+        payload = json.dumps(self.intents, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def build(self) -> 'IntentIndex':
+        """Загрузка матрицы с диска или векторизация корпуса"""
+        if self.cache_path and self._load():
+            return self
+
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        phrases, labels = [], []
+        self.intent_names = sorted(self.intents)
+        for label, name in enumerate(self.intent_names):
+            for phrase in self.intents[name]:
+                phrases.append(normalize_text(phrase))
+                labels.append(label)
+
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4), sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform(phrases).tocsr()
+        self.row_intents = np.asarray(labels, dtype=np.int64)
+        self._prepare()
+
+        if self.cache_path:
+            self._save()
+
+        logger.info(f"Индекс намерений построен: {len(self.intent_names)} намерений, "
+                    f"{self.matrix.shape[0]} фраз, {self.matrix.shape[1]} признаков")
+        return self
+
+    def _prepare(self):
+        """Смещения строк каждого намерения для максимума по группам"""
+        self._row_offsets = np.flatnonzero(np.r_[True, np.diff(self.row_intents) != 0])
+        self._classify_cached.cache_clear()
+
+    def _save(self):
+        """Сохранение векторизатора и матрицы корпуса"""
+        import joblib
+
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        joblib.dump({
+            'corpus_hash': self.corpus_hash,
+            'vectorizer': self.vectorizer,
+            'matrix': self.matrix,
+            'intent_names': self.intent_names,
+            'row_intents': self.row_intents,
+        }, self.cache_path)
+
+    def _load(self) -> bool:
+        """Загрузка сохраненной матрицы, если корпус не изменился"""
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            import joblib
+            data = joblib.load(self.cache_path)
+            if data.get('corpus_hash') != self.corpus_hash:
+                logger.info("Корпус намерений изменился, индекс будет перестроен")
+                return False
+
+            self.vectorizer = data['vectorizer']
+            self.matrix = data['matrix']
+            self.intent_names = data['intent_names']
+            self.row_intents = data['row_intents']
+            self._prepare()
+            logger.info(f"Индекс намерений загружен из {self.cache_path}")
+            return True
+
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить индекс намерений: {e}")
+            return False
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Определение намерения запроса: (намерение, сходство)"""
+        if self.matrix is None:
+            self.build()
+        return self._classify_cached(normalize_text(text))
+
+    def _classify_normalized(self, text: str) -> Tuple[str, float]:
+        if not text:
+            return 'unknown', 0.0
+
+        query = self.vectorizer.transform([text])
+        scores = (self.matrix @ query.T).toarray().ravel()
+        per_intent = np.maximum.reduceat(scores, self._row_offsets)
+
+        best = int(per_intent.argmax())
+        score = float(per_intent[best])
+        if score < self.threshold:
+            return 'unknown', score
+        return self.intent_names[int(self.row_intents[self._row_offsets[best]])], score
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Сходство запроса со всеми намерениями"""
+        if self.matrix is None:
+            self.build()
+        query = self.vectorizer.transform([normalize_text(text)])
+        scores = (self.matrix @ query.T).toarray().ravel()
+        per_intent = np.maximum.reduceat(scores, self._row_offsets)
+        return {
+            self.intent_names[int(self.row_intents[offset])]: float(score)
+            for offset, score in zip(self._row_offsets, per_intent)
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса индекса намерений"""
+        cache = self._classify_cached.cache_info()
+        return {
+            'intents': len(self.intents),
+            'phrases': 0 if self.matrix is None else self.matrix.shape[0],
+            'cache_hits': cache.hits,
+            'cache_misses': cache.misses,
+            'cache_size': cache.currsize,
+        }
+
+def benchmark_intent_index(index: IntentIndex, messages: Optional[Sequence[str]] = None,
+                           repeats: int = 2000) -> Dict[str, Any]:
+    """Сообщений в секунду и p99 задержки с кешем и без него"""
+    index.build()
+    messages = list(messages or [
+        "Проверить статус системы",
+        "Сгенерировать отчет по последним угрозам",
+        "заблокируй ip 192.168.1.100",
+        "покажи открытые инциденты",
+        "что ты умеешь?",
+    ])
+
+    def run(cached: bool) -> Dict[str, float]:
+        samples = []
+        for i in range(repeats):
+            message = messages[i % len(messages)]
+            if not cached:
+                # Уникальный запрос, чтобы обойти кеш
+                message = f"{message} {i}"
+            start = time.perf_counter()
+            index.classify(message)
+            samples.append(time.perf_counter() - start)
+        values = np.array(samples) * 1000
+        return {
+            'messages_per_second': round(repeats / values.sum() * 1000, 1),
+            'p50_ms': round(float(np.percentile(values, 50)), 4),
+            'p99_ms': round(float(np.percentile(values, 99)), 4),
+        }
+
+    return {'uncached': run(False), 'cached': run(True)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк индекса намерений")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = benchmark_intent_index(IntentIndex(), repeats=args.repeats)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
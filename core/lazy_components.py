@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Ленивая инициализация компонентов AI ассистента
+Распознавание речи, синтез речи и чат-бот создаются при первом обращении,
+корпуса NLTK загружаются в фоновом потоке, время импорта каждого компонента профилируется
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StartupProfiler:
+    """Профиль запуска: время импорта и инициализации по компонентам"""
+
+    def __init__(self):
+        self._timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str):
+        """Замер времени блока (повторные замеры суммируются)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._timings[name] = self._timings.get(name, 0.0) + elapsed
+
+    def timed_import(self, module_name: str, component: Optional[str] = None) -> Any:
+        """Импорт модуля с учетом времени в профиле компонента"""
+        with self.measure(f"{component or module_name}.import"):
+            return importlib.import_module(module_name)
+
+    def report(self) -> Dict[str, float]:
+        """Время по компонентам в миллисекундах, по убыванию"""
+        with self._lock:
+            items = sorted(self._timings.items(), key=lambda item: item[1], reverse=True)
+        return {name: round(seconds * 1000, 2) for name, seconds in items}
+
+class LazyComponent:
+    """Компонент, создаваемый при первом обращении
+
+    Фабрика вызывается не более одного раза, в том числе при конкурентных
+    обращениях из нескольких потоков. Отключенный компонент или компонент,
+    фабрика которого завершилась ошибкой, возвращает None.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], enabled: bool = True,
+                 profiler: Optional[StartupProfiler] = None):
+        self.name = name
+        self.factory = factory
+        self.enabled = enabled
+        self.profiler = profiler or StartupProfiler()
+        self.error: Optional[str] = None
+        self._instance = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        """Экземпляр компонента (создается при первом вызове)"""
+        if self._loaded or not self.enabled:
+            return self._instance
+
+        with self._lock:
+            if not self._loaded:
+                try:
+                    with self.profiler.measure(f"{self.name}.init"):
+                        self._instance = self.factory()
+                    logger.info(f"Компонент {self.name} инициализирован")
+                except Exception as e:
+                    self.error = str(e)
+                    logger.warning(f"Компонент {self.name} недоступен: {e}")
+                self._loaded = True
+        return self._instance
+
+    def preload(self) -> Optional[threading.Thread]:
+        """Создание компонента в фоновом потоке"""
+        if self._loaded or not self.enabled:
+            return None
+        thread = threading.Thread(target=self.get, name=f"preload-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'loaded': self._loaded and self._instance is not None,
+            'error': self.error,
+        }
+
+class BackgroundLoader:
+    """Выполнение задач загрузки данных в фоновых потоках"""
+
+    def __init__(self, profiler: Optional[StartupProfiler] = None):
+        self.profiler = profiler or StartupProfiler()
+        self._threads: Dict[str, threading.Thread] = {}
+        self.errors: Dict[str, str] = {}
+
+    def submit(self, name: str, task: Callable[[], Any]):
+        """Запуск задачи в фоновом потоке"""
+        def run():
+            try:
+                with self.profiler.measure(name):
+                    task()
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.warning(f"Фоновая загрузка {name} не удалась: {e}")
+
+        thread = threading.Thread(target=run, name=f"loader-{name}", daemon=True)
+        self._threads[name] = thread
+        thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание завершения всех задач; False если истек таймаут"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._threads.values()):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+        return not any(thread.is_alive() for thread in self._threads.values())
+
+    def get_status(self) -> Dict[str, str]:
+        return {
+            name: 'error' if name in self.errors else ('loading' if thread.is_alive() else 'done')
+            for name, thread in self._threads.items()
+        }
+
+def load_nltk_corpora(corpora: Iterable[str], profiler: Optional[StartupProfiler] = None):
+    """Загрузка корпусов NLTK (скачивание только отсутствующих)"""
+    profiler = profiler or StartupProfiler()
+    nltk = profiler.timed_import('nltk', 'nltk')
+
+    for corpus in corpora:
+        for prefix in ('tokenizers', 'corpora', 'taggers'):
+            try:
+                nltk.data.find(f"{prefix}/{corpus}")
+                break
+            except LookupError:
+                continue
+        else:
+            nltk.download(corpus, quiet=True)
+
+class AssistantComponents:
+    """Подкомпоненты AI ассистента с инициализацией по требованию
+
+    Компоненты, отключенные конфигурацией (голос, чат, отсутствие ключа API),
+    никогда не импортируют свои зависимости.
+    """
+
+    def __init__(self, ai_config, profiler: Optional[StartupProfiler] = None):
+        self.config = ai_config
+        self.profiler = profiler or StartupProfiler()
+        self.loader = BackgroundLoader(self.profiler)
+
+        chat_backend = bool(ai_config.chat_enabled and ai_config.openai_api_key)
+        self.voice_recognition = LazyComponent(
+            'voice_recognition', self._create_recognizer, ai_config.voice_enabled, self.profiler
+        )
+        self.text_to_speech = LazyComponent(
+            'text_to_speech', self._create_tts_engine, ai_config.voice_enabled, self.profiler
+        )
+        self.chat_bot = LazyComponent(
+            'chat_bot', self._create_chat_client, chat_backend, self.profiler
+        )
+
+    def _create_recognizer(self):
+        speech_recognition = self.profiler.timed_import('speech_recognition', 'voice_recognition')
+        return speech_recognition.Recognizer()
+
+    def _create_tts_engine(self):
+        pyttsx3 = self.profiler.timed_import('pyttsx3', 'text_to_speech')
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.config.voice_rate)
+        engine.setProperty('volume', self.config.voice_volume)
+        return engine
+
+    def _create_chat_client(self):
+        openai = self.profiler.timed_import('openai', 'chat_bot')
+        return openai.AsyncOpenAI(api_key=self.config.openai_api_key,
+                                  base_url=self.config.openai_base_url or None,
+                                  timeout=self.config.chat_timeout)
+
+    @property
+    def components(self) -> List[LazyComponent]:
+        return [self.voice_recognition, self.text_to_speech, self.chat_bot]
+
+    def start(self):
+        """Неблокирующий запуск: корпуса NLTK и (опционально) компоненты в фоне"""
+        corpora = [name.strip() for name in self.config.nltk_corpora.split(',') if name.strip()]
+        if self.config.chat_enabled and corpora:
+            self.loader.submit('nltk_corpora', lambda: load_nltk_corpora(corpora, self.profiler))
+
+        if self.config.preload_components:
+            # Движок синтеза речи не переносится между потоками: он создается
+            # в рабочем потоке диспетчера оповещений при первом оповещении
+            for component in self.components:
+                if component is not self.text_to_speech:
+                    component.preload()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса компонентов и профиля запуска"""
+        return {
+            **{component.name: component.get_status() for component in self.components},
+            'background_tasks': self.loader.get_status(),
+            'startup_profile_ms': self.profiler.report(),
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Профиль запуска компонентов AI ассистента")
+    parser.add_argument("--voice", action="store_true", help="Инициализировать голосовые компоненты")
+    parser.add_argument("--wait", type=float, default=0.0, help="Ожидание фоновой загрузки, с")
+    args = parser.parse_args()
+
+    from config import config
+
+    config.ai.voice_enabled = args.voice
+    start = time.perf_counter()
+    components = AssistantComponents(config.ai)
+    components.start()
+    if args.voice:
+        components.voice_recognition.get()
+        components.text_to_speech.get()
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    components.loader.wait(args.wait)
+    print(json.dumps({'startup_ms': round(startup_ms, 2), **components.get_status()},
+                     indent=2, ensure_ascii=False))
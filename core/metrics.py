@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Метрики Prometheus для горячих путей системы
+Гистограммы задержек по этапам и подсистемам, датчики глубины очередей;
+при отключенных метриках все вызовы - пустые операции
+"""
+
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм задержек, с (от 50 мкс до 30 с)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _NoopMetric:
+    """Заглушка метрики при отключенном экспорте"""
+
+    def labels(self, *args, **kwargs) -> '_NoopMetric':
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def set_function(self, function: Callable[[], float]):
+        pass
+
+_NOOP = _NoopMetric()
+
+class StageTimer:
+    """Замер длительности последовательных этапов обработки одного события
+
+    mark(stage) записывает время с предыдущей отметки в гистограмму этапов.
+    """
+
+    __slots__ = ('histogram', 'last')
+
+    def __init__(self, histogram: Any):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.histogram.labels(stage=stage).observe(now - self.last)
+        self.last = now
+
+class _NoopStageTimer:
+    __slots__ = ()
+
+    def mark(self, stage: str):
+        pass
+
+_NOOP_STAGE_TIMER = _NoopStageTimer()
+
+class SecurityMetrics:
+    """Набор метрик системы
+
+    Метрики создаются в отдельном реестре. Если экспорт отключен или
+    prometheus-client не установлен, все метрики - общая заглушка, а
+    stage_timer() возвращает пустой таймер без обращения к часам.
+    """
+
+    def __init__(self, enabled: bool = False, namespace: str = "cloud_security"):
+        self.enabled = False
+        self.registry = None
+        self.server_started = False
+
+        if enabled:
+            try:
+                import prometheus_client
+                self._prometheus = prometheus_client
+                self.registry = prometheus_client.CollectorRegistry()
+                self.enabled = True
+            except ImportError:
+                logger.warning("prometheus-client не установлен, метрики отключены")
+
+        histogram = functools.partial(self._metric, 'Histogram', namespace)
+        self.event_stage_seconds = histogram(
+            'event_stage_seconds', 'Длительность этапов обработки события', ['stage'],
+            buckets=LATENCY_BUCKETS)
+        self.predict_threat_seconds = histogram(
+            'predict_threat_seconds', 'Задержка predict_threat', buckets=LATENCY_BUCKETS)
+        self.block_mining_seconds = histogram(
+            'block_mining_seconds', 'Время майнинга блока', buckets=LATENCY_BUCKETS)
+        self.chain_verification_seconds = histogram(
+            'chain_verification_seconds', 'Время проверки целостности цепочки', buckets=LATENCY_BUCKETS)
+        self.crypto_op_seconds = histogram(
+            'crypto_op_seconds', 'Задержка криптографических операций', ['algorithm', 'operation'],
+            buckets=LATENCY_BUCKETS)
+        self.cloud_api_seconds = histogram(
+            'cloud_api_seconds', 'Задержка вызовов облачных API', ['provider', 'operation'],
+            buckets=LATENCY_BUCKETS)
+        self.cloud_api_errors = self._metric(
+            'Counter', namespace, 'cloud_api_errors', 'Ошибки вызовов облачных API', ['provider', 'operation'])
+
+        gauge = functools.partial(self._metric, 'Gauge', namespace)
+        self.alert_queue_depth = gauge('alert_queue_depth', 'Оповещений в очереди')
+        self.pending_blockchain_events = gauge('pending_blockchain_events', 'Событий, ожидающих записи в блок')
+        self.open_incidents = gauge('open_incidents', 'Открытых инцидентов корреляции')
+        self.suppression_entries = gauge('suppression_entries', 'Активных окон подавления повторов')
+
+    def _metric(self, kind: str, namespace: str, name: str, documentation: str,
+                labelnames=(), **kwargs) -> Any:
+        if not self.enabled:
+            return _NOOP
+        metric_class = getattr(self._prometheus, kind)
+        return metric_class(name, documentation, labelnames, namespace=namespace,
+                            registry=self.registry, **kwargs)
+
+    def stage_timer(self):
+        """Таймер этапов обработки события"""
+        if not self.enabled:
+            return _NOOP_STAGE_TIMER
+        return StageTimer(self.event_stage_seconds)
+
+    def gauge_function(self, gauge: Any, function: Callable[[], float]):
+        """Датчик, значение которого вычисляется при сборе метрик"""
+        def safe():
+            try:
+                return float(function())
+            except Exception:
+                return float('nan')
+        gauge.set_function(safe)
+
+    def instrument(self, target: Any, method_name: str, histogram: Any, errors: Any = None,
+                   labels_from_args: Optional[Callable[..., Dict[str, str]]] = None, **labels) -> bool:
+        """Обертка метода объекта замером задержки (синхронного или async)
+
+        Метки задаются постоянными (labels) или вычисляются по аргументам
+        вызова (labels_from_args). Возвращает False, если метрики отключены
+        или метода нет.
+        """
+        method = getattr(target, method_name, None)
+        if not self.enabled or method is None:
+            return False
+
+        def metrics_for(args, kwargs):
+            call_labels = labels_from_args(*args, **kwargs) if labels_from_args else labels
+            if not call_labels:
+                return histogram, errors
+            return histogram.labels(**call_labels), errors.labels(**call_labels) if errors is not None else None
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                observer, counter = metrics_for(args, kwargs)
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                except Exception:
+                    if counter is not None:
+                        counter.inc()
+                    raise
+                finally:
+                    observer.observe(time.perf_counter() - start)
+        else:
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                observer, counter = metrics_for(args, kwargs)
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                except Exception:
+                    if counter is not None:
+                        counter.inc()
+                    raise
+                finally:
+                    observer.observe(time.perf_counter() - start)
+
+        setattr(target, method_name, wrapper)
+        return True
+
+    def start_server(self, port: int, host: str = "0.0.0.0") -> bool:
+        """Запуск HTTP эндпоинта /metrics в фоновом потоке"""
+        if not self.enabled:
+            return False
+        # Повторный запуск (например, после повторного избрания ведущим) не нужен
+        if self.server_started:
+            return True
+        self._prometheus.start_http_server(port, addr=host, registry=self.registry)
+        self.server_started = True
+        logger.info(f"Метрики Prometheus доступны на http://{host}:{port}/metrics")
+        return True
+
+    def render(self) -> bytes:
+        """Текстовое представление метрик (для встраивания /metrics в API)"""
+        if not self.enabled:
+            return b""
+        return self._prometheus.generate_latest(self.registry)
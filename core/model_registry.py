@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Реестр ML моделей
+Ленивая загрузка весов с отображением в память и выгрузка простаивающих моделей
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: getrusage недоступен
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов весов, которые регистрируются автоматически
+WEIGHT_EXTENSIONS = ('.safetensors', '.pt', '.pth')
+
+def get_process_rss_mb() -> float:
+    """Текущий размер резидентной памяти процесса в МБ"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0.0
+        # ru_maxrss - пиковое значение: КБ в Linux, байты в macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def load_torch_weights(path: str) -> Any:
+    """Загрузка весов PyTorch с отображением файла в память
+
+    Страницы весов, отображенные через mmap, разделяются между рабочими
+    процессами, загружающими один и тот же файл.
+    """
+    if path.endswith('.safetensors'):
+        try:
+            from safetensors.torch import load_file
+        except ImportError as e:
+            raise ImportError("Для загрузки .safetensors установите пакет safetensors") from e
+        return load_file(path, device='cpu')
+
+    import torch
+    try:
+        return torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    except (TypeError, RuntimeError) as e:
+        # Старые версии torch и файлы в legacy формате не поддерживают mmap;
+        # загрузка произвольных объектов pickle (без weights_only) не допускается
+        logger.debug(f"mmap загрузка {path} недоступна ({e}), обычная загрузка")
+        return torch.load(path, map_location='cpu', weights_only=True)
+
+def estimate_size_bytes(obj: Any, default: int = 0) -> int:
+    """Оценка объема памяти модели или словаря весов"""
+    tensors = None
+    if isinstance(obj, dict):
+        tensors = obj.values()
+    elif hasattr(obj, 'state_dict'):
+        try:
+            tensors = obj.state_dict().values()
+        except Exception:
+            tensors = None
+    elif hasattr(obj, 'policy') and hasattr(obj.policy, 'state_dict'):
+        tensors = obj.policy.state_dict().values()
+
+    if tensors is None:
+        return default
+
+    total = 0
+    for tensor in tensors:
+        if hasattr(tensor, 'element_size') and hasattr(tensor, 'nelement'):
+            total += tensor.element_size() * tensor.nelement()
+    return total or default
+
+@dataclass
+class ModelEntry:
+    """Зарегистрированная модель"""
+    name: str
+    loader: Callable[[], Any]
+    path: Optional[str] = None
+    model: Any = None
+    size_bytes: int = 0
+    load_count: int = 0
+    last_load_seconds: float = 0.0
+    last_used: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+class ModelRegistry:
+    """Реестр моделей с ленивой загрузкой и LRU выгрузкой
+
+    Модели регистрируются без загрузки; веса читаются при первом вызове get().
+    Когда суммарный объем загруженных моделей превышает бюджет памяти,
+    выгружаются модели, которые дольше всего не использовались.
+    """
+
+    def __init__(self, model_dir: str = "models/", memory_budget_mb: float = 1024.0):
+        self.model_dir = model_dir
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+
+        self.entries: Dict[str, ModelEntry] = {}
+        # Загруженные модели в порядке последнего использования
+        self.loaded: 'OrderedDict[str, ModelEntry]' = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.created_at = time.time()
+        self.stats = {
+            'loads': 0,
+            'unloads': 0,
+            'hits': 0,
+            'total_load_seconds': 0.0,
+        }
+
+    def register(self, name: str, loader: Optional[Callable[[], Any]] = None,
+                 path: Optional[str] = None, **metadata) -> ModelEntry:
+        """Регистрация модели без загрузки"""
+        if loader is None:
+            if path is None:
+                raise ValueError(f"Для модели {name} нужно указать loader или path")
+            loader = lambda: load_torch_weights(path)
+
+        with self._lock:
+            entry = ModelEntry(name=name, loader=loader, path=path, metadata=metadata)
+            self.entries[name] = entry
+            return entry
+
+    def discover(self) -> List[str]:
+        """Регистрация файлов весов из каталога моделей (без загрузки)"""
+        if not os.path.isdir(self.model_dir):
+            return []
+
+        discovered = []
+        for file_name in sorted(os.listdir(self.model_dir)):
+            name, extension = os.path.splitext(file_name)
+            if extension not in WEIGHT_EXTENSIONS or name in self.entries:
+                continue
+            self.register(name, path=os.path.join(self.model_dir, file_name))
+            discovered.append(name)
+
+        logger.info(f"Зарегистрировано моделей: {len(discovered)} (загрузка по требованию)")
+        return discovered
+
+    def get(self, name: str) -> Any:
+        """Получение модели с загрузкой при первом обращении"""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                raise KeyError(f"Модель {name} не зарегистрирована")
+
+            entry.last_used = time.time()
+
+            if entry.loaded:
+                self.loaded.move_to_end(name)
+                self.stats['hits'] += 1
+                return entry.model
+
+            start = time.perf_counter()
+            model = entry.loader()
+            elapsed = time.perf_counter() - start
+
+            file_size = os.path.getsize(entry.path) if entry.path and os.path.exists(entry.path) else 0
+            entry.model = model
+            entry.size_bytes = estimate_size_bytes(model, default=file_size)
+            entry.load_count += 1
+            entry.last_load_seconds = elapsed
+
+            self.loaded[name] = entry
+            self.stats['loads'] += 1
+            self.stats['total_load_seconds'] += elapsed
+
+            logger.info(f"Модель {name} загружена за {elapsed * 1000:.1f} мс "
+                        f"({entry.size_bytes / (1024 * 1024):.1f} МБ)")
+
+            self._enforce_budget(keep=name)
+            return model
+
+    def peek(self, name: str) -> Any:
+        """Загруженная модель без загрузки и обновления времени использования"""
+        with self._lock:
+            entry = self.entries.get(name)
+            return entry.model if entry is not None else None
+
+    def unload(self, name: str) -> bool:
+        """Выгрузка модели из памяти (регистрация сохраняется)"""
+        with self._lock:
+            entry = self.loaded.pop(name, None)
+            if entry is None:
+                return False
+            entry.model = None
+            self.stats['unloads'] += 1
+            logger.info(f"Модель {name} выгружена")
+            return True
+
+    def unload_idle(self, max_idle_seconds: float) -> List[str]:
+        """Выгрузка моделей, не использовавшихся дольше max_idle_seconds"""
+        now = time.time()
+        with self._lock:
+            idle = [name for name, entry in self.loaded.items()
+                    if now - entry.last_used > max_idle_seconds]
+            for name in idle:
+                self.unload(name)
+            return idle
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Выгрузка наименее используемых моделей сверх бюджета памяти"""
+        while self.loaded_bytes > self.memory_budget_bytes and len(self.loaded) > 1:
+            name = next(iter(self.loaded))
+            if name == keep:
+                break
+            self.unload(name)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self.loaded.values())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Статус реестра: загруженные модели, время загрузки и память процесса"""
+        with self._lock:
+            return {
+                'registered_models': sorted(self.entries),
+                'loaded_models': list(self.loaded),
+                'loaded_mb': round(self.loaded_bytes / (1024 * 1024), 2),
+                'memory_budget_mb': round(self.memory_budget_bytes / (1024 * 1024), 2),
+                'load_times_ms': {
+                    name: round(entry.last_load_seconds * 1000, 2)
+                    for name, entry in self.entries.items() if entry.load_count
+                },
+                'process_rss_mb': round(get_process_rss_mb(), 2),
+                **self.stats,
+            }
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Инкрементальное обучение классификатора угроз
+Буфер воспроизведения, дообучение мини-пакетами и обнаружение дрейфа
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def model_input_width(model: Any) -> Optional[int]:
+    """Ширина входа модели: in_features первого линейного слоя (None, если неизвестна)"""
+    for module in (model.modules() if hasattr(model, 'modules') else ()):
+        if hasattr(module, 'in_features'):
+            return module.in_features
+    return None
+
+class ReservoirBuffer:
+    """Ограниченный буфер размеченных событий с резервуарной выборкой
+
+    Буфер хранит равномерную выборку из всех поступивших событий
+    в заранее выделенных массивах фиксированного размера. Ширина строки
+    фиксируется по первому событию; события другой ширины пропускаются.
+    """
+
+    def __init__(self, capacity: int = 10000, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.features: Optional[np.ndarray] = None
+        self.labels = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self.seen = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def add(self, features: np.ndarray, label: int) -> bool:
+        """Добавление события (алгоритм R); False если событие не попало в выборку"""
+        features = np.asarray(features, dtype=np.float32).ravel()
+        with self._lock:
+            if self.features is None:
+                self.features = np.zeros((self.capacity, features.shape[0]), dtype=np.float32)
+            elif features.shape[0] != self.features.shape[1]:
+                self.skipped += 1
+                logger.debug(f"Событие пропущено: ожидается {self.features.shape[1]} признаков, "
+                             f"получено {features.shape[0]}")
+                return False
+
+            self.seen += 1
+            if self.size < self.capacity:
+                index = self.size
+                self.size += 1
+            else:
+                index = int(self.rng.integers(0, self.seen))
+                if index >= self.capacity:
+                    return False
+
+            self.features[index] = features
+            self.labels[index] = label
+            return True
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Текущее содержимое буфера (представления без копирования)"""
+        if self.features is None:
+            return np.zeros((0, 0), dtype=np.float32), self.labels[:0]
+        return self.features[:self.size], self.labels[:self.size]
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Копия содержимого буфера (для обучения в другом потоке)"""
+        with self._lock:
+            features, labels = self.arrays()
+            return features.copy(), labels.copy()
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Случайный мини-пакет"""
+        with self._lock:
+            indices = self.rng.integers(0, self.size, size=min(batch_size, self.size))
+            return self.features[indices], self.labels[indices]
+
+class DriftDetector:
+    """Обнаружение дрейфа распределения оценок модели по индексу PSI
+
+    Эталонное распределение фиксируется после обучения модели и
+    сравнивается со скользящим окном последних оценок.
+    """
+
+    def __init__(self, window: int = 2000, bins: int = 10, threshold: float = 0.2,
+                 min_samples: int = 200):
+        self.window: Deque[float] = deque(maxlen=window)
+        self.edges = np.linspace(0.0, 1.0, bins + 1)
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reference: Optional[np.ndarray] = None
+        self.last_psi = 0.0
+
+    def record(self, score: float):
+        """Добавление оценки модели"""
+        self.window.append(min(max(float(score), 0.0), 1.0))
+
+    def _histogram(self, scores) -> np.ndarray:
+        counts, _ = np.histogram(np.fromiter(scores, dtype=np.float64), bins=self.edges)
+        return (counts + 1e-4) / (counts.sum() + 1e-4 * len(counts))
+
+    def set_reference(self):
+        """Фиксация текущего окна как эталонного распределения"""
+        if len(self.window) >= self.min_samples:
+            self.reference = self._histogram(self.window)
+            self.window.clear()
+
+    def check(self) -> bool:
+        """Проверка дрейфа: True если PSI превышает порог"""
+        if len(self.window) < self.min_samples:
+            return False
+        if self.reference is None:
+            self.set_reference()
+            return False
+
+        current = self._histogram(self.window)
+        self.last_psi = float(np.sum((current - self.reference) * np.log(current / self.reference)))
+        return self.last_psi > self.threshold
+
+class OnlineLearner:
+    """Инкрементальное обучение модели классификации угроз
+
+    По расписанию выполняется дообучение теневой копии модели мини-пакетами
+    из снимка буфера воспроизведения. Теневая копия заменяет рабочую модель
+    (через model_setter, в цикле событий) только если на отложенной части
+    буфера она не хуже текущей. Рабочая модель при обучении не изменяется.
+    Полное переобучение запускается только при обнаружении дрейфа.
+    """
+
+    def __init__(self, model_getter: Callable[[], Any],
+                 model_setter: Optional[Callable[[Any], None]] = None,
+                 full_retrain: Optional[Callable[[np.ndarray, np.ndarray], Awaitable[Any]]] = None,
+                 buffer_capacity: int = 10000, batch_size: int = 64, updates_per_step: int = 50,
+                 learning_rate: float = 1e-4, drift_threshold: float = 0.2,
+                 min_samples: int = 200, holdout_fraction: float = 0.2):
+        self.model_getter = model_getter
+        self.model_setter = model_setter
+        self.full_retrain = full_retrain
+        self.buffer = ReservoirBuffer(buffer_capacity)
+        self.drift_detector = DriftDetector(threshold=drift_threshold, min_samples=min_samples)
+        self.batch_size = batch_size
+        self.updates_per_step = updates_per_step
+        self.learning_rate = learning_rate
+        self.min_samples = min_samples
+        self.holdout_fraction = holdout_fraction
+        self.rng = np.random.default_rng()
+
+        self._busy = False
+        self._width_mismatch: Optional[Tuple[int, int]] = None
+        self.stats = {
+            'width_mismatches': 0,
+            'incremental_updates': 0,
+            'promotions': 0,
+            'rejections': 0,
+            'full_retrains': 0,
+            'last_update_seconds': 0.0,
+            'last_shadow_accuracy': None,
+            'last_live_accuracy': None,
+        }
+
+    def add_sample(self, features: np.ndarray, label: int):
+        """Добавление размеченного события в буфер воспроизведения
+
+        События, ширина которых не совпадает со входом модели, не буферизуются.
+        """
+        width = model_input_width(self.model_getter())
+        if width is not None and np.size(features) != width:
+            self._skip_width(width, np.size(features))
+            return
+        self.buffer.add(features, label)
+
+    def _skip_width(self, expected: int, actual: int):
+        self.stats['width_mismatches'] += 1
+        if self._width_mismatch != (expected, actual):
+            self._width_mismatch = (expected, actual)
+            logger.warning(f"Дообучение пропускается: модель ожидает {expected} признаков, получено {actual}")
+
+    def record_score(self, score: float):
+        """Учет оценки модели для обнаружения дрейфа"""
+        self.drift_detector.record(score)
+
+    async def step(self) -> Optional[str]:
+        """Плановый шаг: полное переобучение при дрейфе, иначе дообучение"""
+        if self._busy or self.buffer.size < self.min_samples:
+            return None
+
+        self._busy = True
+        try:
+            if self.full_retrain is not None and self.drift_detector.check():
+                logger.info(f"Обнаружен дрейф оценок (PSI={self.drift_detector.last_psi:.3f}), "
+                            f"полное переобучение на {self.buffer.size} событиях")
+                features, labels = self.buffer.snapshot()
+                await self.full_retrain(features, labels)
+                self.drift_detector.reference = None
+                self.drift_detector.window.clear()
+                self.stats['full_retrains'] += 1
+                return 'full_retrain'
+
+            model = self.model_getter()
+            if model is None or not hasattr(model, 'state_dict'):
+                return None
+
+            features, labels = self.buffer.snapshot()
+            # Модель могла быть заменена моделью другой ширины после заполнения буфера
+            width = model_input_width(model)
+            if width is not None and features.shape[1] != width:
+                self._skip_width(width, features.shape[1])
+                return None
+
+            loop = asyncio.get_running_loop()
+            shadow = await loop.run_in_executor(None, self._incremental_update, model, features, labels)
+            if shadow is None:
+                return 'rejected'
+
+            # Замена рабочей модели в цикле событий, между вызовами predict_threat
+            if self.model_setter is not None:
+                self.model_setter(shadow)
+            else:
+                model.load_state_dict(shadow.state_dict())
+            return 'promoted'
+
+        finally:
+            self._busy = False
+
+    def _incremental_update(self, model: Any, features: np.ndarray, labels: np.ndarray) -> Optional[Any]:
+        """Дообучение теневой копии на снимке буфера (в рабочем потоке)
+
+        Возвращает теневую модель, если она не хуже рабочей, иначе None.
+        """
+        import torch
+
+        start = time.perf_counter()
+        order = self.rng.permutation(len(labels))
+        holdout_size = max(1, int(len(order) * self.holdout_fraction))
+        holdout, train = order[:holdout_size], order[holdout_size:]
+
+        # Рабочая модель только копируется: режим и веса меняются у копий
+        was_training = model.training
+        live = copy.deepcopy(model)
+        shadow = copy.deepcopy(model)
+        shadow.train()
+        optimizer = torch.optim.Adam(shadow.parameters(), lr=self.learning_rate)
+
+        for _ in range(self.updates_per_step):
+            batch = train[self.rng.integers(0, len(train), size=min(self.batch_size, len(train)))]
+            inputs = torch.from_numpy(features[batch])
+            targets = torch.from_numpy(labels[batch])
+
+            optimizer.zero_grad()
+            loss = self._loss(shadow(inputs), targets)
+            loss.backward()
+            optimizer.step()
+
+        holdout_inputs = torch.from_numpy(features[holdout])
+        holdout_targets = labels[holdout]
+        shadow_accuracy = self._accuracy(shadow, holdout_inputs, holdout_targets)
+        live_accuracy = self._accuracy(live, holdout_inputs, holdout_targets)
+
+        promoted = shadow_accuracy >= live_accuracy
+        if promoted:
+            shadow.train(was_training)
+            self.stats['promotions'] += 1
+        else:
+            self.stats['rejections'] += 1
+
+        self.stats['incremental_updates'] += 1
+        self.stats['last_update_seconds'] = round(time.perf_counter() - start, 3)
+        self.stats['last_shadow_accuracy'] = round(shadow_accuracy, 4)
+        self.stats['last_live_accuracy'] = round(live_accuracy, 4)
+
+        logger.info(f"Дообучение: теневая модель {shadow_accuracy:.3f}, рабочая {live_accuracy:.3f}, "
+                    f"{'веса обновлены' if promoted else 'веса сохранены'}")
+        return shadow if promoted else None
+
+    @staticmethod
+    def _loss(outputs, targets):
+        import torch.nn.functional as F
+        if outputs.dim() == 1 or outputs.shape[-1] == 1:
+            return F.binary_cross_entropy_with_logits(outputs.reshape(-1), targets.float())
+        return F.cross_entropy(outputs, targets)
+
+    @staticmethod
+    def _accuracy(model, inputs, targets: np.ndarray) -> float:
+        import torch
+        was_training = model.training
+        model.eval()
+        with torch.no_grad():
+            outputs = model(inputs)
+        model.train(was_training)
+
+        if outputs.dim() == 1 or outputs.shape[-1] == 1:
+            predictions = (outputs.reshape(-1) > 0).long().numpy()
+        else:
+            predictions = outputs.argmax(dim=1).numpy()
+        return float((predictions == targets).mean())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение статуса инкрементального обучения"""
+        return {
+            'buffer_size': self.buffer.size,
+            'samples_seen': self.buffer.seen,
+            'samples_skipped': self.buffer.skipped,
+            'last_psi': round(self.drift_detector.last_psi, 4),
+            **self.stats,
+        }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Быстрый инференс политики RL агента
+Экспорт обученной политики stable-baselines3 в MLP на NumPy без gym и SB3
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .vectorized_security_env import ACTIONS
+
+logger = logging.getLogger(__name__)
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0, out=x),
+    'identity': lambda x: x,
+}
+
+def _linear_layers(module: Any) -> List[Any]:
+    """Линейные слои модуля PyTorch в порядке прохождения"""
+    return [layer for layer in module.modules() if type(layer).__name__ == 'Linear']
+
+def _to_numpy(tensor: Any) -> np.ndarray:
+    return tensor.detach().cpu().numpy().astype(np.float32)
+
+def export_policy(model: Any, path: str) -> Dict[str, Any]:
+    """Экспорт политики обученной модели stable-baselines3 в файл .npz
+
+    Поддерживаются политики актор-критик (PPO, A2C) и Q-сети (DQN)
+    с экстрактором признаков Flatten. Сохраняются только веса актора.
+    """
+    policy = model.policy
+
+    if hasattr(policy, 'q_net'):
+        layers = _linear_layers(policy.q_net)
+        kind = 'q_values'
+    elif hasattr(policy, 'mlp_extractor') and hasattr(policy, 'action_net'):
+        layers = _linear_layers(policy.mlp_extractor.policy_net) + [policy.action_net]
+        kind = 'logits'
+    else:
+        raise ValueError(f"Неподдерживаемый тип политики: {type(policy).__name__}")
+
+    activation = getattr(policy, 'activation_fn', None)
+    activation_name = getattr(activation, '__name__', 'ReLU').lower()
+    if activation_name not in ACTIVATIONS:
+        raise ValueError(f"Неподдерживаемая функция активации: {activation_name}")
+
+    arrays = {}
+    for index, layer in enumerate(layers):
+        arrays[f"weight_{index}"] = _to_numpy(layer.weight).T
+        arrays[f"bias_{index}"] = _to_numpy(layer.bias)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    metadata = {
+        'layers': len(layers),
+        'activation': activation_name,
+        'kind': kind,
+        'algorithm': type(model).__name__,
+        'input_size': int(arrays['weight_0'].shape[0]),
+        'output_size': int(arrays[f"weight_{len(layers) - 1}"].shape[1]),
+    }
+    np.savez(path, metadata=json.dumps(metadata), **arrays)
+
+    logger.info(f"Политика {metadata['algorithm']} экспортирована в {path}: "
+                f"{metadata['layers']} слоев, вход {metadata['input_size']}")
+    return metadata
+
+class NumpyPolicy:
+    """Политика RL агента в виде MLP на NumPy
+
+    Веса неизменяемы после загрузки, а промежуточные массивы создаются
+    на каждый вызов, поэтому один экземпляр можно использовать
+    из нескольких потоков без блокировок.
+    """
+
+    def __init__(self, weights: Sequence[np.ndarray], biases: Sequence[np.ndarray],
+                 activation: str = 'tanh', metadata: Optional[Dict[str, Any]] = None):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        for array in self.weights + self.biases:
+            array.setflags(write=False)
+
+        self.activation_name = activation
+        self._activation = ACTIVATIONS[activation]
+        self.metadata = metadata or {}
+        self.input_size = self.weights[0].shape[0]
+        self.output_size = self.weights[-1].shape[1]
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyPolicy':
+        """Загрузка политики из файла .npz"""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            weights = [data[f"weight_{i}"] for i in range(metadata['layers'])]
+            biases = [data[f"bias_{i}"] for i in range(metadata['layers'])]
+        return cls(weights, biases, metadata['activation'], metadata)
+
+    def forward(self, observations: np.ndarray) -> np.ndarray:
+        """Прямой проход: логиты или Q-значения для пакета наблюдений"""
+        x = np.asarray(observations, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None, :]
+
+        last = len(self.weights) - 1
+        for index, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if index < last:
+                x = self._activation(x)
+        return x
+
+    def predict(self, observations: np.ndarray) -> np.ndarray:
+        """Детерминированный выбор действий для пакета наблюдений"""
+        return self.forward(observations).argmax(axis=1)
+
+    def predict_one(self, observation: np.ndarray) -> int:
+        """Выбор действия для одного наблюдения"""
+        return int(self.forward(observation)[0].argmax())
+
+    def recommend_action(self, observation: np.ndarray) -> str:
+        """Название рекомендуемого действия"""
+        action = self.predict_one(observation)
+        return ACTIONS[action] if action < len(ACTIONS) else str(action)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получение описания политики"""
+        return {
+            'algorithm': self.metadata.get('algorithm'),
+            'layers': len(self.weights),
+            'activation': self.activation_name,
+            'input_size': self.input_size,
+            'output_size': self.output_size,
+        }
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Перцентили задержки в микросекундах"""
+    values = np.array(samples) * 1e6
+    return {
+        'mean_us': round(float(values.mean()), 2),
+        'p50_us': round(float(np.percentile(values, 50)), 2),
+        'p99_us': round(float(np.percentile(values, 99)), 2),
+    }
+
+def benchmark_policy_latency(policy: NumpyPolicy, sb3_model: Any = None, decisions: int = 10000,
+                             batch_size: int = 256) -> Dict[str, Any]:
+    """Задержка одного решения и пропускная способность пакетов
+
+    Если передана исходная модель SB3, для сравнения замеряется model.predict.
+    """
+    rng = np.random.default_rng(0)
+    observations = rng.random((decisions, policy.input_size), dtype=np.float32)
+
+    numpy_samples = []
+    for observation in observations:
+        start = time.perf_counter()
+        policy.predict_one(observation)
+        numpy_samples.append(time.perf_counter() - start)
+
+    batches = observations[:(decisions // batch_size) * batch_size].reshape(-1, batch_size, policy.input_size)
+    start = time.perf_counter()
+    for batch in batches:
+        policy.predict(batch)
+    batch_elapsed = time.perf_counter() - start
+
+    report = {
+        'decisions': decisions,
+        'numpy_single': _latency_stats(numpy_samples),
+        'numpy_batch': {
+            'batch_size': batch_size,
+            'decisions_per_second': round(batches.shape[0] * batch_size / max(batch_elapsed, 1e-9), 1),
+        },
+    }
+
+    if sb3_model is not None:
+        sb3_samples = []
+        for observation in observations[:min(decisions, 2000)]:
+            start = time.perf_counter()
+            sb3_model.predict(observation, deterministic=True)
+            sb3_samples.append(time.perf_counter() - start)
+        report['sb3_single'] = _latency_stats(sb3_samples)
+        report['speedup_p50'] = round(report['sb3_single']['p50_us'] / max(report['numpy_single']['p50_us'], 1e-9), 1)
+
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк инференса политики RL агента")
+    parser.add_argument("policy", help="Путь к экспортированной политике .npz")
+    parser.add_argument("--sb3-model", help="Путь к исходной модели SB3 (.zip) для сравнения")
+    parser.add_argument("--algorithm", default="PPO")
+    parser.add_argument("--decisions", type=int, default=10000)
+    args = parser.parse_args()
+
+    sb3_model = None
+    if args.sb3_model:
+        import stable_baselines3
+        sb3_model = getattr(stable_baselines3, args.algorithm).load(args.sb3_model)
+
+    result = benchmark_policy_latency(NumpyPolicy.load(args.policy), sb3_model, args.decisions)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
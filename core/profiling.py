@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Профилирование в рабочей среде
+Сэмплирующий профилировщик стеков в фоновом потоке (формат для flamegraph)
+и трассировка этапов обработки событий с кольцевым буфером трасс
+"""
+
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик всех потоков процесса
+
+    Фоновый поток с заданным интервалом снимает стеки через
+    sys._current_frames() и накапливает свернутые стеки
+    ("модуль:функция;...;модуль:функция N"), которые принимают
+    flamegraph.pl, speedscope и inferno. Накладные расходы определяются
+    интервалом и не зависят от нагрузки на профилируемый код.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = 30.0) -> bool:
+        """Запуск сэмплирования на duration секунд; False если уже запущено"""
+        if self.running:
+            return False
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+        self._stop.clear()
+        self.started_at, self.finished_at = time.time(), None
+        self._thread = threading.Thread(target=self._run, args=(duration,),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Сэмплирующий профилировщик запущен на {duration:.0f} с")
+        return True
+
+    def stop(self):
+        """Досрочная остановка"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, duration: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        names = {}
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks.append(self._collapse(frame, thread_names.get(thread_id, str(thread_id)), names))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+            self._stop.wait(self.interval)
+
+        self.finished_at = time.time()
+        logger.info(f"Профилирование завершено: {self.samples} сэмплов, {len(self._stacks)} стеков")
+
+    def _collapse(self, frame, thread_name: str, names: Dict[Any, str]) -> str:
+        """Свернутый стек от корня к листу"""
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                name = names[code] = f"{module}:{code.co_name}"
+            parts.append(name)
+            frame = frame.f_back
+        parts.append(f"thread:{thread_name}")
+        parts.reverse()
+        return ';'.join(parts)
+
+    def collapsed(self) -> str:
+        """Результат в свернутом формате (одна строка на стек)"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + ('\n' if items else '')
+
+    def top_functions(self, limit: int = 20) -> List[Tuple[str, float]]:
+        """Функции с наибольшей собственной долей сэмплов"""
+        own: Counter = Counter()
+        with self._lock:
+            total = sum(self._stacks.values())
+            for stack, count in self._stacks.items():
+                own[stack.rsplit(';', 1)[-1]] += count
+        return [(name, round(count / max(total, 1), 4)) for name, count in own.most_common(limit)]
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'samples': self.samples,
+            'distinct_stacks': len(self._stacks),
+            'interval': self.interval,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class Trace:
+    """Трасса обработки одного события: последовательные этапы с длительностью
+
+    mark(stage) закрывает этап, начавшийся с предыдущей отметки, и
+    передает отметку дальше (например, таймеру этапов метрик).
+    """
+
+    __slots__ = ('trace_id', 'name', 'attributes', 'started_at', 'spans', '_start', '_last', 'downstream')
+
+    def __init__(self, trace_id: str, name: str, attributes: Dict[str, Any], downstream: Any = None):
+        self.trace_id = trace_id
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.spans: List[Tuple[str, float]] = []
+        self._start = self._last = time.perf_counter()
+        self.downstream = downstream
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.spans.append((stage, now - self._last))
+        self._last = now
+        if self.downstream is not None:
+            self.downstream.mark(stage)
+
+    @property
+    def duration(self) -> float:
+        return self._last - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'attributes': self.attributes,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': [{'stage': stage, 'duration_ms': round(seconds * 1000, 3)} for stage, seconds in self.spans],
+        }
+
+class SpanTracer:
+    """Трассировка этапов с хранением последних трасс в кольцевом буфере
+
+    Включается и выключается во время работы; выключенный трассировщик
+    возвращает переданный downstream без создания трассы.
+    """
+
+    def __init__(self, capacity: int = 1000, enabled: bool = False):
+        self.enabled = enabled
+        self._traces: Deque[Trace] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}-{int(time.time()):x}"
+
+    def start_trace(self, name: str, downstream: Any = None, **attributes) -> Any:
+        """Начало трассы; результат поддерживает mark(stage)"""
+        if not self.enabled:
+            return downstream
+        trace = Trace(f"{self._prefix}-{next(self._ids):x}", name, attributes, downstream)
+        self._traces.append(trace)
+        return trace
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in reversed(self._traces):
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """Последние трассы не короче min_duration_ms"""
+        result = []
+        for trace in reversed(self._traces):
+            if trace.duration * 1000 >= min_duration_ms:
+                result.append(trace.to_dict())
+                if len(result) >= limit:
+                    break
+        return result
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые долгие трассы в буфере"""
+        traces = sorted(self._traces, key=lambda trace: trace.duration, reverse=True)
+        return [trace.to_dict() for trace in traces[:limit]]
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'buffered_traces': len(self._traces),
+            'capacity': self._traces.maxlen,
+        }
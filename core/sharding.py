@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Горизонтальное шардирование обработки событий
+События распределяются по узлам согласованным хешированием ключа сущности
+(хост или IP источника); каждый узел владеет состоянием корреляции и своей
+цепочкой блоков, координатор периодически закрепляет головы цепочек шардов
+в глобальном якорном блоке
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import urllib.request
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from core.correlation_engine import CorrelationEngine, IGNORED_ENTITY_VALUES
+from core.event_codec import (BATCH_CONTENT_TYPE, BlockRecord, EventRecord, decode_batch, decode_block,
+                              encode_batch, encode_block)
+from core.event_wal import EventWAL
+
+logger = logging.getLogger(__name__)
+
+# Поля события, определяющие шард (первое непустое)
+SHARD_KEY_FIELDS = ('source_host', 'host', 'hostname', 'source_ip', 'ip')
+
+GENESIS_HASH = '0' * 64
+
+# Кадр блока в файле цепочки шарда: длина, CRC32 блока, номер последней записи журнала
+BLOCK_FRAME = struct.Struct('>IIQ')
+
+def shard_key(event: Dict[str, Any]) -> str:
+    """Ключ шардирования: хост или IP источника, иначе имя источника события"""
+    data = event.get('data') or {}
+    for field_name in SHARD_KEY_FIELDS:
+        value = data.get(field_name)
+        if value is None:
+            continue
+        value = str(value).strip().lower()
+        if value not in IGNORED_ENTITY_VALUES:
+            return value
+    return str(event.get('source', '')).lower()
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def canonical_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+def merkle_root(hashes: List[str]) -> str:
+    """Корень дерева Меркла по списку шестнадцатеричных хешей"""
+    if not hashes:
+        return GENESIS_HASH
+    level = list(hashes)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [_sha256((level[i] + level[i + 1]).encode('ascii')) for i in range(0, len(level), 2)]
+    return level[0]
+
+class ConsistentHashRing:
+    """Кольцо согласованного хеширования с виртуальными узлами
+
+    При добавлении или удалении узла переназначается только ~1/N ключей,
+    поэтому окна корреляции остальных сущностей остаются на своих узлах.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 128):
+        self.virtual_nodes = virtual_nodes
+        self._positions: List[int] = []
+        self._owners: List[str] = []
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            position = _hash64(f"{node}#{replica}")
+            index = bisect.bisect(self._positions, position)
+            self._positions.insert(index, position)
+            self._owners.insert(index, node)
+
+    def remove_node(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(position, owner) for position, owner in zip(self._positions, self._owners) if owner != node]
+        self._positions = [position for position, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key: str) -> str:
+        """Узел-владелец ключа (первая виртуальная точка по часовой стрелке)"""
+        if not self._positions:
+            raise ValueError("Кольцо шардирования не содержит узлов")
+        index = bisect.bisect(self._positions, _hash64(key)) % len(self._positions)
+        return self._owners[index]
+
+class ShardLedger:
+    """Цепочка блоков одного шарда в двоичном файле
+
+    События накапливаются и запечатываются в блок по block_size или по
+    запросу seal(); блок ссылается на хеш предыдущего и содержит корень
+    Меркла своих событий. Блоки хешируются и хранятся в двоичном формате
+    event_codec (BlockRecord), каждый в кадре с длиной и CRC32. При запуске
+    цепочка восстанавливается из файла, оборванный при сбое последний блок
+    отсекается. Если задан wal_dir, ожидающие события пишутся в журнал
+    EventWAL и переживают перезапуск; кадр блока хранит номер последней
+    записи журнала, поэтому события уже запечатанного блока повторно
+    не восстанавливаются. Смещение блока публикуется под блокировкой
+    только после записи кадра, поэтому чтение (HTTP /blocks, /verify)
+    безопасно во время запечатывания.
+    """
+
+    def __init__(self, shard_id: str, path: str, block_size: int = 100, wal_dir: Optional[str] = None):
+        self.shard_id = shard_id
+        self.path = path
+        self.block_size = block_size
+        self.pending: List[Dict[str, Any]] = []
+        self.height = 0
+        self.head_hash = GENESIS_HASH
+        self.truncated_bytes = 0
+        self._offsets: List[int] = []
+        self._wal: Optional[EventWAL] = None
+        self._pending_seq = 0
+        self._lock = threading.RLock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        sealed_seq = self._load()
+        self._file = open(path, 'ab')
+        if wal_dir:
+            self._open_wal(wal_dir, sealed_seq)
+
+    @staticmethod
+    def _read_frame(f) -> Optional[Tuple[int, BlockRecord]]:
+        """Кадр блока: (wal_seq, блок); None в конце файла, EOFError для оборванного кадра"""
+        header = f.read(BLOCK_FRAME.size)
+        if not header:
+            return None
+        if len(header) < BLOCK_FRAME.size:
+            raise EOFError()
+        length, crc, wal_seq = BLOCK_FRAME.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            raise EOFError()
+        return wal_seq, decode_block(payload)
+
+    def _load(self) -> int:
+        """Восстановление цепочки; возвращает wal_seq последнего блока"""
+        sealed_seq = 0
+        if not os.path.exists(self.path):
+            return sealed_seq
+        offset = 0
+        with open(self.path, 'r+b') as f:
+            while True:
+                try:
+                    frame = self._read_frame(f)
+                except (EOFError, ValueError, IndexError):
+                    # Блок, оборванный при сбое: его события остались в журнале
+                    self.truncated_bytes = os.path.getsize(self.path) - offset
+                    logger.warning(f"Оборванный блок в {self.path} отсечен ({self.truncated_bytes} байт)")
+                    f.truncate(offset)
+                    break
+                if frame is None:
+                    break
+                wal_seq, block = frame
+                self._offsets.append(offset)
+                offset = f.tell()
+                self.height = block.index + 1
+                self.head_hash = block.hash
+                sealed_seq = wal_seq or sealed_seq
+        return sealed_seq
+
+    def _open_wal(self, wal_dir: str, sealed_seq: int):
+        self._wal = EventWAL(wal_dir)
+        if sealed_seq > self._wal.acked_seq:
+            self._wal.acknowledge(sealed_seq)
+        restored = self._wal.peek(self._wal.pending)
+        if restored:
+            self.pending = [event for _, event in restored]
+            self._pending_seq = restored[-1][0]
+            logger.info(f"Шард {self.shard_id}: восстановлено {len(restored)} ожидающих событий")
+
+    def append(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Добавление события; возвращает блок, если он был запечатан"""
+        with self._lock:
+            if self._wal is not None:
+                self._pending_seq = self._wal.append(event)
+            self.pending.append(event)
+            if len(self.pending) >= self.block_size:
+                return self.seal()
+            return None
+
+    def sync(self):
+        """Ожидание фиксации ожидающих событий в журнале"""
+        if self._wal is not None:
+            self._wal.sync()
+
+    def _to_dict(self, block: BlockRecord) -> Dict[str, Any]:
+        return {**block.to_dict(), 'shard_id': self.shard_id, 'event_count': len(block.events)}
+
+    def seal(self) -> Optional[Dict[str, Any]]:
+        """Запечатывание ожидающих событий в блок"""
+        with self._lock:
+            if not self.pending:
+                return None
+            events, self.pending = self.pending, []
+            block = BlockRecord(self.height, time.time(), [EventRecord.from_event(event) for event in events],
+                                self.head_hash)
+            payload = encode_block(block)
+
+            offset = self._file.tell()
+            self._file.write(BLOCK_FRAME.pack(len(payload), zlib.crc32(payload), self._pending_seq) + payload)
+            self._file.flush()
+            # Смещение публикуется только для полностью записанного кадра
+            self._offsets.append(offset)
+
+            self.height += 1
+            self.head_hash = block.hash
+
+            # События удаляются из журнала только после записи блока на диск
+            if self._wal is not None:
+                os.fsync(self._file.fileno())
+                self._wal.sync()
+                self._wal.acknowledge(self._pending_seq)
+            return self._to_dict(block)
+
+    def _record(self, index: int) -> BlockRecord:
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[index])
+            return self._read_frame(f)[1]
+
+    def block(self, index: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not 0 <= index < len(self._offsets):
+                return None
+            return self._to_dict(self._record(index))
+
+    def head(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'shard_id': self.shard_id,
+                'height': self.height,
+                'hash': self.head_hash,
+                'pending_events': len(self.pending),
+            }
+
+    def verify(self) -> Dict[str, Any]:
+        """Проверка ссылок, хешей блоков и корней Меркла"""
+        # Опубликованные кадры дописаны полностью и не меняются
+        with self._lock:
+            count = len(self._offsets)
+        errors = []
+        previous = GENESIS_HASH
+        for index in range(count):
+            block = self._record(index)
+            if block.previous_hash != previous:
+                errors.append(f"Блок {index}: неверная ссылка на предыдущий блок")
+            if block.compute_hash() != block.hash:
+                errors.append(f"Блок {index}: неверный хеш")
+            if block.compute_merkle_root() != block.merkle_root:
+                errors.append(f"Блок {index}: неверный корень Меркла")
+            previous = block.hash
+        return {'valid': not errors, 'errors': errors, 'blocks': count}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            if self._wal is not None:
+                self._wal.close()
+
+class ShardNode:
+    """Узел шарда: корреляция и цепочка блоков только для своих сущностей"""
+
+    def __init__(self, shard_id: str, data_dir: str, block_size: int = 100, correlation_config=None):
+        self.shard_id = shard_id
+        self.correlation_engine = CorrelationEngine(correlation_config)
+        self.ledger = ShardLedger(shard_id, os.path.join(data_dir, f"{shard_id}.chain"), block_size,
+                                  wal_dir=os.path.join(data_dir, f"{shard_id}.pending"))
+        self._lock = threading.Lock()
+        self.keys: Counter = Counter()
+        self.stats = {'events': 0, 'batches': 0}
+
+    def process(self, events: List[Dict[str, Any]]) -> int:
+        """Обработка пакета событий, направленных этому шарду"""
+        with self._lock:
+            for event in events:
+                self.correlation_engine.process_event(event)
+                self.ledger.append(event)
+                self.keys[shard_key(event)] += 1
+            self.stats['events'] += len(events)
+            self.stats['batches'] += 1
+            # Пакет подтверждается отправителю только после фиксации в журнале
+            self.ledger.sync()
+        return len(events)
+
+    def head(self, seal: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            if seal:
+                self.ledger.seal()
+            return self.ledger.head()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'shard_id': self.shard_id,
+                'head': self.ledger.head(),
+                'correlation': self.correlation_engine.get_status(),
+                'distinct_keys': len(self.keys),
+                **self.stats,
+            }
+
+    def close(self):
+        with self._lock:
+            self.ledger.seal()
+            self.ledger.close()
+
+def serve_node(node: ShardNode, host: str = "127.0.0.1", port: int = 8101) -> ThreadingHTTPServer:
+    """HTTP сервер узла: POST /events, GET /head[?seal=1], GET /blocks/<n>, GET /status"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            logger.debug(f"{node.shard_id}: {format % args}")
+
+        def _reply(self, status: int, payload: Any):
+            body = canonical_json(payload)
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/head':
+                self._reply(200, node.head(seal=parse_qs(url.query).get('seal') == ['1']))
+            elif url.path.startswith('/blocks/'):
+                block = node.ledger.block(int(url.path.rsplit('/', 1)[1]))
+                self._reply(200 if block else 404, block or {'error': 'not found'})
+            elif url.path == '/status':
+                self._reply(200, node.get_status())
+            elif url.path == '/verify':
+                self._reply(200, node.ledger.verify())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/events':
+                self._reply(404, {'error': 'not found'})
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.headers.get('Content-Type', '').startswith(BATCH_CONTENT_TYPE):
+                events = decode_batch(body)
+            else:
+                events = json.loads(body)
+            self._reply(200, {'accepted': node.process(events)})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+def _http_json(url: str, payload: Any = None, timeout: float = 10.0) -> Any:
+    data = canonical_json(payload) if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def _http_post_events(url: str, events: List[Dict[str, Any]], timeout: float = 10.0) -> Any:
+    """Пакет событий в двоичном формате (в ~5 раз меньше JSON)"""
+    request = urllib.request.Request(url, data=encode_batch(events), headers={'Content-Type': BATCH_CONTENT_TYPE})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+class ShardRouter:
+    """Маршрутизация событий на узлы-владельцы пакетами"""
+
+    def __init__(self, nodes: Dict[str, str], virtual_nodes: int = 128, batch_size: int = 200,
+                 timeout: float = 10.0):
+        self.nodes = dict(nodes)
+        self.ring = ConsistentHashRing(self.nodes, virtual_nodes)
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {node: [] for node in self.nodes}
+        self._pool = ThreadPoolExecutor(max_workers=max(len(self.nodes), 1))
+        self._lock = threading.Lock()
+        self.routed: Counter = Counter()
+        self.errors = 0
+
+    def route(self, event: Dict[str, Any]) -> str:
+        """Постановка события в пакет узла-владельца"""
+        node = self.ring.node_for(shard_key(event))
+        with self._lock:
+            buffer = self._buffers[node]
+            buffer.append(event)
+            full = len(buffer) >= self.batch_size
+        if full:
+            self._send(node)
+        return node
+
+    def _send(self, node: str):
+        with self._lock:
+            events, self._buffers[node] = self._buffers[node], []
+        if not events:
+            return
+        try:
+            _http_post_events(f"{self.nodes[node]}/events", events, self.timeout)
+        except Exception:
+            # Неотправленный пакет возвращается в начало буфера для повторной отправки
+            with self._lock:
+                self._buffers[node][:0] = events
+            raise
+        with self._lock:
+            self.routed[node] += len(events)
+
+    def flush(self):
+        """Отправка всех накопленных пакетов параллельно"""
+        futures = [self._pool.submit(self._send, node) for node in self.nodes]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Ошибка отправки пакета событий узлу: {e}")
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown()
+
+class AnchorChain:
+    """Глобальная цепочка якорных блоков координатора
+
+    Якорный блок фиксирует (высоту, хеш) головы каждого шарда и корень
+    Меркла по ним, поэтому подмена истории любого шарда обнаруживается
+    сверкой с якорем.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blocks: List[Dict[str, Any]] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.blocks = [json.loads(line) for line in f if line.strip()]
+
+    @property
+    def head_hash(self) -> str:
+        return self.blocks[-1]['hash'] if self.blocks else GENESIS_HASH
+
+    def anchor(self, shard_heads: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        heads = {shard: {'height': head['height'], 'hash': head['hash']} for shard, head in sorted(shard_heads.items())}
+        header = {
+            'index': len(self.blocks),
+            'timestamp': time.time(),
+            'shard_heads': heads,
+            'merkle_root': merkle_root([_sha256(canonical_json([shard, head])) for shard, head in heads.items()]),
+            'previous_hash': self.head_hash,
+        }
+        block = {**header, 'hash': _sha256(canonical_json(header))}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(canonical_json(block).decode('utf-8') + '\n')
+        self.blocks.append(block)
+        return block
+
+    def verify(self) -> Dict[str, Any]:
+        errors = []
+        previous = GENESIS_HASH
+        for block in self.blocks:
+            header = {key: value for key, value in block.items() if key != 'hash'}
+            if block['previous_hash'] != previous:
+                errors.append(f"Якорь {block['index']}: неверная ссылка на предыдущий блок")
+            if _sha256(canonical_json(header)) != block['hash']:
+                errors.append(f"Якорь {block['index']}: неверный хеш")
+            previous = block['hash']
+        return {'valid': not errors, 'errors': errors, 'anchors': len(self.blocks)}
+
+class ShardCoordinator:
+    """Координатор: сбор голов шардов и выпуск якорных блоков"""
+
+    def __init__(self, nodes: Dict[str, str], anchor_path: str, interval: float = 60.0, timeout: float = 10.0):
+        self.nodes = dict(nodes)
+        self.chain = AnchorChain(anchor_path)
+        self.interval = interval
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def collect_heads(self, seal: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Головы цепочек всех узлов (с запечатыванием ожидающих событий)"""
+        query = '?seal=1' if seal else ''
+        with ThreadPoolExecutor(max_workers=max(len(self.nodes), 1)) as pool:
+            futures = {shard: pool.submit(_http_json, f"{url}/head{query}", None, self.timeout)
+                       for shard, url in self.nodes.items()}
+            heads = {}
+            for shard, future in futures.items():
+                try:
+                    heads[shard] = future.result()
+                except Exception as e:
+                    logger.error(f"Узел {shard} недоступен, голова не закреплена: {e}")
+        return heads
+
+    def anchor_once(self) -> Optional[Dict[str, Any]]:
+        """Выпуск якорного блока; пропускается, если ни одна голова не изменилась"""
+        heads = self.collect_heads()
+        if not heads:
+            return None
+        previous = self.chain.blocks[-1]['shard_heads'] if self.chain.blocks else {}
+        merged = {**previous, **{shard: {'height': head['height'], 'hash': head['hash']}
+                                 for shard, head in heads.items()}}
+        if merged == previous:
+            return None
+        block = self.chain.anchor(merged)
+        logger.info(f"Якорный блок {block['index']}: {len(heads)} шардов, корень {block['merkle_root'][:16]}")
+        return block
+
+    def verify_shards(self) -> Dict[str, Any]:
+        """Сверка последнего якоря с блоками шардов"""
+        if not self.chain.blocks:
+            return {'valid': True, 'errors': []}
+        errors = []
+        for shard, head in self.chain.blocks[-1]['shard_heads'].items():
+            if head['height'] == 0:
+                continue
+            try:
+                block = _http_json(f"{self.nodes[shard]}/blocks/{head['height'] - 1}", None, self.timeout)
+            except Exception as e:
+                errors.append(f"{shard}: {e}")
+                continue
+            if block.get('hash') != head['hash']:
+                errors.append(f"{shard}: блок {head['height'] - 1} не совпадает с якорем")
+        return {'valid': not errors, 'errors': errors}
+
+    def start(self):
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.anchor_once()
+                except Exception as e:
+                    logger.error(f"Ошибка выпуска якорного блока: {e}")
+
+        self._thread = threading.Thread(target=run, name="anchor-coordinator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'nodes': list(self.nodes),
+            'anchors': len(self.chain.blocks),
+            'head_hash': self.chain.head_hash,
+            'interval': self.interval,
+        }
+
+def parse_nodes(spec: str) -> Dict[str, str]:
+    """Список узлов "shard-0=http://host:port,shard-1=..." в словарь"""
+    nodes = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        shard, _, url = item.partition('=')
+        nodes[shard] = url.rstrip('/')
+    return nodes
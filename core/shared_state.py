@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Общее состояние рабочих процессов API
+Снимки статуса, инциденты, база угроз и очередь входящих событий в Redis
+или в файле SQLite; ведущий процесс выбирается по аренде с ограниченным сроком
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.status_snapshots import StatusSnapshot
+
+logger = logging.getLogger(__name__)
+
+class RedisStateBackend:
+    """Хранилище общего состояния в Redis"""
+
+    # Продление и освобождение аренды только текущим владельцем
+    _RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    _RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "cloud_security:"):
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._renew = self.client.register_script(self._RENEW_SCRIPT)
+        self._release = self.client.register_script(self._RELEASE_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return self.prefix + name
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(key))
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Захват аренды, если она свободна, или продление своей"""
+        if self.client.set(self._key(key), owner, nx=True, px=int(ttl * 1000)):
+            return True
+        return bool(self._renew(keys=[self._key(key)], args=[owner, int(ttl * 1000)]))
+
+    def release(self, key: str, owner: str) -> bool:
+        return bool(self._release(keys=[self._key(key)], args=[owner]))
+
+    def hset_many(self, name: str, mapping: Dict[str, bytes]):
+        if mapping:
+            self.client.hset(self._key(name), mapping=mapping)
+
+    def hget(self, name: str, field: str) -> Optional[bytes]:
+        return self.client.hget(self._key(name), field)
+
+    def hgetall(self, name: str) -> Dict[str, bytes]:
+        return {field.decode('utf-8'): value for field, value in self.client.hgetall(self._key(name)).items()}
+
+    def hdel(self, name: str, fields: Iterable[str]):
+        fields = list(fields)
+        if fields:
+            self.client.hdel(self._key(name), *fields)
+
+    def push(self, name: str, values: List[bytes]):
+        if values:
+            self.client.rpush(self._key(name), *values)
+
+    def pop_many(self, name: str, count: int) -> List[bytes]:
+        return self.client.lpop(self._key(name), count) or []
+
+    def length(self, name: str) -> int:
+        return self.client.llen(self._key(name))
+
+    def close(self):
+        self.client.close()
+
+class FileStateBackend:
+    """Хранилище общего состояния в файле SQLite (замена Redis на одном хосте)
+
+    Каждый процесс открывает свое соединение; запись атомарна за счет
+    транзакций BEGIN IMMEDIATE, чтение в режиме WAL не блокирует писателей.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS hashes (name TEXT, field TEXT, value BLOB, PRIMARY KEY (name, field));
+            CREATE TABLE IF NOT EXISTS queues (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, value BLOB);
+            CREATE INDEX IF NOT EXISTS queues_name ON queues (name, id);
+        """)
+
+    def _write(self, statements: Iterable[tuple]) -> List[sqlite3.Cursor]:
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                cursors = [self.connection.execute(sql, params) for sql, params in statements]
+                self.connection.execute("COMMIT")
+                return cursors
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def _read(self, sql: str, params: tuple) -> List[tuple]:
+        with self._lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def get(self, key: str) -> Optional[bytes]:
+        rows = self._read("SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                          (key, time.time()))
+        return rows[0][0] if rows else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        self._write([("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                      (key, value, expires_at))])
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Захват аренды, если она свободна или истекла, или продление своей"""
+        now = time.time()
+        owner_value = owner.encode('utf-8')
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(
+                    "SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+                acquired = row is None or row[0] == owner_value or (row[1] is not None and row[1] <= now)
+                if acquired:
+                    self.connection.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                                            (key, owner_value, now + ttl))
+                self.connection.execute("COMMIT")
+                return acquired
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def release(self, key: str, owner: str) -> bool:
+        cursor, = self._write([("DELETE FROM kv WHERE key = ? AND value = ?", (key, owner.encode('utf-8')))])
+        return cursor.rowcount > 0
+
+    def hset_many(self, name: str, mapping: Dict[str, bytes]):
+        if mapping:
+            self._write([("INSERT OR REPLACE INTO hashes (name, field, value) VALUES (?, ?, ?)",
+                          (name, field, value)) for field, value in mapping.items()])
+
+    def hget(self, name: str, field: str) -> Optional[bytes]:
+        rows = self._read("SELECT value FROM hashes WHERE name = ? AND field = ?", (name, field))
+        return rows[0][0] if rows else None
+
+    def hgetall(self, name: str) -> Dict[str, bytes]:
+        return dict(self._read("SELECT field, value FROM hashes WHERE name = ?", (name,)))
+
+    def hdel(self, name: str, fields: Iterable[str]):
+        statements = [("DELETE FROM hashes WHERE name = ? AND field = ?", (name, field)) for field in fields]
+        if statements:
+            self._write(statements)
+
+    def push(self, name: str, values: List[bytes]):
+        if values:
+            self._write([("INSERT INTO queues (name, value) VALUES (?, ?)", (name, value)) for value in values])
+
+    def pop_many(self, name: str, count: int) -> List[bytes]:
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    "SELECT id, value FROM queues WHERE name = ? ORDER BY id LIMIT ?", (name, count)).fetchall()
+                if rows:
+                    self.connection.execute("DELETE FROM queues WHERE name = ? AND id <= ?", (name, rows[-1][0]))
+                self.connection.execute("COMMIT")
+                return [value for _, value in rows]
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def length(self, name: str) -> int:
+        return self._read("SELECT COUNT(*) FROM queues WHERE name = ?", (name,))[0][0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+def create_state_backend(url: str):
+    """Хранилище по URL: redis://... или file:///путь/к/файлу.db"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStateBackend(url)
+    if url.startswith('file://'):
+        return FileStateBackend(url[len('file://'):])
+    raise ValueError(f"Неподдерживаемый URL общего состояния: {url}")
+
+class LeaderElection:
+    """Выбор ведущего процесса по аренде
+
+    Ведущий продлевает аренду каждые lease_seconds / 3; если процесс
+    завершился, аренда истекает и ее захватывает другой процесс.
+    """
+
+    def __init__(self, backend: Any, key: str = "leader", lease_seconds: float = 15.0,
+                 node_id: Optional[str] = None):
+        self.backend = backend
+        self.key = key
+        self.lease_seconds = lease_seconds
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.elected_at: Optional[float] = None
+        self.transitions = 0
+
+    @property
+    def renew_interval(self) -> float:
+        return self.lease_seconds / 3
+
+    def try_acquire(self) -> bool:
+        """Захват или продление аренды; ошибка хранилища означает потерю лидерства"""
+        try:
+            leader = self.backend.acquire(self.key, self.node_id, self.lease_seconds)
+        except Exception as e:
+            logger.error(f"Ошибка продления аренды ведущего процесса: {e}")
+            leader = False
+
+        if leader != self.is_leader:
+            self.transitions += 1
+            self.elected_at = time.time() if leader else None
+            logger.info(f"Процесс {self.node_id} {'стал ведущим' if leader else 'больше не ведущий'}")
+        self.is_leader = leader
+        return leader
+
+    def release(self):
+        """Освобождение аренды при штатной остановке"""
+        if self.is_leader:
+            try:
+                self.backend.release(self.key, self.node_id)
+            except Exception as e:
+                logger.error(f"Ошибка освобождения аренды: {e}")
+            self.is_leader = False
+
+    def current_leader(self) -> Optional[str]:
+        value = self.backend.get(self.key)
+        return value.decode('utf-8') if value else None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'node_id': self.node_id,
+            'is_leader': self.is_leader,
+            'elected_at': self.elected_at,
+            'transitions': self.transitions,
+            'lease_seconds': self.lease_seconds,
+        }
+
+class SharedState:
+    """Общее состояние процессов: публикует ведущий, читают все
+
+    - снимки статуса хранятся вместе с ETag ведущего, поэтому условные
+      запросы (If-None-Match) совпадают на любом рабочем процессе;
+    - инциденты публикуются инкрементально (только измененные с прошлой публикации);
+    - база угроз - общий словарь, дополняемый любым процессом;
+    - события, принятые не ведущим процессом, ставятся в очередь ведущему.
+    """
+
+    STATUS = 'status'
+    INCIDENTS = 'incidents'
+    THREATS = 'threats'
+    EVENTS = 'events'
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self._published_incidents: Dict[str, float] = {}
+        self._published_versions: Dict[str, int] = {}
+        self.stats = {'snapshots_published': 0, 'incidents_published': 0, 'events_queued': 0,
+                      'events_drained': 0}
+
+    # Снимки статуса
+
+    def publish_snapshots(self, snapshots: Iterable[StatusSnapshot]):
+        """Публикация снимков, версия которых изменилась"""
+        changed = {}
+        for snapshot in snapshots:
+            if self._published_versions.get(snapshot.name) == snapshot.version:
+                continue
+            changed[snapshot.name] = json.dumps({
+                'version': snapshot.version,
+                'etag': snapshot.etag,
+                'created_at': snapshot.created_at,
+            }).encode('utf-8') + b'\n' + snapshot.body
+            self._published_versions[snapshot.name] = snapshot.version
+        self.backend.hset_many(self.STATUS, changed)
+        self.stats['snapshots_published'] += len(changed)
+
+    def get_snapshot(self, name: str) -> Optional[StatusSnapshot]:
+        """Снимок, опубликованный ведущим процессом"""
+        value = self.backend.hget(self.STATUS, name)
+        if value is None:
+            return None
+        header, body = value.split(b'\n', 1)
+        meta = json.loads(header)
+        return StatusSnapshot(name, meta['version'], json.loads(body), body, meta['etag'], meta['created_at'])
+
+    # Инциденты
+
+    def publish_incidents(self, incidents: Iterable[Any]):
+        """Публикация измененных инцидентов (CorrelatedIncident) и удаление закрытых"""
+        incidents = list(incidents)
+        current = {incident.incident_id: incident.updated_at for incident in incidents}
+        changed = {
+            incident.incident_id: json.dumps(incident.to_dict(), ensure_ascii=False).encode('utf-8')
+            for incident in incidents
+            if self._published_incidents.get(incident.incident_id) != incident.updated_at
+        }
+        closed = [incident_id for incident_id in self._published_incidents if incident_id not in current]
+
+        self.backend.hset_many(self.INCIDENTS, changed)
+        self.backend.hdel(self.INCIDENTS, closed)
+        self._published_incidents = current
+        self.stats['incidents_published'] += len(changed)
+
+    def list_incidents(self, min_events: int = 1) -> List[Dict[str, Any]]:
+        incidents = [json.loads(value) for value in self.backend.hgetall(self.INCIDENTS).values()]
+        incidents = [incident for incident in incidents if incident.get('event_count', 0) >= min_events]
+        return sorted(incidents, key=lambda incident: incident['updated_at'], reverse=True)
+
+    # База угроз
+
+    def put_threats(self, threats: Iterable[Dict[str, Any]], key: str = 'id'):
+        self.backend.hset_many(self.THREATS, {
+            str(threat.get(key) or threat.get('name')): json.dumps(threat, ensure_ascii=False).encode('utf-8')
+            for threat in threats
+        })
+
+    def list_threats(self) -> List[Dict[str, Any]]:
+        return [json.loads(value) for value in self.backend.hgetall(self.THREATS).values()]
+
+    # Очередь событий ведущему процессу
+
+    def enqueue_events(self, events: List[Dict[str, Any]]):
+        self.backend.push(self.EVENTS, [
+            json.dumps(event, ensure_ascii=False, default=str).encode('utf-8') for event in events
+        ])
+        self.stats['events_queued'] += len(events)
+
+    def drain_events(self, max_events: int = 500) -> List[Dict[str, Any]]:
+        events = [json.loads(value) for value in self.backend.pop_many(self.EVENTS, max_events)]
+        self.stats['events_drained'] += len(events)
+        return events
+
+    def get_status(self) -> Dict[str, Any]:
+        try:
+            queued = self.backend.length(self.EVENTS)
+        except Exception:
+            queued = None
+        return {
+            'backend': type(self.backend).__name__,
+            'queued_events': queued,
+            'published_incidents': len(self._published_incidents),
+            **self.stats,
+        }
+
+    def close(self):
+        self.backend.close()
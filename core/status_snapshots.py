@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Снимки статуса подсистем
+Статус пересобирается только после изменения состояния (флаг dirty) или по истечении
+максимального возраста, запросы обслуживаются готовым снимком с ETag
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Неизменяемый снимок статуса
+
+    data не должен изменяться получателями: один и тот же снимок
+    отдается всем запросам до следующей пересборки.
+    """
+    name: str
+    version: int
+    data: Dict[str, Any]
+    body: bytes
+    etag: str
+    created_at: float
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Проверка заголовка If-None-Match (ответ 304 без тела)"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags
+
+def _make_snapshot(name: str, version: int, data: Dict[str, Any]) -> StatusSnapshot:
+    body = json.dumps(data, ensure_ascii=False, default=str, sort_keys=True).encode('utf-8')
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return StatusSnapshot(name, version, data, body, etag, time.time())
+
+class _Section:
+    __slots__ = ('name', 'builder', 'max_age', 'in_combined', 'dirty', 'version', 'snapshot', 'built_at')
+
+    def __init__(self, name: str, builder: Callable[[], Dict[str, Any]], max_age: Optional[float],
+                 in_combined: bool = True):
+        self.name = name
+        self.builder = builder
+        self.max_age = max_age
+        self.in_combined = in_combined
+        self.dirty = True
+        self.version = 0
+        self.snapshot: Optional[StatusSnapshot] = None
+        self.built_at = 0.0
+
+class StatusBoard:
+    """Реестр снимков статуса по разделам
+
+    Владелец состояния вызывает mark_dirty() при его изменении; чтение
+    снимка чистого раздела не вызывает сборщик статуса. max_age
+    ограничивает устаревание разделов, состояние которых меняется без
+    уведомления (None - только по флагу). Сводный снимок собирается из
+    снимков разделов и пересобирается, только если изменилась версия
+    хотя бы одного из них. Разделы с постоянно меняющимися значениями
+    (память процесса) регистрируются с combined=False, чтобы не менять
+    ETag сводного снимка при каждом обращении.
+    """
+
+    def __init__(self, default_max_age: Optional[float] = 5.0):
+        self.default_max_age = default_max_age
+        self._sections: Dict[str, _Section] = {}
+        self._lock = threading.Lock()
+        self._combined: Optional[StatusSnapshot] = None
+        self._combined_versions: Dict[str, int] = {}
+        self.stats = {'hits': 0, 'rebuilds': 0}
+
+    def register(self, name: str, builder: Callable[[], Dict[str, Any]], max_age: Any = 'default',
+                 combined: bool = True):
+        """Регистрация раздела статуса (combined=False - раздел не входит в сводный снимок)"""
+        self._sections[name] = _Section(name, builder, self.default_max_age if max_age == 'default' else max_age,
+                                        combined)
+
+    def names(self) -> List[str]:
+        """Имена зарегистрированных разделов"""
+        return list(self._sections)
+
+    def mark_dirty(self, *names: str):
+        """Пометка разделов как измененных (без имен - все разделы)"""
+        for name in names or self._sections:
+            self._sections[name].dirty = True
+
+    def get(self, name: str) -> StatusSnapshot:
+        """Снимок раздела (пересборка только для измененного или устаревшего)"""
+        section = self._sections[name]
+        now = time.monotonic()
+        if not self._is_stale(section, now):
+            self.stats['hits'] += 1
+            return section.snapshot
+
+        with self._lock:
+            if self._is_stale(section, now):
+                section.dirty = False
+                data = section.builder()
+                version = section.version + 1
+                snapshot = _make_snapshot(name, version, data)
+                # Версия растет только при реальном изменении содержимого,
+                # чтобы не пересобирать сводный снимок и сохранить ETag
+                if section.snapshot is not None and section.snapshot.etag == snapshot.etag:
+                    snapshot = section.snapshot
+                else:
+                    section.version = version
+                    section.snapshot = snapshot
+                section.built_at = now
+                self.stats['rebuilds'] += 1
+            return section.snapshot
+
+    @staticmethod
+    def _is_stale(section: _Section, now: float) -> bool:
+        if section.dirty or section.snapshot is None:
+            return True
+        return section.max_age is not None and now - section.built_at > section.max_age
+
+    def combined(self, names: Optional[Iterable[str]] = None) -> StatusSnapshot:
+        """Сводный снимок: объединение данных разделов"""
+        names = list(names or [name for name, section in self._sections.items() if section.in_combined])
+        snapshots = [self.get(name) for name in names]
+        versions = {snapshot.name: snapshot.version for snapshot in snapshots}
+
+        combined = self._combined
+        if combined is not None and versions == self._combined_versions:
+            return combined
+
+        data: Dict[str, Any] = {}
+        for snapshot in snapshots:
+            data.update(snapshot.data)
+        combined = _make_snapshot('combined', sum(versions.values()), data)
+        self._combined, self._combined_versions = combined, versions
+        return combined
+
+    def get_status(self) -> Dict[str, Any]:
+        """Статистика обращений к снимкам"""
+        return {
+            'sections': {name: section.version for name, section in self._sections.items()},
+            **self.stats,
+        }
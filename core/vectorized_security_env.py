@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Векторизованная среда безопасности для обучения с подкреплением
+Один шаг - одна операция NumPy над пакетом из N сред
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Действия агента (5 действий, как в исходной среде безопасности)
+ACTIONS = ('ignore', 'monitor', 'alert', 'block_ip', 'isolate_host')
+
+# Уровни угрозы скрытого состояния среды
+THREAT_LEVELS = ('none', 'low', 'medium', 'high', 'critical')
+
+OBSERVATION_SIZE = 10
+
+# Уровень угрозы среды для severity реального события
+SEVERITY_LEVELS = {'none': 0, 'info': 0, 'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+# Награда за действие (столбец) при уровне угрозы (строка):
+# адекватная реакция вознаграждается, недостаточная штрафуется сильнее избыточной
+REWARD_MATRIX = np.array([
+    # ignore monitor alert block isolate
+    [1.0,    0.5,   -0.5,  -1.0,  -2.0],   # none
+    [-1.0,   1.0,    0.5,  -0.5,  -1.0],   # low
+    [-3.0,  -1.0,    1.0,   0.5,  -0.5],   # medium
+    [-6.0,  -4.0,   -1.0,   2.0,   1.0],   # high
+    [-10.0, -8.0,   -4.0,   1.0,   3.0],   # critical
+], dtype=np.float32)
+
+# Вероятности перехода уровня угрозы без вмешательства (эскалация атаки)
+TRANSITION_MATRIX = np.array([
+    [0.90, 0.07, 0.02, 0.01, 0.00],
+    [0.30, 0.50, 0.15, 0.04, 0.01],
+    [0.10, 0.10, 0.55, 0.20, 0.05],
+    [0.05, 0.00, 0.10, 0.60, 0.25],
+    [0.02, 0.00, 0.00, 0.18, 0.80],
+], dtype=np.float64)
+
+# Минимальное действие, которое нейтрализует угрозу данного уровня
+MITIGATING_ACTION = np.array([0, 1, 2, 3, 4], dtype=np.int64)
+
+class BatchedSecurityEnv:
+    """Пакет из N независимых сред безопасности на NumPy
+
+    Скрытое состояние - уровень угрозы в каждой среде. Наблюдение содержит
+    зашумленные индикаторы угрозы и нагрузку системы. Завершившиеся среды
+    сбрасываются вызывающей стороной через _reset_envs(mask).
+    """
+
+    def __init__(self, num_envs: int = 8, max_steps: int = 100, noise: float = 0.15,
+                 seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+        self._cumulative_transitions = np.cumsum(TRANSITION_MATRIX, axis=1)
+        self._cumulative_transitions[:, -1] = 1.0
+
+        self.threat = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.load = np.zeros(num_envs, dtype=np.float32)
+        self.episode_returns = np.zeros(num_envs, dtype=np.float32)
+        self.observations = np.zeros((num_envs, OBSERVATION_SIZE), dtype=np.float32)
+
+    def seed(self, seed: Optional[int] = None):
+        """Переинициализация генератора случайных чисел"""
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self) -> np.ndarray:
+        """Сброс всех сред"""
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._observe()
+
+    def _reset_envs(self, mask: np.ndarray):
+        """Сброс сред по маске"""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        self.threat[mask] = self.rng.choice(len(THREAT_LEVELS), size=count, p=TRANSITION_MATRIX[0])
+        self.steps[mask] = 0
+        self.load[mask] = self.rng.random(count, dtype=np.float32) * 0.5
+        self.episode_returns[mask] = 0.0
+
+    def _observe(self) -> np.ndarray:
+        """Формирование наблюдений для всех сред"""
+        obs = self.observations
+        n = self.num_envs
+
+        # Зашумленное one-hot представление уровня угрозы
+        obs[:, :5] = self.rng.normal(0.0, self.noise, size=(n, 5))
+        obs[np.arange(n), self.threat] += 1.0
+
+        obs[:, 5] = self.threat / 4.0 + self.rng.normal(0.0, self.noise, size=n)
+        obs[:, 6] = self.load
+        obs[:, 7] = self.steps / self.max_steps
+        obs[:, 8] = self.rng.random(n)  # фоновая сетевая активность
+        obs[:, 9] = (self.threat >= 3) * self.rng.random(n)  # аномальные подключения
+        return obs
+
+    def step(self, actions: np.ndarray):
+        """Шаг всех сред: награды, признаки завершения и усечения"""
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+        rewards = REWARD_MATRIX[self.threat, actions].copy()
+        # Штраф за нагрузку от дорогих действий (блокировка и изоляция)
+        rewards -= 0.1 * (actions >= 3) * self.load
+
+        # Адекватная реакция нейтрализует угрозу, иначе угроза развивается
+        mitigated = actions >= MITIGATING_ACTION[self.threat]
+        draws = self.rng.random(self.num_envs)[:, None]
+        escalated = (draws < self._cumulative_transitions[self.threat]).argmax(axis=1)
+        self.threat = np.where(mitigated & (self.threat > 0), 0, escalated)
+
+        self.load = np.clip(self.load + 0.05 * (actions >= 3) - 0.02, 0.0, 1.0).astype(np.float32)
+        self.steps += 1
+        self.episode_returns += rewards
+
+        terminated = self.load >= 1.0
+        truncated = self.steps >= self.max_steps
+        return rewards, terminated, truncated
+
+def event_observation(severity: Any, load: float = 0.0, progress: float = 0.0,
+                      anomaly: float = 0.0) -> np.ndarray:
+    """Наблюдение среды для реального события (раскладка как в _observe)
+
+    Позволяет применять политику, обученную на этой среде, к событиям
+    монитора: уровень угрозы берется из severity, нагрузка - из метрик хоста,
+    длительность - из размера инцидента, аномальность - из индекса соседей.
+    """
+    name = str(getattr(severity, 'name', None) or getattr(severity, 'value', severity)).lower()
+    level = SEVERITY_LEVELS.get(name, 0)
+
+    observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+    observation[level] = 1.0
+    observation[5] = level / 4.0
+    observation[6] = min(max(load, 0.0), 1.0)
+    observation[7] = min(max(progress, 0.0), 1.0)
+    observation[8] = 0.5  # фоновая сетевая активность не наблюдается: среднее значение среды
+    observation[9] = min(max(anomaly, 0.0), 1.0)
+    return observation
+
+_env_class = None
+
+def _get_env_class():
+    """Ленивое создание одиночной среды gymnasium.Env (gymnasium импортируется по требованию)"""
+    global _env_class
+    if _env_class is not None:
+        return _env_class
+
+    import gymnasium
+    from gymnasium import spaces
+
+    class SecurityEnv(gymnasium.Env):
+        """Одиночная среда безопасности для DummyVecEnv/SubprocVecEnv"""
+
+        metadata = {"render_modes": []}
+
+        def __init__(self, max_steps: int = 100, noise: float = 0.15, seed: Optional[int] = None):
+            self.batch = BatchedSecurityEnv(1, max_steps, noise, seed)
+            self.observation_space = spaces.Box(-np.inf, np.inf, shape=(OBSERVATION_SIZE,), dtype=np.float32)
+            self.action_space = spaces.Discrete(len(ACTIONS))
+
+        def reset(self, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None):
+            super().reset(seed=seed)
+            if seed is not None:
+                self.batch.seed(seed)
+            return self.batch.reset()[0].copy(), {}
+
+        def step(self, action):
+            rewards, terminated, truncated = self.batch.step(np.array([action]))
+            obs = self.batch._observe()[0].copy()
+            return obs, float(rewards[0]), bool(terminated[0]), bool(truncated[0]), {}
+
+    _env_class = SecurityEnv
+    return _env_class
+
+def make_security_env(max_steps: int = 100, noise: float = 0.15, seed: Optional[int] = None):
+    """Создание одиночной среды безопасности (gymnasium.Env)"""
+    return _get_env_class()(max_steps=max_steps, noise=noise, seed=seed)
+
+_vec_env_class = None
+
+def _get_vec_env_class():
+    """Ленивое создание класса VecEnv (stable-baselines3 импортируется по требованию)"""
+    global _vec_env_class
+    if _vec_env_class is not None:
+        return _vec_env_class
+
+    from gymnasium import spaces
+    from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+    class SecurityVecEnv(VecEnv):
+        """VecEnv stable-baselines3 поверх BatchedSecurityEnv"""
+
+        def __init__(self, num_envs: int, max_steps: int = 100, noise: float = 0.15,
+                     seed: Optional[int] = None):
+            self.batch = BatchedSecurityEnv(num_envs, max_steps, noise, seed)
+            self.render_mode = None
+            self._actions = None
+            super().__init__(
+                num_envs,
+                spaces.Box(-np.inf, np.inf, shape=(OBSERVATION_SIZE,), dtype=np.float32),
+                spaces.Discrete(len(ACTIONS))
+            )
+
+        def reset(self):
+            if self._seeds[0] is not None:
+                self.batch.seed(self._seeds[0])
+            self._reset_seeds()
+            return self.batch.reset().copy()
+
+        def step_async(self, actions: np.ndarray):
+            self._actions = actions
+
+        def step_wait(self):
+            rewards, terminated, truncated = self.batch.step(self._actions)
+            dones = terminated | truncated
+            infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+
+            if dones.any():
+                terminal_obs = self.batch._observe().copy()
+                for idx in np.flatnonzero(dones):
+                    infos[idx]['terminal_observation'] = terminal_obs[idx]
+                    infos[idx]['TimeLimit.truncated'] = bool(truncated[idx] and not terminated[idx])
+                self.batch._reset_envs(dones)
+
+            return self.batch._observe().copy(), rewards, dones, infos
+
+        def close(self):
+            pass
+
+        def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+            return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+        def set_attr(self, attr_name: str, value: Any, indices=None):
+            setattr(self, attr_name, value)
+
+        def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+            method = getattr(self.batch, method_name)
+            return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+        def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+            return [False for _ in self._get_indices(indices)]
+
+    _vec_env_class = SecurityVecEnv
+    return _vec_env_class
+
+def make_security_vec_env(n_envs: int = 8, vec_env_type: str = "batched",
+                          max_steps: int = 100, seed: Optional[int] = None):
+    """Создание векторизованной среды для stable-baselines3
+
+    vec_env_type:
+        batched - все среды в одном процессе, шаг как одна операция NumPy
+        dummy   - DummyVecEnv из отдельных сред (последовательно)
+        subproc - SubprocVecEnv, по процессу на среду
+    """
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+
+    if vec_env_type == "batched":
+        env = _get_vec_env_class()(n_envs, max_steps=max_steps, seed=seed)
+    elif vec_env_type in ("dummy", "subproc"):
+        factories = [
+            (lambda i=i: make_security_env(max_steps=max_steps, seed=None if seed is None else seed + i))
+            for i in range(n_envs)
+        ]
+        env = DummyVecEnv(factories) if vec_env_type == "dummy" else SubprocVecEnv(factories)
+    else:
+        raise ValueError(f"Неизвестный тип векторизованной среды: {vec_env_type}")
+
+    return VecMonitor(env)
+
+def train_security_agent(algorithm: str = "PPO", total_timesteps: int = 10000, n_envs: int = 8,
+                         vec_env_type: str = "batched", target_reward: Optional[float] = None,
+                         seed: Optional[int] = None):
+    """Обучение агента на векторизованной среде
+
+    Возвращает модель и статистику: шагов среды в секунду и время
+    достижения целевой средней награды за эпизод.
+    """
+    import stable_baselines3
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class TargetRewardCallback(BaseCallback):
+        """Фиксация момента достижения целевой награды"""
+
+        def __init__(self):
+            super().__init__()
+            self.started_at = time.perf_counter()
+            self.reached_at: Optional[float] = None
+            self.reached_steps: Optional[int] = None
+
+        def _on_step(self) -> bool:
+            buffer = self.model.ep_info_buffer
+            if target_reward is not None and self.reached_at is None and buffer:
+                mean_reward = float(np.mean([info['r'] for info in buffer]))
+                if mean_reward >= target_reward:
+                    self.reached_at = time.perf_counter() - self.started_at
+                    self.reached_steps = self.num_timesteps
+            return True
+
+    env = make_security_vec_env(n_envs, vec_env_type, seed=seed)
+    algorithm_class = getattr(stable_baselines3, algorithm)
+    model = algorithm_class("MlpPolicy", env, verbose=0, seed=seed)
+
+    callback = TargetRewardCallback()
+    start = time.perf_counter()
+    model.learn(total_timesteps=total_timesteps, callback=callback)
+    elapsed = time.perf_counter() - start
+
+    buffer = model.ep_info_buffer
+    stats = {
+        'algorithm': algorithm,
+        'timesteps': total_timesteps,
+        'n_envs': n_envs,
+        'vec_env_type': vec_env_type,
+        'wall_time_seconds': round(elapsed, 3),
+        'env_steps_per_second': round(total_timesteps / elapsed, 1),
+        'mean_episode_reward': float(np.mean([info['r'] for info in buffer])) if buffer else None,
+        'target_reward': target_reward,
+        'seconds_to_target': round(callback.reached_at, 3) if callback.reached_at else None,
+        'steps_to_target': callback.reached_steps,
+    }
+    env.close()
+    return model, stats
+
+def benchmark_env_throughput(env_counts: Sequence[int] = (1, 8, 64, 512),
+                             steps: int = 2000) -> List[Dict[str, Any]]:
+    """Скорость шагов среды (без обучения) в зависимости от числа сред"""
+    results = []
+    for n_envs in env_counts:
+        env = BatchedSecurityEnv(n_envs, seed=0)
+        env.reset()
+        actions = env.rng.integers(0, len(ACTIONS), size=(steps, n_envs))
+
+        start = time.perf_counter()
+        for step_actions in actions:
+            _, terminated, truncated = env.step(step_actions)
+            done = terminated | truncated
+            if done.any():
+                env._reset_envs(done)
+            env._observe()
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            'n_envs': n_envs,
+            'env_steps_per_second': round(steps * n_envs / elapsed, 1),
+        })
+    return results
+
+def benchmark_training(timesteps: Sequence[int] = (10_000, 100_000, 1_000_000),
+                       algorithm: str = "PPO", n_envs: int = 8, vec_env_type: str = "batched",
+                       target_reward: float = 50.0) -> List[Dict[str, Any]]:
+    """Время обучения и достижения целевой награды для разных rl_training_steps"""
+    results = []
+    for total in timesteps:
+        _, stats = train_security_agent(algorithm, total, n_envs, vec_env_type, target_reward, seed=0)
+        logger.info(f"{algorithm} {total} шагов: {stats['env_steps_per_second']} шагов/с, "
+                    f"цель за {stats['seconds_to_target']} с")
+        results.append(stats)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк векторизованной среды безопасности")
+    parser.add_argument("--train", action="store_true", help="Бенчмарк обучения stable-baselines3")
+    parser.add_argument("--algorithm", default="PPO")
+    parser.add_argument("--n-envs", type=int, default=8)
+    parser.add_argument("--vec-env", default="batched", choices=["batched", "dummy", "subproc"])
+    parser.add_argument("--timesteps", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--target-reward", type=float, default=50.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = {'env_throughput': benchmark_env_throughput()}
+    if args.train:
+        report['training'] = benchmark_training(
+            args.timesteps, args.algorithm, args.n_envs, args.vec_env, args.target_reward
+        )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
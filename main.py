@@ -5,22 +5,43 @@ Cloud Security System - Главный файл запуска
 """
 
 import asyncio
+import copy
+import inspect
 import logging
 import signal
 import sys
 from pathlib import Path
 import time
+import os
+from types import SimpleNamespace
 
 # Добавление корневой директории в путь
 sys.path.append(str(Path(__file__).parent))
 
 from core.security_monitor import SecurityMonitor, SecurityEvent, ThreatLevel
 from core.integration_manager import IntegrationConfig, IntegrationType
-from core.advanced_ml_system import AdvancedMLSystem
-from core.quantum_crypto import QuantumResistantCrypto
 from core.blockchain_logger import BlockchainLogger, SecurityEventLogger
-from core.ai_assistant import AIAssistant
-from core.cloud_integrations import CloudIntegrationManager, CloudProvider
+from core.correlation_engine import CorrelationEngine
+from core.feature_extraction import FeatureExtractor
+from core.policy_inference import NumpyPolicy, export_policy
+from core.vectorized_security_env import OBSERVATION_SIZE, event_observation, train_security_agent
+from core.online_learning import OnlineLearner, model_input_width
+from core.ann_index import LSHIndex, AnomalyScorer
+from core.intent_index import IntentIndex
+from core.lazy_components import AssistantComponents, StartupProfiler
+from core.init_graph import InitGraph
+from core.event_wal import EventWAL, WALBlockSealer
+from core.chain_export import ChainExporter, ChainSource, ExportJobManager
+from core.alert_dispatcher import AlertDispatcher
+from core.conversation_store import ConversationStore
+from core.chat_responses import ChatResponder, OpenAIChatBackend, ResponseCache
+from core.status_snapshots import StatusBoard, StatusSnapshot
+from core.metrics import SecurityMetrics
+from core.profiling import SamplingProfiler, SpanTracer
+from core.shared_state import LeaderElection, SharedState, create_state_backend
+from core.hyperparameter_search import ParallelHyperparameterSearch
+from core.model_registry import ModelRegistry, get_process_rss_mb
+from core.event_filter import EventDeduplicator, RateLimiter, format_aggregate
 from config import config
 
 # Настройка логирования
@@ -39,61 +60,314 @@ class CloudSecuritySystem:
     """Основной класс системы безопасности"""
     
     def __init__(self):
+        self.startup_profiler = StartupProfiler()
         self.monitor = SecurityMonitor()
-        self.advanced_ml = AdvancedMLSystem()
-        self.quantum_crypto = QuantumResistantCrypto()
         self.blockchain_logger = BlockchainLogger()
         self.security_logger = SecurityEventLogger(self.blockchain_logger)
-        self.ai_assistant = AIAssistant()
-        self.cloud_manager = CloudIntegrationManager()
+        # Журнал ожидающих событий открывается процессом, ведущим мониторинг
+        self.blockchain_wal = None
+        self.block_sealer = None
+        # Экспорт цепочки выполняется в рабочем потоке, не блокируя цикл событий
+        self.export_jobs = ExportJobManager()
+        
+        # Подсистемы с тяжелыми зависимостями (ML фреймворки, SDK провайдеров)
+        # импортируются только если включены в config.modules
+        self.advanced_ml = self._create_subsystem('advanced_ml', 'core.advanced_ml_system', 'AdvancedMLSystem')
+        self.quantum_crypto = self._create_subsystem('quantum_crypto', 'core.quantum_crypto', 'QuantumResistantCrypto')
+        self.ai_assistant = self._create_subsystem('ai_assistant', 'core.ai_assistant', 'AIAssistant')
+        self.assistant_components = AssistantComponents(config.ai, self.startup_profiler)
+        self.conversation_store = ConversationStore(
+            max_messages=config.ai.max_conversation_history,
+            max_users=config.ai.max_conversation_users,
+            spill_path=config.ai.conversation_spill_path
+        )
+        self.intent_index = IntentIndex(
+            cache_path=config.ai.intent_index_path,
+            cache_size=config.ai.intent_cache_size
+        )
+        # Версия состояния угроз: ответы чат-бота кешируются, пока она не изменится
+        self.threat_state_version = 0
+        self.chat_responder = None
+        if self.assistant_components.chat_bot.enabled:
+            self.chat_responder = ChatResponder(
+                OpenAIChatBackend(
+                    config.ai.openai_api_key,
+                    model=config.ai.openai_model,
+                    client_getter=self.assistant_components.chat_bot.get
+                ),
+                cache=ResponseCache(config.ai.response_cache_ttl, config.ai.response_cache_size),
+                intent_index=self.intent_index,
+                state_version=lambda: self.threat_state_version,
+                conversation_store=self.conversation_store,
+                max_concurrency=config.ai.chat_max_concurrency,
+                timeout=config.ai.chat_timeout,
+                context_token_budget=config.ai.context_token_budget
+            )
+        self.alert_dispatcher = AlertDispatcher(
+            speaker=self.assistant_components.text_to_speech.get if config.ai.voice_enabled else None,
+            coalesce_window=config.ai.alert_coalesce_window,
+            max_queued=config.ai.alert_queue_size
+        )
+        self.cloud_manager = self._create_subsystem(
+            'cloud_integrations', 'core.cloud_integrations', 'CloudIntegrationManager'
+        )
+        self.correlation_engine = CorrelationEngine(config.correlation)
+        self.event_filter = EventDeduplicator(
+            window_seconds=config.event_filter.suppression_window_seconds,
+            max_entries=config.event_filter.max_fingerprints
+        )
+        self.rate_limiter = RateLimiter(config.event_filter.get_rate_limits())
+        self.model_registry = ModelRegistry(
+            config.ml.model_save_path,
+            config.ml.model_memory_budget_mb
+        )
+        self.hyperparameter_search = ParallelHyperparameterSearch(
+            journal_path=config.ml.optimization_journal,
+            n_workers=config.ml.optimization_workers
+        )
+        self.feature_extractor = FeatureExtractor(
+            hash_buckets=config.ml.feature_hash_buckets,
+            entity_window=config.ml.feature_entity_window,
+            max_entities=config.ml.feature_max_entities
+        )
+        
+        self.anomaly_scorer = AnomalyScorer(LSHIndex(
+            dim=self.feature_extractor.width,
+            capacity=config.ml.anomaly_index_capacity,
+            n_tables=config.ml.anomaly_lsh_tables,
+            n_bits=config.ml.anomaly_lsh_bits,
+            max_age_seconds=config.ml.anomaly_index_max_age
+        ))
+        self.online_learner = OnlineLearner(
+            model_getter=lambda: getattr(self.advanced_ml, 'deep_learning_models', {}).get('threat_classifier'),
+            model_setter=lambda model: self.advanced_ml.deep_learning_models.update(threat_classifier=model),
+            full_retrain=lambda X, y: self.advanced_ml.train_deep_learning_model('threat_classifier', X, y),
+            buffer_capacity=config.ml.online_buffer_size,
+            batch_size=config.ml.online_batch_size,
+            drift_threshold=config.ml.drift_threshold
+        )
         
         self.running = False
         self.tasks = []
+        self.startup_seconds = None
+        self.init_graph = InitGraph(self.startup_profiler, config.system.init_step_timeout)
+        
+        # Снимки статуса пересобираются только после изменений состояния
+        self.status_board = StatusBoard(config.system.status_max_age)
+        self._register_status_sections()
+        
+        # Метрики Prometheus (пустые операции, если отключены)
+        self.metrics = SecurityMetrics(config.system.metrics_enabled)
+        self._instrument_subsystems()
+        
+        # Профилирование и трассировка этапов, включаемые во время работы
+        self.profiler = SamplingProfiler(config.system.profiler_interval)
+        self.tracer = SpanTracer(config.system.trace_buffer_size, config.system.tracing_enabled)
+        
+        # Несколько рабочих процессов API: общее состояние и выбор ведущего,
+        # мониторинг и майнинг выполняются только в ведущем процессе
+        self.shared_state = None
+        self.leader_election = None
+        self._leader_tasks = []
+        if config.system.api_workers > 1:
+            backend = create_state_backend(config.get_shared_state_url())
+            self.shared_state = SharedState(backend)
+            self.leader_election = LeaderElection(backend, lease_seconds=config.system.leader_lease_seconds)
         
         # Настройка обработчиков сигналов
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
     
+    def _create_subsystem(self, name: str, module_name: str, class_name: str):
+        """Импорт и создание подсистемы, включенной в config.modules (иначе None)"""
+        if not getattr(config.modules, name):
+            logger.info(f"Подсистема {name} отключена конфигурацией")
+            return None
+        module = self.startup_profiler.timed_import(module_name, name)
+        with self.startup_profiler.measure(f"{name}.create"):
+            return getattr(module, class_name)()
+    
+    def _instrument_subsystems(self):
+        """Замер задержек подсистем и регистрация датчиков очередей"""
+        metrics = self.metrics
+        if not metrics.enabled:
+            return
+        
+        if self.advanced_ml is not None:
+            metrics.instrument(self.advanced_ml, 'predict_threat', metrics.predict_threat_seconds)
+        metrics.instrument(self.blockchain_logger, 'mine_block', metrics.block_mining_seconds)
+        metrics.instrument(self.blockchain_logger, 'verify_chain_integrity', metrics.chain_verification_seconds)
+        
+        if self.quantum_crypto is not None:
+            default_algorithm = config.quantum_crypto.default_algorithm
+            for operation, algorithm_position in (('encrypt', 2), ('decrypt', 2), ('generate_keypair', 0)):
+                metrics.instrument(
+                    self.quantum_crypto, operation, metrics.crypto_op_seconds,
+                    labels_from_args=lambda *args, _op=operation, _pos=algorithm_position, **kwargs: {
+                        'algorithm': str(kwargs.get('algorithm', args[_pos] if len(args) > _pos else default_algorithm)),
+                        'operation': _op
+                    }
+                )
+            for operation in ('sign', 'verify'):
+                metrics.instrument(self.quantum_crypto, operation, metrics.crypto_op_seconds,
+                                   algorithm='hash', operation=operation)
+        
+        if self.cloud_manager is not None:
+            for operation in ('add_provider', 'block_ip_across_providers', 'get_all_security_status'):
+                metrics.instrument(self.cloud_manager, operation, metrics.cloud_api_seconds,
+                                   errors=metrics.cloud_api_errors, provider='all', operation=operation)
+        
+        metrics.gauge_function(metrics.alert_queue_depth, lambda: self.alert_dispatcher.get_status()['queued'])
+        metrics.gauge_function(metrics.pending_blockchain_events,
+                               lambda: self.blockchain_wal.pending if self.blockchain_wal is not None
+                               else len(getattr(self.blockchain_logger, 'pending_events', ())))
+        metrics.gauge_function(metrics.open_incidents, lambda: len(self.correlation_engine.incidents))
+        metrics.gauge_function(metrics.suppression_entries, lambda: len(self.event_filter.entries))
+    
     def _signal_handler(self, signum, frame):
         """Обработчик сигналов для корректного завершения"""
         logger.info(f"Получен сигнал {signum}, завершение работы...")
         self.running = False
     
+    def _disable_subsystem(self, name: str):
+        """Отключение необязательной подсистемы после ошибки инициализации"""
+        def disable(error: str):
+            setattr(self, name, None)
+            self.status_board.mark_dirty('runtime', 'ml', 'ai', 'cloud')
+        return disable
+    
+    def _build_init_graph(self) -> InitGraph:
+        """Шаги инициализации и зависимости между ними
+        
+        Независимые шаги выполняются параллельно; обязателен только монитор
+        безопасности и то, что от него зависит. ML, AI ассистент, индекс
+        намерений и облачные провайдеры инициализируются в фоне и при ошибке
+        отключаются, не прерывая запуск.
+        """
+        graph = self.init_graph
+        
+        # Монитор безопасности и обработчик событий
+        graph.add('monitor', self.monitor.initialize)
+        graph.add('event_handler', self._register_event_handler, depends_on=['monitor'])
+        graph.add('default_integrations', self._setup_default_integrations,
+                  depends_on=['monitor'], required=False)
+        
+        # Регистрация весов моделей без загрузки (загрузка при первом обращении)
+        graph.add_sync('model_registry', self.model_registry.discover, required=False)
+        
+        # Загрузка экспортированной политики RL агента для быстрых решений
+        graph.add_sync('response_policy', self._load_response_policy, required=False)
+        
+        # Расширенная ML система
+        if self.advanced_ml is not None:
+            graph.add('advanced_ml', self.advanced_ml.initialize, required=False,
+                      on_failure=self._disable_subsystem('advanced_ml'))
+        
+        # AI ассистент: голос и чат-бот создаются при первом обращении,
+        # корпуса NLTK загружаются в фоне
+        self.assistant_components.start()
+        if self.ai_assistant is not None:
+            graph.add('ai_assistant', self.ai_assistant.start, required=False,
+                      on_failure=self._disable_subsystem('ai_assistant'))
+        graph.add('alert_dispatcher', self._start_alert_dispatcher)
+        
+        # Векторизация корпуса намерений (или загрузка с диска)
+        graph.add_sync('intent_index', self.intent_index.build, required=False)
+        
+        # Облачные провайдеры подключаются параллельно, каждый отдельным шагом
+        if self.cloud_manager is not None:
+            for provider_type, factory in self._cloud_provider_factories().items():
+                graph.add(f"cloud.{provider_type}",
+                          lambda factory=factory: self.cloud_manager.add_provider(factory()),
+                          required=False)
+        return graph
+    
     async def initialize(self):
         """Инициализация системы"""
         try:
             logger.info("Инициализация Cloud Security System...")
+            init_start = time.perf_counter()
             
-            # Инициализация монитора безопасности
-            await self.monitor.initialize()
-            
-            # Инициализация расширенной ML системы
-            await self.advanced_ml.initialize()
-            
-            # Инициализация AI ассистента
-            await self.ai_assistant.start()
-            
-            # Настройка облачных интеграций
-            await self._setup_cloud_integrations()
-            
-            # Добавление обработчика событий
-            self.monitor.add_event_handler(self._security_event_handler)
+            graph = self._build_init_graph()
+            if not await graph.run(config.system.init_timeout):
+                logger.error(f"Обязательные подсистемы не инициализированы: {graph.get_status()}")
+                return False
             
-            # Настройка базовых интеграций
-            await self._setup_default_integrations()
-            
-            logger.info("Cloud Security System инициализирована успешно")
+            self.startup_seconds = time.perf_counter() - init_start
+            background = [name for name, step in graph.get_status().items() if step['status'] in ('pending', 'running')]
+            logger.info(f"Cloud Security System инициализирована успешно за {self.startup_seconds:.2f} с "
+                        f"(RSS {get_process_rss_mb():.0f} МБ)"
+                        + (f", в фоне: {', '.join(background)}" if background else ""))
             return True
             
         except Exception as e:
             logger.error(f"Ошибка инициализации: {e}")
             return False
     
-    async def _setup_cloud_integrations(self):
-        """Настройка облачных интеграций"""
-        try:
+    async def _register_event_handler(self):
+        """Добавление обработчика событий"""
+        # Открытые окна корреляции восстанавливаются до первого события:
+        # загрузка снимка заменяет состояние, которое изменяет обработчик
+        if config.correlation.enabled:
+            await asyncio.to_thread(self.correlation_engine.load_snapshot)
+        self.monitor.add_event_handler(self._security_event_handler)
+    
+    def _load_response_policy(self):
+        # Политика загружается через реестр моделей: выгружается при простое
+        # и перечитывается при следующем обращении
+        if os.path.exists(config.ml.rl_policy_path):
+            self.model_registry.register(
+                'response_policy',
+                loader=lambda: NumpyPolicy.load(config.ml.rl_policy_path),
+                path=config.ml.rl_policy_path
+            )
+            self.model_registry.get('response_policy')
+    
+    @property
+    def response_policy(self):
+        """Политика RL агента (None, если не экспортирована)"""
+        if 'response_policy' not in self.model_registry.entries:
+            return None
+        return self.model_registry.get('response_policy')
+    
+    async def train_response_policy(self, algorithm: str = "PPO") -> dict:
+        """Обучение политики RL агента на векторизованной среде и замена рабочей политики
+        
+        Число сред и способ векторизации задаются MLConfig.rl_n_envs и
+        MLConfig.rl_vec_env; обучение и экспорт выполняются в пуле потоков.
+        """
+        model, stats = await asyncio.to_thread(
+            train_security_agent, algorithm, config.ml.rl_training_steps,
+            config.ml.rl_n_envs, config.ml.rl_vec_env
+        )
+        await asyncio.to_thread(export_policy, model, config.ml.rl_policy_path)
+        
+        self.model_registry.unload('response_policy')
+        self._load_response_policy()
+        self.status_board.mark_dirty('ml')
+        logger.info(f"Политика RL агента {algorithm} обучена: {stats['env_steps_per_second']} шагов/с, "
+                    f"средняя награда {stats['mean_episode_reward']}")
+        return stats
+    
+    async def _start_alert_dispatcher(self):
+        """Запуск диспетчера оповещений"""
+        # Оповещения всегда передаются AI ассистенту; при включенном голосе
+        # они дополнительно озвучиваются в потоке диспетчера
+        if self.ai_assistant is not None:
+            loop = asyncio.get_running_loop()
+            self.alert_dispatcher.add_sink(
+                lambda text: asyncio.run_coroutine_threadsafe(self.ai_assistant.emergency_alert(text), loop)
+                if self.init_graph.ready('ai_assistant') else None
+            )
+        self.alert_dispatcher.start()
+    
+    def _cloud_provider_factories(self) -> dict:
+        """Фабрики облачных провайдеров из CLOUD_PROVIDERS"""
+        from core.cloud_integrations import CloudProvider
+        
+        providers = {
             # AWS интеграция (пример)
-            aws_provider = CloudProvider(
+            'aws': lambda: CloudProvider(
                 name="AWS_Production",
                 type="aws",
                 credentials={
@@ -102,11 +376,9 @@ class CloudSecuritySystem:
                 },
                 regions=["us-east-1", "us-west-2"],
                 services=["ec2", "s3", "lambda", "guardduty", "securityhub"]
-            )
-            await self.cloud_manager.add_provider(aws_provider)
-            
+            ),
             # Azure интеграция (пример)
-            azure_provider = CloudProvider(
+            'azure': lambda: CloudProvider(
                 name="Azure_Production",
                 type="azure",
                 credentials={
@@ -114,76 +386,97 @@ class CloudSecuritySystem:
                 },
                 regions=["eastus", "westus2"],
                 services=["compute", "network", "security", "monitor"]
-            )
-            await self.cloud_manager.add_provider(azure_provider)
-            
+            ),
             # Kubernetes интеграция
-            k8s_provider = CloudProvider(
+            'kubernetes': lambda: CloudProvider(
                 name="K8s_Cluster",
                 type="kubernetes",
                 credentials={},
                 regions=["cluster"],
                 services=["pods", "services", "deployments"]
-            )
-            await self.cloud_manager.add_provider(k8s_provider)
-            
+            ),
             # Docker интеграция
-            docker_provider = CloudProvider(
+            'docker': lambda: CloudProvider(
                 name="Local_Docker",
                 type="docker",
                 credentials={},
                 regions=["local"],
                 services=["containers", "images", "networks"]
-            )
-            await self.cloud_manager.add_provider(docker_provider)
-            
-            logger.info("Облачные интеграции настроены")
-            
-        except Exception as e:
-            logger.error(f"Ошибка настройки облачных интеграций: {e}")
+            ),
+        }
+        
+        factories = {}
+        for provider_type in config.get_enabled_providers():
+            if provider_type not in providers:
+                logger.warning(f"Неизвестный облачный провайдер: {provider_type}")
+                continue
+            factories[provider_type] = providers[provider_type]
+        return factories
     
     async def _setup_default_integrations(self):
-        """Настройка базовых интеграций"""
-        try:
+        """Настройка базовых интеграций (подключения выполняются параллельно)"""
+        integrations = [
             # Интеграция с AWS (пример)
-            aws_config = IntegrationConfig(
+            IntegrationConfig(
                 name="AWS_Production",
                 type=IntegrationType.CLOUD,
                 endpoint_url="https://ec2.amazonaws.com",
                 credentials={"region": "us-east-1"}
-            )
-            await self.monitor.add_integration(aws_config)
-            
+            ),
             # Интеграция с Azure (пример)
-            azure_config = IntegrationConfig(
+            IntegrationConfig(
                 name="Azure_Production",
                 type=IntegrationType.CLOUD,
                 endpoint_url="https://management.azure.com",
                 credentials={"subscription_id": "example"}
-            )
-            await self.monitor.add_integration(azure_config)
-            
+            ),
             # Интеграция с локальным устройством (пример)
-            device_config = IntegrationConfig(
+            IntegrationConfig(
                 name="Local_Network_Device",
                 type=IntegrationType.DEVICE,
                 endpoint_url="http://192.168.1.100:8080",
                 polling_interval=30
-            )
-            await self.monitor.add_integration(device_config)
-            
-            logger.info("Базовые интеграции настроены")
-            
-        except Exception as e:
-            logger.error(f"Ошибка настройки базовых интеграций: {e}")
+            ),
+        ]
+        
+        results = await asyncio.gather(
+            *(self.monitor.add_integration(integration) for integration in integrations),
+            return_exceptions=True
+        )
+        for integration, result in zip(integrations, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка настройки интеграции {integration.name}: {result}")
+        
+        logger.info("Базовые интеграции настроены")
     
     async def _security_event_handler(self, event: SecurityEvent):
         """Обработчик событий безопасности"""
+        stages = self.tracer.start_trace(
+            'security_event', self.metrics.stage_timer(),
+            event_type=event.event_type, source=event.source
+        )
         try:
+            # Подавление повторов до дорогих этапов обработки
+            if config.event_filter.enabled and not self.event_filter.admit(event):
+                logger.debug(f"Повторное событие подавлено: {event.event_type}")
+                stages.mark('dedup')
+                return
+            stages.mark('dedup')
+            
             logger.info(f"Обработка события безопасности: {event.event_type}")
             
+            # Корреляция с ранее полученными событиями
+            incident = None
+            if config.correlation.enabled:
+                incident = self.correlation_engine.process_event(event)
+                if incident.event_count > 1:
+                    logger.info(f"Событие связано с инцидентом {incident.incident_id} "
+                                f"({incident.event_count} событий, {incident.severity})")
+                stages.mark('correlation')
+            
             # Логгирование в блокчейн
-            await self.security_logger.log_threat_detected(
+            await self._log_to_blockchain(
+                'log_threat_detected',
                 threat_type=event.event_type,
                 source_ip=event.source,
                 target_ip="local",
@@ -194,40 +487,184 @@ class CloudSecuritySystem:
                     "timestamp": event.timestamp
                 }
             )
+            stages.mark('blockchain_log')
             
             # Анализ с помощью ML
-            if hasattr(event, 'features'):
-                threat_analysis = await self.advanced_ml.predict_threat(event.features)
-                logger.info(f"ML анализ угрозы: {threat_analysis}")
+            features = getattr(event, 'features', None)
+            if features is None:
+                features = self.feature_extractor.transform(event)
+            stages.mark('features')
+            threat_analysis = None
+            if self.advanced_ml is not None and self.init_graph.ready('advanced_ml'):
+                # Ошибка или несовпадение ширины входа модели не отменяют оповещение и блокировку
+                width = self._threat_model_width()
+                if width is not None and len(features) != width:
+                    logger.debug(f"ML анализ пропущен: модель ожидает {width} признаков, получено {len(features)}")
+                else:
+                    try:
+                        threat_analysis = await self.advanced_ml.predict_threat(features)
+                        logger.info(f"ML анализ угрозы: {threat_analysis}")
+                    except Exception as e:
+                        logger.error(f"Ошибка ML анализа угрозы: {e}")
+                stages.mark('predict_threat')
+            
+            # Аномальность относительно истории событий (приближенный поиск соседей)
+            neighbour_analysis = None
+            if len(features) == self.feature_extractor.width:
+                neighbour_analysis = self.anomaly_scorer.score(features)
+                if neighbour_analysis['is_anomaly']:
+                    logger.warning(f"Событие {event.event_type} аномально относительно истории: "
+                                   f"{neighbour_analysis['anomaly_score']:.3f}")
+                stages.mark('anomaly_index')
+            
+            # Решение политики RL агента без стека stable-baselines3
+            action = self._recommend_action(event, features, incident, neighbour_analysis)
+            if action is not None:
+                logger.info(f"Рекомендуемое действие RL агента: {action}")
+                stages.mark('rl_policy')
             
             # Уведомление AI ассистента
             if event.severity in [ThreatLevel.HIGH, ThreatLevel.CRITICAL]:
-                await self.ai_assistant.emergency_alert(
-                    f"Обнаружена критическая угроза: {event.description}"
-                )
+                self.threat_state_version += 1
+                if self.rate_limiter.allow('emergency_alert', event.event_type):
+                    self.alert_dispatcher.submit(
+                        f"Обнаружена критическая угроза: {event.description}",
+                        event.severity
+                    )
+                else:
+                    logger.warning(f"Оповещение для {event.event_type} пропущено: превышен лимит частоты")
+                stages.mark('alert')
+            
+            self.status_board.mark_dirty('monitor', 'ml', 'blockchain', 'events', 'ai')
             
             # Автоматическая блокировка IP если необходимо
-            if event.severity == ThreatLevel.CRITICAL and hasattr(event, 'source'):
-                await self.cloud_manager.block_ip_across_providers(
-                    event.source,
-                    f"Critical threat: {event.description}"
-                )
+            if event.severity == ThreatLevel.CRITICAL and hasattr(event, 'source') and self.cloud_manager is not None:
+                if self.rate_limiter.allow('block_ip', event.event_type):
+                    await self.cloud_manager.block_ip_across_providers(
+                        event.source,
+                        f"Critical threat: {event.description}"
+                    )
+                else:
+                    logger.warning(f"Блокировка {event.source} пропущена: превышен лимит частоты")
+                stages.mark('block_ip')
                 
         except Exception as e:
             logger.error(f"Ошибка обработки события безопасности: {e}")
+            return
+        
+        # Накопление размеченных событий и оценок для инкрементального обучения
+        # (после оповещения и блокировки: ошибка здесь не должна их отменять)
+        if config.ml.online_learning:
+            try:
+                self.online_learner.add_sample(
+                    features,
+                    int(event.severity in [ThreatLevel.HIGH, ThreatLevel.CRITICAL])
+                )
+                if isinstance(threat_analysis, dict):
+                    score = threat_analysis.get('threat_probability', threat_analysis.get('anomaly_score'))
+                    if score is not None:
+                        self.online_learner.record_score(score)
+                stages.mark('online_learning')
+            except Exception as e:
+                logger.error(f"Ошибка накопления событий для дообучения: {e}")
+    
+    def _recommend_action(self, event, features, incident, neighbour_analysis):
+        """Действие политики RL агента (None, если политика не подходит к событию)
+        
+        Политика, обученная на среде безопасности, получает событие в виде
+        наблюдения среды; политика над признаками экстрактора - строку признаков.
+        """
+        policy = self.response_policy
+        if policy is None:
+            return None
+        try:
+            observation = features
+            if policy.input_size == OBSERVATION_SIZE:
+                data = getattr(event, 'data', None) or {}
+                observation = event_observation(
+                    event.severity,
+                    load=max(float(data.get('cpu_usage') or 0), float(data.get('memory_usage') or 0)) / 100.0,
+                    progress=incident.event_count / 100.0 if incident is not None else 0.0,
+                    anomaly=neighbour_analysis['anomaly_score'] if neighbour_analysis else 0.0
+                )
+            if len(observation) != policy.input_size:
+                return None
+            return policy.recommend_action(observation)
+        except Exception as e:
+            logger.error(f"Ошибка решения политики RL агента: {e}")
+            return None
+    
+    def _threat_model_width(self):
+        """Ширина входа классификатора угроз (None, если неизвестна)"""
+        return model_input_width(getattr(self.advanced_ml, 'deep_learning_models', {}).get('threat_classifier'))
+    
+    async def _log_to_blockchain(self, method: str, *args, **kwargs):
+        """Запись события в блокчейн через журнал ожидающих событий (если открыт)"""
+        if self.blockchain_wal is None:
+            await getattr(self.security_logger, method)(*args, **kwargs)
+            return
+        self.blockchain_wal.append({'method': method, 'args': args, 'kwargs': kwargs})
+    
+    async def _seal_blockchain_records(self, records: list, partial: bool):
+        """Потребитель журнала: передача записей логгеру и майнинг блока"""
+        for record in records:
+            await getattr(self.security_logger, record['method'])(*record['args'], **record['kwargs'])
+        if self.blockchain_logger.get_chain_status()['pending_events']:
+            result = self.blockchain_logger.mine_block()
+            if inspect.isawaitable(result):
+                await result
+        self.status_board.mark_dirty('blockchain')
+    
+    def _open_blockchain_wal(self):
+        """Открытие журнала ожидающих событий и восстановление незапечатанных"""
+        if not config.blockchain.wal_enabled or self.blockchain_wal is not None:
+            return
+        self.blockchain_wal = EventWAL(
+            config.blockchain.wal_dir,
+            segment_bytes=config.blockchain.wal_segment_mb * 1024 * 1024,
+            commit_interval=config.blockchain.wal_commit_interval,
+            memory_limit=config.blockchain.wal_memory_limit
+        )
+        self.block_sealer = WALBlockSealer(
+            self.blockchain_wal, self._seal_blockchain_records,
+            block_size=config.blockchain.max_events_per_block,
+            seal_interval=config.blockchain.seal_interval
+        )
+    
+    def _close_blockchain_wal(self):
+        if self.blockchain_wal is not None:
+            self.blockchain_wal.close()
+            self.blockchain_wal = None
+            self.block_sealer = None
     
     async def start_monitoring(self):
         """Запуск мониторинга"""
         try:
             logger.info("Запуск мониторинга безопасности...")
             
+            # Эндпоинт /metrics
+            if self.metrics.enabled:
+                self.metrics.start_server(config.system.metrics_port, config.system.api_host)
+            
+            # Журнал ожидающих блокчейн событий (восстановление после сбоя)
+            self._open_blockchain_wal()
+            
             # Запуск мониторинга
             await self.monitor.start_monitoring()
             
             # Запуск фоновых задач
             self.tasks.append(asyncio.create_task(self._ml_optimization_loop()))
             self.tasks.append(asyncio.create_task(self._blockchain_maintenance_loop()))
-            self.tasks.append(asyncio.create_task(self._cloud_status_loop()))
+            if self.block_sealer is not None:
+                self.tasks.append(asyncio.create_task(self._block_sealing_loop()))
+            if self.cloud_manager is not None:
+                self.tasks.append(asyncio.create_task(self._cloud_status_loop()))
+            if config.correlation.enabled:
+                self.tasks.append(asyncio.create_task(self._correlation_snapshot_loop()))
+            if config.event_filter.enabled:
+                self.tasks.append(asyncio.create_task(self._event_filter_loop()))
+            if config.ml.online_learning:
+                self.tasks.append(asyncio.create_task(self._online_learning_loop()))
             
             logger.info("Мониторинг запущен")
             
@@ -241,10 +678,22 @@ class CloudSecuritySystem:
                 await asyncio.sleep(3600)  # Каждый час
                 
                 logger.info("Запуск автоматической оптимизации ML моделей...")
-                await self.advanced_ml.auto_optimize_models()
+                if config.ml.parallel_optimization and config.ml.optimization_objective:
+                    await self.hyperparameter_search.optimize_async(
+                        config.ml.optimization_objective,
+                        n_trials=config.ml.optimization_trials,
+                        budget_seconds=config.ml.optimization_budget_seconds
+                    )
+                elif self.advanced_ml is not None and self.init_graph.ready('advanced_ml'):
+                    await self.advanced_ml.auto_optimize_models()
                 
                 # Эволюция генетического алгоритма
-                await self.advanced_ml.evolve_genetic_algorithm()
+                if self.advanced_ml is not None and self.init_graph.ready('advanced_ml'):
+                    await self.advanced_ml.evolve_genetic_algorithm()
+                
+                # Выгрузка простаивающих моделей
+                self.model_registry.unload_idle(config.ml.model_idle_unload_seconds)
+                self.status_board.mark_dirty('ml')
                 
             except asyncio.CancelledError:
                 break
@@ -252,6 +701,23 @@ class CloudSecuritySystem:
                 logger.error(f"Ошибка в цикле оптимизации ML: {e}")
                 await asyncio.sleep(300)  # Пауза 5 минут при ошибке
     
+    async def _online_learning_loop(self):
+        """Цикл инкрементального дообучения классификатора угроз"""
+        while self.running:
+            try:
+                await asyncio.sleep(config.ml.online_update_interval)
+                
+                result = await self.online_learner.step()
+                if result:
+                    logger.info(f"Инкрементальное обучение: {result}")
+                    self.status_board.mark_dirty('ml')
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле инкрементального обучения: {e}")
+                await asyncio.sleep(300)
+    
     async def _blockchain_maintenance_loop(self):
         """Цикл обслуживания блокчейна"""
         while self.running:
@@ -264,11 +730,10 @@ class CloudSecuritySystem:
                 if not integrity_status['valid']:
                     logger.warning(f"Обнаружены проблемы в блокчейне: {integrity_status['errors']}")
                 
-                # Экспорт блокчейна для резервного копирования
+                # Экспорт блокчейна для резервного копирования (фоновое задание)
                 if integrity_status['valid']:
-                    self.blockchain_logger.export_chain(
-                        f"backup/blockchain_backup_{int(time.time())}.json"
-                    )
+                    self.export_blockchain(f"blockchain_backup_{int(time.time())}")
+                self.status_board.mark_dirty('blockchain')
                 
             except asyncio.CancelledError:
                 break
@@ -276,6 +741,49 @@ class CloudSecuritySystem:
                 logger.error(f"Ошибка в цикле обслуживания блокчейна: {e}")
                 await asyncio.sleep(300)
     
+    async def _block_sealing_loop(self):
+        """Цикл майнинга блоков из журнала ожидающих событий"""
+        while self.running:
+            try:
+                await asyncio.sleep(config.blockchain.wal_poll_interval)
+                await self.block_sealer.poll()
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле майнинга блоков: {e}")
+                await asyncio.sleep(30)
+    
+    def export_blockchain(self, name: str = None, fmt: str = None, compression: str = None,
+                          start_index: int = 0, end_index: int = None,
+                          start_time: float = None, end_time: float = None, resume: bool = True) -> dict:
+        """Потоковый экспорт цепочки в config.blockchain.backup_path как фоновое задание
+        
+        Повторный вызов с тем же именем и параметрами продолжает прерванный экспорт.
+        """
+        fmt = fmt or config.blockchain.export_format
+        compression = compression or config.blockchain.export_compression
+        name = name or f"blockchain_export_{int(time.time())}"
+        extension = {'ndjson': 'ndjson', 'binary': 'bin'}.get(fmt, fmt)
+        suffix = {'gzip': '.gz', 'zstd': '.zst'}.get(compression, '')
+        exporter = ChainExporter(
+            ChainSource(self.blockchain_logger),
+            os.path.join(config.blockchain.backup_path, f"{os.path.basename(name)}.{extension}{suffix}"),
+            fmt=fmt, compression=compression,
+            start_index=start_index, end_index=end_index,
+            start_time=start_time, end_time=end_time,
+            chunk_blocks=config.blockchain.export_chunk_blocks, resume=resume
+        )
+        self.status_board.mark_dirty('blockchain')
+        return self.export_jobs.submit(exporter)
+    
+    def get_export_job(self, job_id: str) -> dict:
+        """Статус и прогресс задания экспорта"""
+        return self.export_jobs.get(job_id)
+    
+    def cancel_export_job(self, job_id: str) -> bool:
+        return self.export_jobs.cancel(job_id)
+    
     async def _cloud_status_loop(self):
         """Цикл проверки статуса облачных сервисов"""
         while self.running:
@@ -284,9 +792,11 @@ class CloudSecuritySystem:
                 
                 logger.info("Проверка статуса облачных сервисов...")
                 cloud_status = await self.cloud_manager.get_all_security_status()
+                self.status_board.mark_dirty('cloud')
                 
                 # Логгирование статуса
-                await self.security_logger.log_system_event(
+                await self._log_to_blockchain(
+                    'log_system_event',
                     "cloud_status_check",
                     "cloud_manager",
                     f"Статус облачных сервисов: {len(cloud_status['providers'])} провайдеров активны"
@@ -298,13 +808,179 @@ class CloudSecuritySystem:
                 logger.error(f"Ошибка в цикле проверки облачных сервисов: {e}")
                 await asyncio.sleep(300)
     
+    async def _correlation_snapshot_loop(self):
+        """Цикл сохранения снимков состояния корреляции"""
+        while self.running:
+            try:
+                await asyncio.sleep(config.correlation.snapshot_interval)
+                self.correlation_engine.save_snapshot()
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле сохранения состояния корреляции: {e}")
+                await asyncio.sleep(300)
+    
+    async def _event_filter_loop(self):
+        """Цикл выпуска агрегированных событий по закрытым окнам подавления"""
+        while self.running:
+            try:
+                await asyncio.sleep(config.event_filter.flush_interval)
+                
+                for aggregate in self.event_filter.flush_expired():
+                    await self._log_to_blockchain(
+                        'log_system_event',
+                        "suppressed_events",
+                        "event_filter",
+                        f"Подавлены повторы: {format_aggregate(aggregate)}"
+                    )
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле фильтрации событий: {e}")
+                await asyncio.sleep(300)
+    
+    async def _leadership_loop(self):
+        """Цикл продления аренды ведущего
+        
+        Только продление аренды и смена ролей: обработка очереди событий
+        идет в отдельной задаче и не может задержать продление дольше срока аренды.
+        """
+        interval = self.leader_election.renew_interval
+        while self.running:
+            try:
+                was_leader = self.leader_election.is_leader
+                leader = self.leader_election.try_acquire()
+                
+                if leader and not was_leader:
+                    first_task = len(self.tasks)
+                    await self.start_monitoring()
+                    self.tasks.append(asyncio.create_task(self._shared_state_loop()))
+                    self._leader_tasks = self.tasks[first_task:]
+                elif was_leader and not leader:
+                    await self._stop_leader_tasks()
+                
+                await asyncio.sleep(interval)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле аренды ведущего: {e}")
+                await asyncio.sleep(interval)
+    
+    async def _shared_state_loop(self):
+        """Цикл ведущего: события от других рабочих процессов и публикация общего состояния"""
+        while self.running:
+            try:
+                events = self.shared_state.drain_events()
+                handled = 0
+                try:
+                    while handled < len(events) and self.leader_election.is_leader:
+                        await self._security_event_handler(self._event_from_dict(events[handled]))
+                        handled += 1
+                finally:
+                    # Необработанный остаток достанется новому ведущему после потери аренды
+                    if handled < len(events):
+                        self.shared_state.enqueue_events(events[handled:])
+                self._publish_shared_state()
+                
+                await asyncio.sleep(config.system.shared_state_interval)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ошибка в цикле общего состояния: {e}")
+                await asyncio.sleep(config.system.shared_state_interval)
+    
+    async def _stop_leader_tasks(self):
+        """Остановка мониторинга после потери лидерства"""
+        if hasattr(self.monitor, 'stop_monitoring'):
+            await self.monitor.stop_monitoring()
+        for task in self._leader_tasks:
+            task.cancel()
+        await asyncio.gather(*self._leader_tasks, return_exceptions=True)
+        self.tasks = [task for task in self.tasks if task not in self._leader_tasks]
+        self._leader_tasks = []
+        # Журнал переходит к новому ведущему вместе с незапечатанными событиями
+        self._close_blockchain_wal()
+    
+    def _publish_shared_state(self):
+        """Публикация изменившихся снимков статуса и инцидентов ведущим процессом"""
+        board = self.status_board
+        self.shared_state.publish_snapshots([board.get(name) for name in board.names()] + [board.combined()])
+        if config.correlation.enabled:
+            self.shared_state.publish_incidents(self.correlation_engine.incidents.values())
+    
+    def _is_follower(self) -> bool:
+        return self.leader_election is not None and not self.leader_election.is_leader
+    
+    @staticmethod
+    def _event_from_dict(event: dict) -> SecurityEvent:
+        severity = event.get('severity', 'INFO')
+        return SimpleNamespace(
+            event_type=event.get('event_type', 'unknown'),
+            source=event.get('source', 'api'),
+            severity=ThreatLevel[severity] if severity in ThreatLevel.__members__ else severity,
+            description=event.get('description', ''),
+            data=event.get('data', {}),
+            timestamp=event.get('timestamp', time.time())
+        )
+    
+    async def submit_event(self, event: dict):
+        """Прием события через API: обработка в ведущем процессе или очередь ведущему"""
+        if self._is_follower():
+            self.shared_state.enqueue_events([event])
+        else:
+            await self._security_event_handler(self._event_from_dict(event))
+    
+    async def process_text_message(self, text: str, user_id: str = "default") -> str:
+        """Ответ на текстовое сообщение: кешированный ответ модели или AI ассистент"""
+        self.status_board.mark_dirty('ai')
+        if self.chat_responder is not None:
+            try:
+                return await self.chat_responder.reply(text, user_id)
+            except Exception as e:
+                logger.error(f"Ошибка запроса к чат-модели: {e}")
+        if self.ai_assistant is None:
+            return "AI ассистент отключен конфигурацией"
+        if not self.init_graph.ready('ai_assistant'):
+            return "AI ассистент запускается, повторите запрос позже"
+        return await self.ai_assistant.process_text_message(text)
+    
+    def start_profiling(self, seconds: float = 30.0) -> bool:
+        """Запуск сэмплирующего профилировщика на заданное время"""
+        return self.profiler.start(seconds)
+    
+    def get_profile(self) -> str:
+        """Результат профилирования в свернутом формате для flamegraph"""
+        return self.profiler.collapsed()
+    
+    def set_tracing(self, enabled: bool):
+        """Включение или выключение трассировки этапов обработки событий"""
+        self.tracer.enabled = enabled
+        logger.info(f"Трассировка событий {'включена' if enabled else 'выключена'}")
+    
+    def get_traces(self, limit: int = 50, min_duration_ms: float = 0.0) -> list:
+        """Последние трассы обработки событий"""
+        return self.tracer.recent(limit, min_duration_ms)
+    
+    def get_correlated_incidents(self, min_events: int = 1) -> list:
+        """Получение инцидентов, сгруппированных движком корреляции"""
+        if self._is_follower():
+            return self.shared_state.list_incidents(min_events)
+        return self.correlation_engine.list_incidents(min_events)
+    
     async def run(self):
         """Основной цикл работы системы"""
         try:
             self.running = True
             
-            # Запуск мониторинга
-            await self.start_monitoring()
+            # Запуск мониторинга (при нескольких рабочих процессах - после избрания ведущим)
+            if self.leader_election is None:
+                await self.start_monitoring()
+            else:
+                self.tasks.append(asyncio.create_task(self._leadership_loop()))
             
             # Основной цикл
             while self.running:
@@ -322,19 +998,31 @@ class CloudSecuritySystem:
         try:
             logger.info("Очистка ресурсов системы...")
             
+            # Отмена незавершенной фоновой инициализации
+            await self.init_graph.cancel()
+            
             # Остановка мониторинга
             if hasattr(self.monitor, 'stop_monitoring'):
                 await self.monitor.stop_monitoring()
             
             # Остановка AI ассистента
-            await self.ai_assistant.stop()
+            self.alert_dispatcher.stop()
+            if self.ai_assistant is not None:
+                await self.ai_assistant.stop()
+            self.conversation_store.close()
             
             # Очистка облачных интеграций
-            await self.cloud_manager.cleanup()
+            if self.cloud_manager is not None:
+                await self.cloud_manager.cleanup()
             
-            # Очистка блокчейн логгера
+            # Очистка блокчейн логгера (прерванный экспорт продолжится при повторном запуске)
+            await asyncio.to_thread(self.export_jobs.shutdown)
             self.blockchain_logger.cleanup()
             
+            # Сохранение открытых окон корреляции
+            if config.correlation.enabled:
+                self.correlation_engine.save_snapshot()
+            
             # Отмена всех задач
             for task in self.tasks:
                 if not task.done():
@@ -344,22 +1032,90 @@ class CloudSecuritySystem:
             if self.tasks:
                 await asyncio.gather(*self.tasks, return_exceptions=True)
             
+            # Незапечатанные события остаются в журнале до следующего запуска
+            self._close_blockchain_wal()
+            
+            # Передача лидерства другому рабочему процессу
+            if self.leader_election is not None:
+                self.leader_election.release()
+                self.shared_state.close()
+            
             logger.info("Система остановлена корректно")
             
         except Exception as e:
             logger.error(f"Ошибка при очистке ресурсов: {e}")
     
-    def get_system_status(self) -> dict:
-        """Получение статуса системы"""
-        return {
+    def _register_status_sections(self):
+        """Регистрация разделов статуса для снимков"""
+        board = self.status_board
+        board.register('runtime', lambda: {
             'running': self.running,
-            'monitor_status': self.monitor.get_status() if hasattr(self.monitor, 'get_status') else 'unknown',
-            'ml_status': self.advanced_ml.get_system_status(),
-            'blockchain_status': self.blockchain_logger.get_chain_status(),
-            'ai_assistant_status': self.ai_assistant.get_status(),
-            'cloud_providers': self.cloud_manager.list_providers(),
+            'profiler': self.profiler.get_status(),
+            'tracing': self.tracer.get_status(),
+            'leader_election': self.leader_election.get_status() if self.leader_election else None,
+            'shared_state': self.shared_state.get_status() if self.shared_state else None,
+            'startup_seconds': self.startup_seconds,
+            'initialization': self.init_graph.get_status(),
+            'enabled_modules': [name for name, enabled in vars(config.modules).items() if enabled]
+        }, max_age=1.0)
+        # Изменяется постоянно: отдельный раздел вне сводного снимка и его ETag
+        board.register('process', lambda: {
+            'process_rss_mb': round(get_process_rss_mb(), 2),
             'active_tasks': len([t for t in self.tasks if not t.done()])
-        }
+        }, max_age=1.0, combined=False)
+        board.register('monitor', lambda: {
+            'monitor_status': self.monitor.get_status() if hasattr(self.monitor, 'get_status') else 'unknown'
+        })
+        board.register('ml', lambda: {
+            'ml_status': self.advanced_ml.get_system_status() if self.advanced_ml else None,
+            'model_registry_status': self.model_registry.get_status(),
+            'hyperparameter_search': self.hyperparameter_search.get_status(),
+            'online_learning': self.online_learner.get_status(),
+            'anomaly_index': self.anomaly_scorer.index.get_status(),
+            'response_policy': self.model_registry.peek('response_policy').get_status()
+            if self.model_registry.peek('response_policy') else None
+        })
+        board.register('blockchain', lambda: {
+            'blockchain_status': self.blockchain_logger.get_chain_status(),
+            'block_sealing': self.block_sealer.get_status() if self.block_sealer else None,
+            'export_jobs': self.export_jobs.get_status()
+        })
+        board.register('ai', lambda: {
+            'ai_assistant_status': self.ai_assistant.get_status() if self.ai_assistant else None,
+            'assistant_components': self.assistant_components.get_status(),
+            'alert_dispatcher': self.alert_dispatcher.get_status(),
+            'conversation_store': self.conversation_store.get_status(),
+            'chat_responses': self.chat_responder.get_status() if self.chat_responder else None,
+            'intent_index_status': self.intent_index.get_status()
+        })
+        board.register('cloud', lambda: {
+            'cloud_providers': self.cloud_manager.list_providers() if self.cloud_manager else [],
+            'enabled_providers': config.get_enabled_providers()
+        })
+        board.register('events', lambda: {
+            'correlation_status': self.correlation_engine.get_status(),
+            'feature_extraction_status': self.feature_extractor.get_status(),
+            'event_filter_status': {
+                **self.event_filter.get_status(),
+                'rate_limits': self.rate_limiter.get_status()
+            }
+        })
+    
+    def get_status_snapshot(self, section: str = None) -> StatusSnapshot:
+        """Снимок статуса системы или раздела (ml, blockchain, cloud, ai...) с ETag"""
+        if self._is_follower():
+            snapshot = self.shared_state.get_snapshot(section or 'combined')
+            if snapshot is not None:
+                return snapshot
+        if section is None:
+            return self.status_board.combined()
+        return self.status_board.get(section)
+    
+    def get_system_status(self) -> dict:
+        """Получение статуса системы (копия: снимок общий для всех запросов)"""
+        status = copy.deepcopy(self.get_status_snapshot().data)
+        status.update(self.status_board.get('process').data)
+        return status
 
 async def main():
     """Главная функция"""
@@ -3,12 +3,29 @@
 Быстрый запуск Cloud Security System
 """
 
+import argparse
 import sys
 import os
 import subprocess
 import time
 
+def build_api_command(workers: int) -> list:
+    """Команда запуска API: один процесс или несколько рабочих процессов uvicorn"""
+    if workers <= 1:
+        return [sys.executable, "-m", "api.main"]
+    return [
+        sys.executable, "-m", "uvicorn", "api.main:app",
+        "--host", os.getenv("API_HOST", "0.0.0.0"),
+        "--port", os.getenv("API_PORT", "8000"),
+        "--workers", str(workers)
+    ]
+
 def main():
+    parser = argparse.ArgumentParser(description="Быстрый запуск Cloud Security System")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="Число рабочих процессов API (общее состояние в Redis или файле)")
+    args = parser.parse_args()
+    
     print("🚀 Cloud Security System - Быстрый запуск")
     print("=" * 50)
     
@@ -40,14 +57,19 @@ def main():
     
     # Запуск API сервера
     print("\n🌐 Запуск API сервера...")
+    if args.workers > 1:
+        # Рабочие процессы читают API_WORKERS из окружения и выбирают ведущего
+        os.environ["API_WORKERS"] = str(args.workers)
+        print(f"   Рабочих процессов: {args.workers} "
+              f"(общее состояние: {os.getenv('SHARED_STATE_BACKEND', 'redis')})")
     print("   API будет доступен по адресу: http://localhost:8000")
     print("   Документация API: http://localhost:8000/docs")
     
     try:
         # Запуск API сервера в фоновом режиме
-        api_process = subprocess.Popen([
-            sys.executable, "-m", "api.main"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        api_process = subprocess.Popen(
+            build_api_command(args.workers), stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
         
         # Ожидание запуска сервера
         print("   ⏳ Ожидание запуска сервера...")